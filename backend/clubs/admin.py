@@ -26,6 +26,7 @@ from clubs.models import (
     Category,
     Classification,
     Club,
+    ClubAncestry,
     ClubApplication,
     ClubApprovalResponseTemplate,
     ClubFair,
@@ -44,6 +45,7 @@ from clubs.models import (
     MembershipRequest,
     Note,
     NoteTag,
+    OutboxEmail,
     OwnershipRequest,
     Profile,
     QuestionAnswer,
@@ -67,6 +69,7 @@ from clubs.models import (
     Type,
     Year,
     ZoomMeetingVisit,
+    ZoomWebhook,
 )
 
 
@@ -243,6 +246,11 @@ class ClubAdmin(simple_history.admin.SimpleHistoryAdmin):
 
     get_designation.short_description = "Designation"
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # the children inline edits links directly, without any signals
+        ClubAncestry.rebuild()
+
 
 class ClubFairAdmin(admin.ModelAdmin):
     list_display = ("name", "organization", "contact", "start_time")
@@ -375,6 +383,13 @@ class MembershipInviteAdmin(admin.ModelAdmin):
         return obj.club.name
 
 
+class OutboxEmailAdmin(admin.ModelAdmin):
+    search_fields = ("to", "subject", "template")
+    list_display = ("subject", "template", "status", "attempts", "created_at")
+    list_filter = ("status", "template")
+    exclude = ("attachment",)
+
+
 class AdvisorAdmin(admin.ModelAdmin):
     search_fields = ("name", "title", "email", "phone", "club__name")
     list_display = ("name", "title", "email", "phone", "club", "visibility")
@@ -512,6 +527,11 @@ class ZoomMeetingVisitAdmin(admin.ModelAdmin):
     list_filter = (("leave_time", admin.EmptyFieldListFilter),)
 
 
+class ZoomWebhookAdmin(admin.ModelAdmin):
+    list_display = ("action", "created_at", "error")
+    list_filter = (("error", admin.EmptyFieldListFilter),)
+
+
 class ApplicationSubmissionAdmin(admin.ModelAdmin):
     search_fields = ("user__username",)
     list_display = ("user", "id", "created_at", "status")
@@ -660,6 +680,7 @@ admin.site.register(MembershipRequest, MembershipRequestAdmin)
 admin.site.register(Major, MajorAdmin)
 admin.site.register(Membership, MembershipAdmin)
 admin.site.register(MembershipInvite, MembershipInviteAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
 admin.site.register(OwnershipRequest, OwnershipRequestAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(QuestionAnswer, QuestionAnswerAdmin)
@@ -676,6 +697,7 @@ admin.site.register(ClubFairBooth)
 admin.site.register(NoteTag)
 admin.site.register(Year, YearAdmin)
 admin.site.register(ZoomMeetingVisit, ZoomMeetingVisitAdmin)
+admin.site.register(ZoomWebhook, ZoomWebhookAdmin)
 admin.site.register(AdminNote)
 admin.site.register(Ticket)
 admin.site.register(TicketTransactionRecord)
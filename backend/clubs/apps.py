@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ClubsConfig(AppConfig):
     name = "clubs"
+
+    def ready(self):
+        from clubs.emails import email_templates
+
+        # compile the email templates once per process instead of on every send
+        email_templates.load()
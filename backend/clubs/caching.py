@@ -0,0 +1,1287 @@
+import collections
+import datetime
+import hashlib
+import json
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Aggregate,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from ics import Calendar as ICSCal
+from ics import Event as ICSEvent
+from ics.grammar import parse as ICSParse
+
+from clubs.search import get_club_document, get_document_tokens, tokens_match_query
+from clubs.utils import html_to_text
+
+
+# cached classification ids for each classification group filter
+CLASSIFICATION_GROUP_CACHE_PREFIX = "classifications:group"
+CLASSIFICATION_GROUPS = ["undergraduate", "graduate"]
+
+# query parameters that change which page is shown but not which clubs match
+CLUB_LIST_NON_FILTER_PARAMS = {
+    "bypass",
+    "fields",
+    "format",
+    "ordering",
+    "page",
+    "page_size",
+    "seed",
+}
+
+# many to many facets supported by ClubsSearchFilter, mapped to their label field
+CLUB_LIST_M2M_FACETS = {
+    "badges": "label",
+    "student_types": "name",
+    "tags": "name",
+    "target_majors": "name",
+    "target_schools": "name",
+    "target_years": "name",
+}
+
+CLUB_LIST_BOOLEAN_FACETS = {
+    "accepting_members",
+    "active",
+    "appointment_needed",
+    "approved",
+    "available_virtually",
+    "enables_subscription",
+}
+
+CLUB_LIST_INTEGER_FACETS = {
+    "application_required": "application_required",
+    "classification": "classification_id",
+    "favorite_count": "favorite_count",
+    "recruiting_cycle": "recruiting_cycle",
+    "size": "size",
+}
+
+
+class ClubListCache:
+    """
+    Dependency tracked cache for anonymous club list responses.
+
+    Cached pages are grouped by their filter parameters. Every group remembers the
+    parameters it was built from, so that when a club is saved we can evaluate those
+    filters against the club before and after the save and only evict the groups
+    that contained the club or could now contain it. Evicting a group bumps its
+    version, which makes every page in that group unreachable.
+    """
+
+    PREFIX = "clubs:list:anon"
+    TIMEOUT = 60 * 60
+    MAX_GROUPS = 1000
+    LOCK_TIMEOUT = 5
+    LOCK_RETRIES = 10
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, *parts):
+        return ":".join([self.PREFIX, *(str(part) for part in parts)])
+
+    def _get_version(self, key):
+        return int(self.backend.get(key, 1))
+
+    def _bump_version(self, key):
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.set(key, 2, None)
+
+    def _count(self, name, amount=1):
+        if amount <= 0:
+            return
+        key = self._key("stats", name)
+        try:
+            self.backend.incr(key, amount)
+        except ValueError:
+            self.backend.set(key, amount, None)
+
+    def _get_registry(self):
+        return self.backend.get(self._key("groups")) or {}
+
+    def _acquire_lock(self):
+        for _ in range(self.LOCK_RETRIES):
+            if self.backend.add(self._key("lock"), 1, self.LOCK_TIMEOUT):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _release_lock(self):
+        self.backend.delete(self._key("lock"))
+
+    @staticmethod
+    def get_filter_params(request):
+        """
+        Return the subset of query parameters that determine which clubs can show
+        up in the response.
+        """
+        return {
+            key: value
+            for key, value in request.GET.dict().items()
+            if key not in CLUB_LIST_NON_FILTER_PARAMS
+        }
+
+    @staticmethod
+    def get_group(params):
+        return hashlib.sha1(
+            json.dumps(params, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _register(self, group, params, version):
+        """
+        Record the filter parameters for a group so that saves can be matched
+        against it. Returns False if the registry could not be updated, in which
+        case the page must not be cached.
+        """
+        if not self._acquire_lock():
+            return False
+
+        try:
+            registry = self._get_registry()
+            now = time.time()
+
+            # groups older than the page timeout have no live pages left
+            expired = [
+                key
+                for key, entry in registry.items()
+                if key != group and now - entry["created"] > self.TIMEOUT
+            ]
+            overflow = len(registry) - len(expired) - self.MAX_GROUPS + 1
+            if overflow > 0:
+                expired += sorted(
+                    (key for key in registry if key not in expired and key != group),
+                    key=lambda key: registry[key]["created"],
+                )[:overflow]
+            for key in expired:
+                self._bump_version(self._key("group", key, "version"))
+                self.backend.delete(self._key("group", key, "registered"))
+                del registry[key]
+
+            registry[group] = {"params": params, "created": now}
+            self.backend.set(self._key("groups"), registry, None)
+            self.backend.set(
+                self._key("group", group, "registered"), version, self.TIMEOUT
+            )
+        finally:
+            self._release_lock()
+        return True
+
+    def get_page_key(self, request):
+        """
+        Return the cache key for the list page requested, or None if the page
+        should not be cached.
+        """
+        params = self.get_filter_params(request)
+        group = self.get_group(params)
+
+        version_key = self._key("version")
+        group_version_key = self._key("group", group, "version")
+        registered_key = self._key("group", group, "registered")
+        values = self.backend.get_many([version_key, group_version_key, registered_key])
+        version = int(values.get(version_key, 1))
+        group_version = int(values.get(group_version_key, 1))
+
+        # the registration marker is only valid for the global version it was
+        # created under, since flushing the cache also clears the registry
+        if values.get(registered_key) != version:
+            if not self._register(group, params, version):
+                return None
+
+        uri = request.build_absolute_uri()
+        return self._key(f"v{version}", group, f"v{group_version}", uri)
+
+    def get(self, key):
+        data = self.backend.get(key)
+        self._count("hits" if data else "misses")
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data, self.TIMEOUT)
+
+    def get_needed_facets(self, registry=None):
+        """
+        Return the many to many facets referenced by any registered group, or None
+        if nothing is cached and invalidation can be skipped entirely.
+        Reads the registry unless one that was already loaded is given.
+        """
+        if registry is None:
+            registry = self._get_registry()
+        if not registry:
+            return None
+        needed = set()
+        for entry in registry.values():
+            for param in entry["params"]:
+                field = param.split("__")[0]
+                if field in CLUB_LIST_M2M_FACETS:
+                    needed.add(field)
+                elif field == "search":
+                    needed.add("tags")
+        return needed
+
+    def get_facets(self, club, m2m_fields=None):
+        """
+        Take a snapshot of everything about a club that the list filters can
+        match against.
+        """
+        founded = club.founded
+        if isinstance(founded, str):
+            founded = parse_date(founded)
+
+        facets = {
+            "code": club.code,
+            "archived": club.archived,
+            "ghost": club.ghost,
+            "visible_to_public": club.visible_to_public,
+            "founded": founded.year if founded else None,
+        }
+        for field in CLUB_LIST_BOOLEAN_FACETS:
+            facets[field] = getattr(club, field)
+        for field, attr in CLUB_LIST_INTEGER_FACETS.items():
+            facets[field] = getattr(club, attr)
+
+        if m2m_fields is None:
+            m2m_fields = CLUB_LIST_M2M_FACETS.keys()
+        for field in m2m_fields:
+            label = CLUB_LIST_M2M_FACETS[field]
+            rows = list(getattr(club, field).values_list("id", label))
+            facets[field] = {
+                "id": {row[0] for row in rows},
+                "label": {row[1] for row in rows},
+            }
+
+        # search matches against tag names as well
+        if "tags" in facets:
+            document = get_club_document(club, tags=facets["tags"]["label"])
+            facets["search"] = set(get_document_tokens(document))
+        return facets
+
+    def snapshot(self, club):
+        """
+        Store the current database state of a club on the instance before it is
+        modified, so that pages it used to match can be evicted after the save.
+        """
+        needed = self.get_needed_facets()
+        if needed is None or club.pk is None:
+            club._club_list_cache_facets = None
+            return
+        old = type(club)._default_manager.filter(pk=club.pk).first()
+        club._club_list_cache_facets = (
+            self.get_facets(old, needed) if old is not None else None
+        )
+
+    def invalidate_club(self, club, deleted=False, wildcard=()):
+        """
+        Evict every group that matched the club before or after it was modified.
+
+        Facets listed in wildcard are treated as matching any filter, for changes
+        where the previous state of those facets is not known.
+        """
+        registry = self._get_registry()
+        old = getattr(club, "_club_list_cache_facets", None)
+        club._club_list_cache_facets = None
+        if not registry:
+            return 0
+
+        states = [old] if old is not None else []
+        if not deleted:
+            needed = self.get_needed_facets(registry) - set(wildcard)
+            states.append(self.get_facets(club, needed))
+
+        evicted = 0
+        for group, entry in registry.items():
+            if any(club_matches_params(state, entry["params"]) for state in states):
+                self._bump_version(self._key("group", group, "version"))
+                evicted += 1
+        self._count("evictions", evicted)
+        return evicted
+
+    def invalidate_all(self):
+        """
+        Evict every cached page, for changes that cannot be attributed to a club.
+        """
+        locked = self._acquire_lock()
+        try:
+            self._bump_version(self._key("version"))
+            self.backend.delete(self._key("groups"))
+        finally:
+            if locked:
+                self._release_lock()
+        self._count("flushes")
+
+    def stats(self):
+        return {
+            "groups": len(self._get_registry()),
+            **{
+                name: int(self.backend.get(self._key("stats", name), 0))
+                for name in ["hits", "misses", "evictions", "flushes"]
+            },
+        }
+
+
+def _match_boolean(facet, value, operation):
+    value = value.lower()
+    if operation == "in" and set(value.split(",")) == {"true", "false"}:
+        return True
+    if value in {"true", "yes"}:
+        return facet is True
+    if value in {"false", "no"}:
+        return facet is False
+    if value in {"null", "none"}:
+        return facet is None
+    return True
+
+
+def _match_comparison(facet, value, operation):
+    if facet is None:
+        return False
+    return {
+        "lt": facet < value,
+        "gt": facet > value,
+        "lte": facet <= value,
+        "gte": facet >= value,
+    }.get(operation, facet == value)
+
+
+def _match_integer(facet, value, operation):
+    if operation == "in":
+        return facet in [int(size) for size in value.split(",") if size]
+    if "," in value:
+        values = [int(x.strip()) for x in value.split(",") if x]
+        if operation == "and":
+            return all(facet == x for x in values)
+        return facet in values
+    if value.isdigit():
+        return _match_comparison(facet, int(value), operation)
+    if value.lower() in {"none", "null"}:
+        return facet is None
+    return True
+
+
+def _match_year(facet, value, operation):
+    if value.isdigit():
+        return _match_comparison(facet, int(value), operation)
+    if value.lower() in {"none", "null"}:
+        return facet is None
+    return True
+
+
+def _match_many_to_many(facet, value, operation):
+    tags = value.split(",")
+    if operation == "or":
+        if tags[0].isdigit():
+            return bool(facet["id"] & {int(tag) for tag in tags if tag})
+        return bool(facet["label"] & set(tags))
+    if tags[0].isdigit() or operation == "id":
+        ids = {int(tag) for tag in tags if tag}
+        if settings.BRANDING == "fyh":
+            return bool(facet["id"] & ids)
+        return ids <= facet["id"]
+    return set(tags) <= facet["label"]
+
+
+def club_matches_params(facets, params):
+    """
+    Evaluate the club list filters in memory against a facet snapshot.
+
+    This mirrors ClubViewSet.get_queryset, the club search index and
+    ClubsSearchFilter for anonymous users. Whenever a filter cannot be evaluated
+    exactly, the club is assumed to match so that the group gets evicted.
+    """
+    if (
+        facets["archived"]
+        or not facets["active"]
+        or not facets["visible_to_public"]
+        or not (facets["approved"] or facets["ghost"])
+    ):
+        return False
+
+    try:
+        for param, value in params.items():
+            value = value.strip()
+            if param == "search":
+                if "search" in facets and not tokens_match_query(
+                    facets["search"], value
+                ):
+                    return False
+                continue
+            if param == "in":
+                subset = [x.strip() for x in value.split(",")]
+                if facets["code"] not in subset:
+                    return False
+                continue
+
+            field, *rest = param.split("__")
+            operation = rest[0].lower() if rest else "eq"
+
+            if field in CLUB_LIST_BOOLEAN_FACETS:
+                matched = _match_boolean(facets[field], value, operation)
+            elif field in CLUB_LIST_INTEGER_FACETS:
+                matched = _match_integer(facets[field], value, operation)
+            elif field in CLUB_LIST_M2M_FACETS:
+                matched = field not in facets or _match_many_to_many(
+                    facets[field], value, operation
+                )
+            elif field == "founded":
+                matched = _match_year(facets[field], value, operation)
+            elif field == "code":
+                if operation == "in":
+                    matched = facets["code"] in [
+                        x.strip() for x in value.split(",") if x.strip()
+                    ]
+                else:
+                    matched = facets["code"] == value
+            else:
+                # unknown parameters are either ignored by the filters
+                # or too complex to evaluate here
+                matched = True
+
+            if not matched:
+                return False
+    except (ValueError, TypeError):
+        return True
+
+    return True
+
+
+club_list_cache = ClubListCache()
+
+
+class ClubFragmentCache:
+    """
+    Cache of serialized clubs shared between every request that serializes them.
+
+    Fragments are keyed by the serializer, the club id and updated_at, together with
+    a digest of the columns and prefetched relations that the serializer reads, so a
+    stale fragment can never be returned. Fields that depend on the requesting user
+    are blanked before storing and filled back in for every request.
+    """
+
+    PREFIX = "clubs:fragment"
+    TIMEOUT = 60 * 60
+    RELATIONS = ["tags", "badges"]
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _count(self, name, amount=1):
+        if amount <= 0:
+            return
+        key = f"{self.PREFIX}:stats:{name}"
+        try:
+            self.backend.incr(key, amount)
+        except ValueError:
+            self.backend.set(key, amount, None)
+
+    @staticmethod
+    def _get_state(obj):
+        return [getattr(obj, field.attname) for field in obj._meta.concrete_fields]
+
+    def is_cacheable(self, instance):
+        # ghost clubs are represented differently depending on the user
+        if instance.ghost and not instance.approved:
+            return False
+        prefetched = getattr(instance, "_prefetched_objects_cache", {})
+        return all(relation in prefetched for relation in self.RELATIONS)
+
+    def get_key(self, prefix, instance):
+        state = self._get_state(instance)
+        for relation in self.RELATIONS:
+            state.append(
+                sorted(
+                    repr(self._get_state(obj))
+                    for obj in getattr(instance, relation).all()
+                )
+            )
+        digest = hashlib.sha1(repr(state).encode("utf-8")).hexdigest()
+        return f"{prefix}:{instance.id}:{instance.updated_at.isoformat()}:{digest}"
+
+    def represent(self, serializer, instances, user_fields):
+        """
+        Serialize the given instances with the serializer, reusing cached fragments
+        where possible.
+
+        The user specific fields are always evaluated against the current request.
+        """
+        request = serializer.context.get("request")
+        prefix = ":".join(
+            [
+                self.PREFIX,
+                f"{type(serializer).__module__}.{type(serializer).__name__}",
+                request.get_host() if request is not None else "",
+                getattr(request, "GET", {}).get("fields", ""),
+            ]
+        )
+
+        keys = {
+            index: self.get_key(prefix, instance)
+            for index, instance in enumerate(instances)
+            if self.is_cacheable(instance)
+        }
+        cached = self.backend.get_many(list(keys.values())) if keys else {}
+
+        output = []
+        missing = {}
+        for index, instance in enumerate(instances):
+            key = keys.get(index)
+            data = cached.get(key) if key is not None else None
+            if data is None:
+                data = serializer.to_representation(instance)
+                if key is not None:
+                    missing[key] = {
+                        field: None if field in user_fields else value
+                        for field, value in data.items()
+                    }
+            else:
+                data = dict(data)
+                for field in user_fields:
+                    if field in data:
+                        data[field] = serializer.fields[field].to_representation(
+                            instance
+                        )
+            output.append(data)
+
+        if missing:
+            self.backend.set_many(missing, self.TIMEOUT)
+        self._count("hits", len(cached))
+        self._count("misses", len(keys) - len(cached))
+        return output
+
+    def stats(self):
+        return {
+            name: int(self.backend.get(f"{self.PREFIX}:stats:{name}", 0))
+            for name in ["hits", "misses"]
+        }
+
+
+club_fragment_cache = ClubFragmentCache()
+
+
+class UpperMedian(Aggregate):
+    """
+    Middle value of the expression within each group, taking the later one for an
+    even number of values, as supported by PostgreSQL.
+
+    The discrete percentile picks the first value at or past the midpoint, so the
+    values are ordered from largest to smallest to land on the later one.
+    """
+
+    function = "PERCENTILE_DISC"
+    name = "UpperMedian"
+    template = "%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s DESC)"
+
+
+class FairLiveMetrics:
+    """
+    Short lived cache of the live booth metrics for each activities fair.
+
+    The metrics are recomputed whenever someone joins or leaves a fair booth and
+    pushed to the live event channel groups, so that dashboards do not need to poll.
+    The timeout only bounds staleness for writes that bypass model signals.
+    """
+
+    PREFIX = "fairs:live"
+    TIMEOUT = 10
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, fair_id):
+        return f"{self.PREFIX}:{fair_id}"
+
+    def compute(self, fair_id):
+        """
+        Return the metrics for every booth at the fair, keyed by event id.
+        """
+        from clubs.models import ClubFairRegistration, Event, Membership
+
+        events = Event.objects.filter(
+            club__in=ClubFairRegistration.objects.filter(fair_id=fair_id).values(
+                "club_id"
+            ),
+            type=Event.FAIR,
+        ).order_by()
+        duration = ExpressionWrapper(
+            F("visits__leave_time") - F("visits__join_time"),
+            output_field=DurationField(),
+        )
+
+        use_median = connection.vendor == "postgresql"
+
+        rows = events.values("id").annotate(
+            participant_count=Count(
+                "visits__person",
+                distinct=True,
+                filter=Q(visits__leave_time__isnull=True),
+            ),
+            already_attended=Count(
+                "visits__person",
+                distinct=True,
+                filter=Q(visits__leave_time__isnull=False),
+            ),
+            **({"median": UpperMedian(duration)} if use_median else {}),
+        )
+        metrics = {
+            row["id"]: {
+                "participant_count": row["participant_count"],
+                "already_attended": row["already_attended"],
+                "officers": [],
+                "median": (
+                    row["median"].total_seconds()
+                    if row.get("median") is not None
+                    else 0
+                ),
+            }
+            for row in rows
+        }
+
+        if not use_median:
+            # middle visit duration, taking the later one for an even number
+            durations = collections.defaultdict(list)
+            for event_id, value in (
+                events.filter(visits__leave_time__isnull=False)
+                .values_list("id", duration)
+                .order_by(duration)
+            ):
+                durations[event_id].append(value.total_seconds())
+            for event_id, values in durations.items():
+                metrics[event_id]["median"] = values[len(values) // 2]
+
+        # officers of the club while anyone is in its booth
+        officers = events.filter(
+            visits__leave_time__isnull=True,
+            club__membership__role__lte=Membership.ROLE_OFFICER,
+        ).values_list("id", "club__membership__person__username")
+        for event_id, username in officers.distinct().order_by(
+            "club__membership__person__username"
+        ):
+            metrics[event_id]["officers"].append(username)
+
+        return metrics
+
+    def get(self, fair_id):
+        metrics = self.backend.get(self._key(fair_id))
+        if metrics is None:
+            metrics = self.compute(fair_id)
+            self.backend.set(self._key(fair_id), metrics, self.TIMEOUT)
+        return metrics
+
+    def refresh(self, fair_id):
+        """
+        Recompute the metrics for a fair and push them to any connected dashboards.
+        """
+        metrics = self.compute(fair_id)
+        self.backend.set(self._key(fair_id), metrics, self.TIMEOUT)
+        # channel layers serialize messages with msgpack, which needs string keys
+        self.publish(
+            f"fairs-live-{fair_id}",
+            {
+                "type": "live_metrics",
+                "metrics": {str(key): value for key, value in metrics.items()},
+            },
+        )
+        return metrics
+
+    def publish(self, group, message):
+        channel_layer = get_channel_layer()
+        if channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(group, message)
+
+    def visit_changed(self, event_id, action):
+        self.visits_changed({event_id: action})
+
+    def visits_changed(self, actions):
+        """
+        Refresh every fair currently running with a booth for any of these events
+        once, and notify the listeners of each event itself.
+
+        Actions maps each event id to the latest Zoom webhook action for its booth.
+        """
+        event_ids = list(actions)
+        from clubs.models import ClubFair, Event
+
+        now = timezone.now()
+        fairs = ClubFair.objects.filter(
+            start_time__lte=now,
+            end_time__gte=now,
+            clubfairregistration__club__events__id__in=event_ids,
+            clubfairregistration__club__events__type=Event.FAIR,
+        ).values_list("id", flat=True)
+
+        event_metrics = {}
+        for fair_id in fairs.distinct():
+            metrics = self.refresh(fair_id)
+            event_metrics.update(
+                {
+                    event_id: metrics[event_id]
+                    for event_id in event_ids
+                    if event_id in metrics
+                }
+            )
+
+        for event_id in event_ids:
+            message = {"type": "join_leave", "event": actions[event_id]}
+            if event_id in event_metrics:
+                message["metrics"] = event_metrics[event_id]
+            self.publish(f"events-live-{event_id}", message)
+
+
+fair_live_metrics = FairLiveMetrics()
+
+
+class CalendarFeedCache:
+    """
+    Cache of the ICS feeds that calendar clients poll for every user.
+
+    Each showing is rendered to a VEVENT block once per revision of its showing,
+    event and club, and feeds are assembled by concatenating these blocks. An
+    assembled feed remembers a token for every club and favorite list it was built
+    from. A feed can be served, or answered with a 304, until one of those tokens
+    changes, without touching the database.
+    """
+
+    PREFIX = "calendar"
+    TIMEOUT = 6 * 60 * 60
+    BLOCK_TIMEOUT = 7 * 24 * 60 * 60
+
+    # only include showings newer than this
+    WINDOW = datetime.timedelta(days=30)
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, *parts):
+        return ":".join([self.PREFIX, *(str(part) for part in parts)])
+
+    def touch(self, *scopes):
+        """
+        Invalidate every feed built from any of the given scopes.
+        """
+        self.backend.set_many(
+            {self._key("scope", scope): uuid.uuid4().hex for scope in scopes}, None
+        )
+
+    def touch_club(self, club_id):
+        self.touch(f"club:{club_id or 'global'}", "events")
+
+    def _read_scopes(self, scopes):
+        keys = {scope: self._key("scope", scope) for scope in scopes}
+        tokens = self.backend.get_many(list(keys.values()))
+        return {scope: tokens.get(key) for scope, key in keys.items()}
+
+    def _header(self):
+        calendar = ICSCal(
+            creator=f"{settings.BRANDING_SITE_NAME} ({settings.DOMAINS[0]})"
+        )
+        calendar.extra.append(
+            ICSParse.ContentLine(
+                name="X-WR-CALNAME", value=f"{settings.BRANDING_SITE_NAME} Events"
+            )
+        )
+        lines = calendar.serialize().split("\r\n")
+        return "\r\n".join(lines[:-1]), lines[-1]
+
+    @staticmethod
+    def render(showing):
+        """
+        Return the VEVENT block for an event showing.
+        """
+        event = showing.event
+        e = ICSEvent()
+        e.name = "{} - {}".format(
+            event.club.name if event.club else "Global Event", event.name
+        )
+        e.begin = showing.start_time
+
+        # ensure event is at least 15 minutes for display purposes
+        e.end = (
+            (showing.start_time + datetime.timedelta(minutes=15))
+            if showing.start_time >= showing.end_time
+            else showing.end_time
+        )
+
+        # put url in location if location does not exist, otherwise put url in body
+        if showing.location:
+            e.location = showing.location
+        else:
+            e.location = event.url
+        e.url = event.url
+        e.description = "{}\n\n{}".format(
+            event.url or "" if not showing.location else "",
+            html_to_text(event.description),
+        ).strip()
+        e.uid = f"{event.ics_uuid}@{settings.DOMAINS[0]}"
+        e.created = event.created_at
+        e.last_modified = event.updated_at
+        e.categories = [event.club.name] if event.club else ["Global Event"]
+        return e.serialize()
+
+    def _block_key(self, showing):
+        event = showing.event
+        revisions = [showing.updated_at, event.updated_at]
+        if event.club is not None:
+            revisions.append(event.club.updated_at)
+        return self._key(
+            "vevent",
+            showing.id,
+            *(revision.timestamp() for revision in revisions),
+        )
+
+    def build(self, user_secretuuid, is_global=None, is_all=False, previous=None):
+        from clubs.models import EventShowing, Favorite, Profile
+
+        showings = EventShowing.objects.filter(
+            start_time__gte=timezone.now() - self.WINDOW
+        )
+
+        # the tokens are read before the rows they guard, so that a concurrent
+        # write always invalidates the feed built here
+        if is_global:
+            versions = self._read_scopes(["club:global"])
+            showings = showings.filter(event__club__isnull=True)
+        elif is_all:
+            versions = self._read_scopes(["events"])
+        else:
+            person_id = (
+                Profile.objects.filter(uuid_secret=user_secretuuid)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+            versions = self._read_scopes([f"favorites:{person_id}"])
+            club_ids = list(
+                Favorite.objects.filter(person_id=person_id).values_list(
+                    "club_id", flat=True
+                )
+            )
+            scopes = [f"club:{club_id}" for club_id in club_ids]
+            q = Q(event__club_id__in=club_ids)
+            if is_global is None:
+                scopes.append("club:global")
+                q |= Q(event__club__isnull=True)
+            versions.update(self._read_scopes(scopes))
+            showings = showings.filter(q)
+
+        showings = list(
+            showings.select_related("event", "event__club").order_by("start_time", "id")
+        )
+        keys = [self._block_key(showing) for showing in showings]
+        blocks = self.backend.get_many(keys)
+        missing = {
+            key: self.render(showing)
+            for key, showing in zip(keys, showings)
+            if key not in blocks
+        }
+        if missing:
+            self.backend.set_many(missing, self.BLOCK_TIMEOUT)
+            blocks.update(missing)
+
+        header, footer = self._header()
+        body = "\r\n".join([header, *(blocks[key] for key in keys), footer])
+        etag = f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
+
+        # keep the previous modification time if the content did not change
+        if previous is not None and previous["etag"] == etag:
+            last_modified = previous["last_modified"]
+        else:
+            last_modified = int(time.time())
+
+        return {
+            "versions": versions,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        }
+
+    def get(self, user_secretuuid, is_global=None, is_all=False):
+        """
+        Return the body, ETag and modification timestamp of a user's feed.
+        """
+        key = self._key("feed", user_secretuuid, is_global, is_all)
+        feed = self.backend.get(key)
+        if feed is not None and self._read_scopes(feed["versions"]) == feed["versions"]:
+            return feed
+
+        feed = self.build(user_secretuuid, is_global, is_all, previous=feed)
+        self.backend.set(key, feed, self.TIMEOUT)
+        return feed
+
+
+calendar_feed_cache = CalendarFeedCache()
+
+
+class SiteOptionsCache:
+    """
+    Cache of the site-wide options that the frontend loads on every page.
+
+    The public options and the boundaries of upcoming fairs are stored in the shared
+    cache under a version token, which is replaced whenever an option or fair is
+    saved. Every process also keeps the last payload it loaded, so that serving the
+    options only reads the token. The fair flags that depend on the current time are
+    derived from the cached fair boundaries on each request.
+    """
+
+    PREFIX = "options"
+    TIMEOUT = 24 * 60 * 60
+
+    # fairs are shown from a week before they start until shortly after they end,
+    # and are marked as open a few minutes after they start
+    LOOKAHEAD = datetime.timedelta(weeks=1)
+    GRACE = datetime.timedelta(minutes=15)
+    OPEN_DELAY = datetime.timedelta(minutes=3)
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._local = None
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, *parts):
+        return ":".join([self.PREFIX, *(str(part) for part in parts)])
+
+    def invalidate(self):
+        self.backend.set(self._key("version"), uuid.uuid4().hex, None)
+
+    def _get_version(self):
+        key = self._key("version")
+        version = self.backend.get(key)
+        if version is None:
+            self.backend.add(key, uuid.uuid4().hex, None)
+            version = self.backend.get(key)
+        return version
+
+    def build(self, version):
+        from clubs.models import ClubFair, Option
+
+        fairs = ClubFair.objects.filter(
+            end_time__gte=timezone.now() - self.GRACE
+        ).order_by("start_time", "id")
+        return {
+            "version": version,
+            "options": dict(
+                Option.objects.filter(public=True).values_list("key", "value")
+            ),
+            "fairs": list(
+                fairs.values(
+                    "id",
+                    "name",
+                    "contact",
+                    "virtual",
+                    "start_time",
+                    "end_time",
+                    "registration_start_time",
+                )
+            ),
+        }
+
+    def get_payload(self):
+        """
+        Return the public options and upcoming fairs, loading them from the shared
+        cache or the database only if they have changed since the last call.
+        """
+        # the token is read before the rows it guards, so that a concurrent
+        # write always invalidates the payload built here
+        version = self._get_version()
+        local = self._local
+        if local is not None and version is not None and local["version"] == version:
+            return local
+
+        key = self._key("payload")
+        payload = self.backend.get(key)
+        if payload is None or version is None or payload["version"] != version:
+            payload = self.build(version)
+            if version is not None:
+                self.backend.set(key, payload, self.TIMEOUT)
+
+        self._local = payload
+        return payload
+
+    def get(self, now=None):
+        """
+        Return the site options at the given time, along with their ETag.
+        """
+        now = now or timezone.now()
+        payload = self.get_payload()
+        options = dict(payload["options"])
+
+        fair = next(
+            (
+                fair
+                for fair in payload["fairs"]
+                if fair["end_time"] >= now - self.GRACE
+                and (
+                    fair["start_time"] <= now + self.LOOKAHEAD
+                    or (
+                        fair["registration_start_time"] is not None
+                        and fair["registration_start_time"] <= now
+                    )
+                )
+            ),
+            None,
+        )
+        if fair is not None:
+            happening = fair["start_time"] <= now - self.OPEN_DELAY
+            close = fair["start_time"] >= now - self.LOOKAHEAD
+            options["FAIR_NAME"] = fair["name"]
+            options["FAIR_CONTACT"] = fair["contact"]
+            options["FAIR_ID"] = fair["id"]
+            options["FAIR_OPEN"] = happening
+            options["FAIR_VIRTUAL"] = fair["virtual"]
+            options["PRE_FAIR"] = not happening and close
+        else:
+            options["FAIR_OPEN"] = False
+            options["PRE_FAIR"] = False
+
+        etag = '"{}-{}-{:d}{:d}"'.format(
+            payload["version"],
+            fair["id"] if fair is not None else 0,
+            options["FAIR_OPEN"],
+            options["PRE_FAIR"],
+        )
+        return options, etag
+
+
+site_options_cache = SiteOptionsCache()
+
+
+class ApplicationSubmissionCache:
+    """
+    Cache of the serialized submissions to club applications, which officers load
+    while reviewing an application.
+
+    Every submission is cached as its own fragment, so that listing submissions only
+    serializes the ones that are missing. Status and reason changes patch the
+    fragments they touch under a lock, and new responses drop only the fragment of
+    their submission. Every write bumps a revision of the application, so that
+    fragments serialized from rows read before the write are not stored.
+    """
+
+    PREFIX = "applicationsubmissions"
+    TIMEOUT = 60 * 60
+    LOCK_TIMEOUT = 5
+    LOCK_RETRIES = 10
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, *parts):
+        return ":".join([self.PREFIX, *(str(part) for part in parts)])
+
+    def _fragment_key(self, submission_id):
+        return self._key("fragment", submission_id)
+
+    def _acquire_lock(self, application_id):
+        for _ in range(self.LOCK_RETRIES):
+            if self.backend.add(
+                self._key(application_id, "lock"), 1, self.LOCK_TIMEOUT
+            ):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _release_lock(self, application_id):
+        self.backend.delete(self._key(application_id, "lock"))
+
+    def get_revision(self, application_id):
+        return int(self.backend.get(self._key(application_id, "revision"), 0))
+
+    def _bump_revision(self, application_id):
+        key = self._key(application_id, "revision")
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.set(key, 1, None)
+
+    def represent(self, application_id, submission_ids, load):
+        """
+        Return the serialized submissions with the given ids, in the same order.
+
+        The submissions without a cached fragment are serialized by calling load
+        with their ids. Their fragments are only stored if no submission to the
+        application was written in the meantime.
+        """
+        # the revision is read before the rows it guards, so that a concurrent
+        # write always prevents storing fragments built here
+        revision = self.get_revision(application_id)
+        keys = {pk: self._fragment_key(pk) for pk in submission_ids}
+        cached = self.backend.get_many(list(keys.values())) if keys else {}
+        rows = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+        missing = [pk for pk in keys if pk not in rows]
+        if missing:
+            loaded = {row["pk"]: row for row in load(missing)}
+            if self.get_revision(application_id) == revision:
+                self.backend.set_many(
+                    {keys[pk]: row for pk, row in loaded.items()}, self.TIMEOUT
+                )
+            rows.update(loaded)
+
+        return [rows[pk] for pk in keys if pk in rows]
+
+    def patch(self, application_id, changes):
+        """
+        Apply the changed fields, keyed by submission id, to the cached fragments of
+        those submissions. The fragments are dropped if they cannot be locked.
+        """
+        keys = {pk: self._fragment_key(pk) for pk in changes}
+        if not keys:
+            return
+
+        self._bump_revision(application_id)
+        if not self._acquire_lock(application_id):
+            self.backend.delete_many(list(keys.values()))
+            return
+
+        try:
+            cached = self.backend.get_many(list(keys.values()))
+            patched = {
+                key: {**cached[key], **changes[pk]}
+                for pk, key in keys.items()
+                if key in cached
+            }
+            if patched:
+                self.backend.set_many(patched, self.TIMEOUT)
+        finally:
+            self._release_lock(application_id)
+
+    def invalidate(self, application_id, submission_ids):
+        """
+        Drop the cached fragments of the given submissions.
+        """
+        self._bump_revision(application_id)
+        self.backend.delete_many([self._fragment_key(pk) for pk in submission_ids])
+
+
+application_submission_cache = ApplicationSubmissionCache()
+
+
+class ClubApprovedSnapshots:
+    """
+    Store of the last approved version of every club, used to show ghost clubs
+    with pending changes to users that may not see those changes yet.
+
+    A snapshot of the column values is written once the transaction that saved an
+    approved club commits.
+    Snapshots that are missing from the store are rebuilt from the club history in
+    one query. The fragment cache then keeps the serialized form of each snapshot.
+    """
+
+    PREFIX = "clubs:approved"
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, club_id):
+        return f"{self.PREFIX}:{club_id}"
+
+    @staticmethod
+    def _get_state(instance):
+        return {
+            field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+        }
+
+    def save(self, club):
+        """
+        Store the current column values of an approved club after the transaction
+        commits, so that a rolled back approval never becomes visible.
+        """
+        key, state = self._key(club.pk), self._get_state(club)
+        transaction.on_commit(lambda: self.backend.set(key, state, None))
+
+    def _load_history(self, club_ids):
+        from clubs.models import Club
+
+        history = Club.history.model.objects
+        latest = (
+            history.filter(id=OuterRef("id"), approved=True)
+            .order_by("-approved_on", "-history_date")
+            .values("history_id")[:1]
+        )
+        records = history.filter(id__in=club_ids, approved=True).filter(
+            history_id=Subquery(latest)
+        )
+        return {record.id: self._get_state(record.instance) for record in records}
+
+    def get_many(self, clubs):
+        """
+        Return the last approved version of each club that has one, keyed by id.
+
+        Attributes loaded for the current version of a club that are not columns,
+        such as prefetched relations, are copied over to its approved version.
+        """
+        from clubs.models import Club
+
+        keys = {club.pk: self._key(club.pk) for club in clubs}
+        found = self.backend.get_many(list(keys.values()))
+        states = {club_id: found[key] for club_id, key in keys.items() if key in found}
+
+        missing = [club_id for club_id in keys if club_id not in states]
+        if missing:
+            loaded = self._load_history(missing)
+            if loaded:
+                self.backend.set_many(
+                    {self._key(club_id): state for club_id, state in loaded.items()},
+                    None,
+                )
+            states.update(loaded)
+
+        approved = {}
+        for club in clubs:
+            state = states.get(club.pk)
+            if state is None:
+                continue
+            instance = Club(**state)
+            for name, value in club.__dict__.items():
+                if name != "_state" and name not in state:
+                    setattr(instance, name, value)
+            instance._state.adding = False
+            instance._state.db = club._state.db
+            instance._is_historical = True
+            approved[club.pk] = instance
+        return approved
+
+
+club_approved_snapshots = ClubApprovedSnapshots()
@@ -9,7 +9,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
 from django.core.management import call_command
 
-from clubs.models import Club
+from clubs.models import Club, ExportJob
 from clubs.views import get_scripts, parse_script_parameters
 
 
@@ -118,8 +118,11 @@ class ExecuteScriptConsumer(AsyncWebsocketConsumer):
 class LiveEventConsumer(AsyncWebsocketConsumer):
     @log_errors
     async def connect(self):
-        event_id = self.scope["url_route"]["kwargs"]["event_id"]
-        self.group_name = f"events-live-{event_id}"
+        kwargs = self.scope["url_route"]["kwargs"]
+        if "fair_id" in kwargs:
+            self.group_name = f"fairs-live-{kwargs['fair_id']}"
+        else:
+            self.group_name = f"events-live-{kwargs['event_id']}"
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
@@ -130,7 +133,44 @@ class LiveEventConsumer(AsyncWebsocketConsumer):
 
     @log_errors
     async def join_leave(self, event):
-        await self.send(text_data=json.dumps({"update": True}))
+        data = {"update": True}
+        if "metrics" in event:
+            data["metrics"] = event["metrics"]
+        await self.send(text_data=json.dumps(data))
+
+    @log_errors
+    async def live_metrics(self, event):
+        await self.send(text_data=json.dumps({"metrics": event["metrics"]}))
+
+
+class ExportJobConsumer(AsyncWebsocketConsumer):
+    @database_sync_to_async
+    def can_view_export(self, user, job_id):
+        if not user.is_authenticated:
+            return False
+        if user.is_superuser:
+            return ExportJob.objects.filter(id=job_id).exists()
+        return ExportJob.objects.filter(id=job_id, creator=user).exists()
+
+    @log_errors
+    async def connect(self):
+        job_id = self.scope["url_route"]["kwargs"]["job_id"]
+        self.group_name = f"exports-{job_id}"
+        if not await self.can_view_export(self.scope["user"], job_id):
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    @log_errors
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    @log_errors
+    async def export_progress(self, event):
+        data = {k: v for k, v in event.items() if k != "type"}
+        await self.send(text_data=json.dumps(data))
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
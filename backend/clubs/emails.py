@@ -0,0 +1,98 @@
+import os
+import re
+
+import yaml
+from django.conf import settings
+from django.template import engines
+
+
+# email template metadata comments, the subject should be the first line
+EMAIL_SUBJECT_REGEX = re.compile(r"\s*<!--\s*SUBJECT:\s*(.*?)\s*-->", re.I)
+EMAIL_TYPES_REGEX = re.compile(r"\s*<!--\s*TYPES:\s*(.*?)\s*-->", re.DOTALL)
+
+
+class EmailTemplate:
+    """
+    An email template compiled with its SUBJECT and TYPES comments already parsed
+    out of the source, so that rendering it does not need to scan the output.
+    """
+
+    def __init__(self, name, template, subject=None, types=None):
+        self.name = name
+        self.template = template
+        self.subject = subject
+        self.types = types
+
+    def render(self, context):
+        """
+        Return the subject in the template, if any, and the rendered html.
+        """
+        subject = None
+        if self.subject is not None:
+            subject = self.subject.render(context).strip()
+        return subject, self.template.render(context)
+
+
+class EmailTemplateRegistry:
+    """
+    Registry of compiled email templates for each branding, loaded once per
+    process when the app starts instead of on every send.
+    """
+
+    def __init__(self):
+        self._templates = {}
+
+    @staticmethod
+    def get_prefix():
+        return {"fyh": "fyh_emails"}.get(settings.BRANDING, "emails")
+
+    def names(self, prefix=None):
+        """
+        Return the names of the email templates that exist for the branding.
+        """
+        prefix = prefix or self.get_prefix()
+        path = os.path.join(settings.BASE_DIR, "templates", prefix)
+        files = os.listdir(path)
+        return sorted(f.rsplit(".", 1)[0] for f in files if f.endswith(".html"))
+
+    def compile(self, name, prefix=None):
+        prefix = prefix or self.get_prefix()
+        engine = engines["django"]
+        source = engine.get_template(f"{prefix}/{name}.html").template.source
+
+        subject = None
+        match = EMAIL_SUBJECT_REGEX.search(source)
+        if match is not None:
+            subject = engine.from_string(match.group(1))
+            source = EMAIL_SUBJECT_REGEX.sub("", source, count=1)
+
+        types = None
+        match = EMAIL_TYPES_REGEX.search(source)
+        if match is not None:
+            types = yaml.safe_load(match.group(1).strip())
+            source = EMAIL_TYPES_REGEX.sub("", source, count=1)
+
+        return EmailTemplate(name, engine.from_string(source), subject, types)
+
+    def load(self, prefix=None):
+        prefix = prefix or self.get_prefix()
+        for name in self.names(prefix):
+            self._templates[(prefix, name)] = self.compile(name, prefix)
+
+    def get(self, name, prefix=None):
+        """
+        Return the compiled email template with the given name, raising
+        TemplateDoesNotExist if there is no such template.
+        """
+        prefix = prefix or self.get_prefix()
+        template = self._templates.get((prefix, name))
+        if template is None:
+            template = self.compile(name, prefix)
+            self._templates[(prefix, name)] = template
+        return template
+
+    def clear(self):
+        self._templates.clear()
+
+
+email_templates = EmailTemplateRegistry()
@@ -3,7 +3,7 @@ from collections import OrderedDict
 from urllib.parse import quote
 
 from rest_framework import filters
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -27,6 +27,30 @@ class OptionalPageNumberPagination(PageNumberPagination):
         return super().paginate_queryset(queryset, request, view)
 
 
+class OptionalCursorPagination(CursorPagination):
+    """
+    Optional cursor pagination, ordered by primary key, that does not paginate the
+    response if the user does not specify a cursor or page size.
+    """
+
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "pk"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            not {
+                self.cursor_query_param,
+                self.page_size_query_param,
+            }
+            & request.query_params.keys()
+        ):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
 class RandomPageNumberPagination(OptionalPageNumberPagination):
     """
     Custom pagination that supports randomly sorting objects with pagination.
@@ -12,6 +12,8 @@ from clubs.models import (
     Club,
     ClubApplication,
     Membership,
+    OutboxBatch,
+    OutboxEmail,
     RegistrationQueueSettings,
     send_mail_helper,
 )
@@ -25,15 +27,22 @@ class Command(BaseCommand):
     web_execute = True
 
     def handle(self, *args, **kwargs):
-        try:
-            self.send_approval_queue_reminder()
-        except Exception:
-            self.stderr.write(traceback.format_exc())
-
-        try:
-            self.send_application_notifications()
-        except Exception:
-            self.stderr.write(traceback.format_exc())
+        # queue every email and deliver them together over one connection,
+        # anything that fails is retried by the send_outbox command
+        with OutboxBatch.collect("daily_notifications") as batch:
+            try:
+                self.send_approval_queue_reminder()
+            except Exception:
+                self.stderr.write(traceback.format_exc())
+
+            try:
+                self.send_application_notifications()
+            except Exception:
+                self.stderr.write(traceback.format_exc())
+
+        sent, failed = OutboxEmail.objects.send_pending(batch=batch)
+        if failed:
+            self.stderr.write(f"Failed to deliver {failed} email(s), will retry.")
 
     def send_application_notifications(self):
         """
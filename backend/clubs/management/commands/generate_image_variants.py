@@ -0,0 +1,228 @@
+import datetime
+import hashlib
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from clubs.caching import club_list_cache
+from clubs.models import Club, Event, ImageSource, ImageVariant, Profile
+from clubs.utils import generate_image_variants
+
+
+# models with an uploaded image that variants are generated for
+IMAGE_MODELS = [Club, Event, Profile]
+
+# image sources that no object has used for this long are removed
+ORPHAN_AGE = datetime.timedelta(days=1)
+
+# only one process generates variants at a time, the lock is renewed after every
+# batch and expires after this many seconds if the process holding it stops
+LOCK_KEY = "image_variants:lock"
+LOCK_TIMEOUT = 10 * 60
+
+
+def process_image(content):
+    """
+    Generate the variants for the contents of an image file, returning None if the
+    file cannot be read as an image. This does not touch the database, so that it
+    can run in a worker thread.
+    """
+    if content.lstrip().startswith((b"<?xml", b"<svg")):
+        return None
+    try:
+        return generate_image_variants(content)
+    except (OSError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP, JPEG and PNG variants for club, event and profile "
+        "images that do not have them yet, including images uploaded before variants "
+        "existed. Run with --loop to keep processing new uploads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and process new images shortly after they are uploaded.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="The number of seconds to wait between checks for new images.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="The number of images to resize at the same time.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="The number of objects to process before linking their variants.",
+        )
+
+    def get_pending(self, model, after, limit, unreadable):
+        return list(
+            model.objects.filter(image_source__isnull=True, pk__gt=after)
+            .exclude(Q(image="") | Q(image__isnull=True))
+            .exclude(pk__in=unreadable)
+            .order_by("pk")[:limit]
+        )
+
+    def read_image(self, obj):
+        with obj.image.open("rb") as f:
+            return f.read()
+
+    def create_source(self, content_hash, result):
+        """
+        Store the generated variants of an image. Images that could not be processed
+        still get a source without variants, so that they are not retried.
+        """
+        with transaction.atomic():
+            source, created = ImageSource.objects.get_or_create(
+                content_hash=content_hash
+            )
+            if not created or result is None:
+                return source
+
+            source.width, source.height, variants = result
+            source.save(update_fields=["width", "height"])
+            for width, fmt, data in variants:
+                variant = ImageVariant(
+                    source=source, width=width, format=fmt, size=len(data)
+                )
+                variant.file.save(f"{width}.{fmt}", ContentFile(data), save=False)
+                variant.save()
+        return source
+
+    def link(self, model, obj, source):
+        # skip objects whose image has been replaced in the meantime
+        updated = model.objects.filter(
+            pk=obj.pk, image=obj.image.name, image_source__isnull=True
+        ).update(image_source=source)
+        if updated and model is Club:
+            obj.image_source = source
+            club_list_cache.invalidate_club(obj)
+        return updated
+
+    def process_batch(self, executor, model, objects, unreadable):
+        # hash every image first so that known images are never processed again
+        pending = {}
+        for obj in objects:
+            try:
+                content = self.read_image(obj)
+            except Exception:
+                unreadable.add(obj.pk)
+                self.stderr.write(
+                    f"Could not read image for {model.__name__} {obj.pk}:\n"
+                    f"{traceback.format_exc()}"
+                )
+                continue
+            content_hash = hashlib.sha256(content).hexdigest()
+            pending.setdefault(content_hash, (content, []))[1].append(obj)
+
+        sources = {
+            source.content_hash: source
+            for source in ImageSource.objects.filter(content_hash__in=pending.keys())
+        }
+        futures = {
+            content_hash: executor.submit(process_image, content)
+            for content_hash, (content, _) in pending.items()
+            if content_hash not in sources
+        }
+
+        linked = 0
+        for content_hash, (_, objs) in pending.items():
+            source = sources.get(content_hash)
+            if source is None:
+                result = futures[content_hash].result()
+                source = self.create_source(content_hash, result)
+            for obj in objs:
+                linked += self.link(model, obj, source)
+        return linked, len(futures)
+
+    def remove_orphans(self):
+        cutoff = timezone.now() - ORPHAN_AGE
+        orphans = ImageSource.objects.filter(created_at__lt=cutoff)
+        for model in IMAGE_MODELS:
+            orphans = orphans.exclude(
+                pk__in=model.objects.filter(image_source__isnull=False).values(
+                    "image_source"
+                )
+            )
+        for variant in ImageVariant.objects.filter(source__in=orphans):
+            variant.file.delete(save=False)
+        orphans.delete()
+
+    def process_pending(self, executor, unreadable, batch_size):
+        """
+        Generate and link the variants for every pending image, returning the
+        number of objects that were linked.
+        """
+        self.remove_orphans()
+
+        total = 0
+        for model in IMAGE_MODELS:
+            start = time.monotonic()
+            linked = generated = last = 0
+            while objects := self.get_pending(
+                model, last, batch_size, unreadable[model]
+            ):
+                last = objects[-1].pk
+                count, new = self.process_batch(
+                    executor, model, objects, unreadable[model]
+                )
+                linked += count
+                generated += new
+                cache.touch(LOCK_KEY, LOCK_TIMEOUT)
+            total += linked
+
+            if linked:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Linked {linked} {model.__name__} image(s) to "
+                        f"variants, processed {generated} new image(s) in "
+                        f"{time.monotonic() - start:.1f}s."
+                    )
+                )
+        return total
+
+    def handle(self, *args, **kwargs):
+        # images that could not be read are not retried until the command restarts
+        unreadable = {model: set() for model in IMAGE_MODELS}
+        token = str(uuid.uuid4())
+
+        with ThreadPoolExecutor(max_workers=max(kwargs["workers"], 1)) as executor:
+            while True:
+                if cache.add(LOCK_KEY, token, LOCK_TIMEOUT):
+                    try:
+                        total = self.process_pending(
+                            executor, unreadable, kwargs["batch_size"]
+                        )
+                    finally:
+                        if cache.get(LOCK_KEY) == token:
+                            cache.delete(LOCK_KEY)
+                    if not kwargs["loop"] and not total:
+                        self.stdout.write("There are no images to process.")
+                elif not kwargs["loop"]:
+                    self.stdout.write(
+                        "Images are already being processed by another process."
+                    )
+
+                if not kwargs["loop"]:
+                    break
+                time.sleep(kwargs["interval"])
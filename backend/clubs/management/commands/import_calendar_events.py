@@ -1,27 +1,84 @@
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from django.core.management.base import BaseCommand
+from ics import Calendar
 
-from clubs.models import Club
+from clubs.models import Club, ICSImportState
+
+
+def fetch_calendar(state, force):
+    """
+    Download and parse a club calendar, returning None if it has not changed.
+    This does not touch the database, so that it can run in a worker thread.
+    """
+    text = state.fetch(force=force)
+    return None if text is None else Calendar(text)
 
 
 class Command(BaseCommand):
     help = "Imports ICS Calendar events for each club at a set frequency."
     web_execute = True
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="The number of calendars to download at the same time.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Import every calendar, even if it has not changed since the last "
+            "import.",
+        )
+
     def handle(self, *args, **kwargs):
-        count = 0
-        for club in Club.objects.filter(ics_import_url__isnull=False).exclude(
-            ics_import_url=""
-        ):
-            try:
-                club.add_ics_events()
-                count += 1
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Could not import ICS events for {club.code}: {e}"
-                    )
+        clubs = list(
+            Club.objects.filter(ics_import_url__isnull=False).exclude(ics_import_url="")
+        )
+        states = {
+            state.club_id: state
+            for state in ICSImportState.objects.filter(club__in=clubs)
+        }
+        for club in clubs:
+            state = states.setdefault(club.pk, ICSImportState(club=club))
+            state.club = club
+
+        # calendars are downloaded and parsed concurrently,
+        # but imported one at a time on the main thread
+        with ThreadPoolExecutor(max_workers=max(kwargs["workers"], 1)) as executor:
+            futures = [
+                (
+                    club,
+                    executor.submit(fetch_calendar, states[club.pk], kwargs["force"]),
                 )
-                self.stdout.write(self.style.ERROR(traceback.format_exc()))
-        self.stdout.write(self.style.SUCCESS(f"Imported {count} ICS calendars!"))
+                for club in clubs
+            ]
+
+            count = 0
+            unchanged = 0
+            for club, future in futures:
+                try:
+                    calendar = future.result()
+                    if calendar is None:
+                        unchanged += 1
+                        continue
+                    club.add_ics_events(calendar)
+                    states[club.pk].save()
+                    count += 1
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(
+                            f"Could not import ICS events for {club.code}: {e}"
+                        )
+                    )
+                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {count} ICS calendars! "
+                f"Skipped {unchanged} unchanged calendars."
+            )
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from clubs.models import Event
+from clubs.utils import get_zoom_meeting_id
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the Zoom meeting id of every event from its url, "
+        "so that Zoom webhooks can find their event with one lookup."
+    )
+    web_execute = True
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of events to update in each query.",
+        )
+
+    def handle(self, *args, **kwargs):
+        changed = []
+        for event in (
+            Event.objects.exclude(url__isnull=True, zoom_meeting_id="")
+            .only("id", "url", "zoom_meeting_id")
+            .iterator(chunk_size=kwargs["batch_size"])
+        ):
+            meeting_id = get_zoom_meeting_id(event.url)
+            if event.zoom_meeting_id != meeting_id:
+                event.zoom_meeting_id = meeting_id
+                changed.append(event)
+
+        Event.objects.bulk_update(
+            changed, ["zoom_meeting_id"], batch_size=kwargs["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated the Zoom meeting id of {len(changed)} events!")
+        )
@@ -0,0 +1,46 @@
+import time
+import traceback
+
+from django.core.management.base import BaseCommand
+
+from clubs.models import ZoomWebhook
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the Zoom webhooks that are still staged to the meeting visits. "
+        "Run with --loop to keep applying webhooks as they are received."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and apply new webhooks shortly after they are received.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="The number of seconds to wait between checks for new webhooks.",
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            count = 0
+            try:
+                while applied := ZoomWebhook.ingest_staged():
+                    count += applied
+            except Exception:
+                self.stderr.write(
+                    f"Failed to apply Zoom webhooks:\n{traceback.format_exc()}"
+                )
+
+            if count or not kwargs["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Processed {count} Zoom webhook(s).")
+                )
+
+            if not kwargs["loop"]:
+                break
+            time.sleep(kwargs["interval"])
@@ -1,13 +1,24 @@
 import datetime
-from math import floor
 
 import bleach
 import numpy as np
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
-from django.db.models import DurationField, ExpressionWrapper, F
+from django.db.models import Count, F, Q
+from django.db.models.functions import Length
 from django.utils import timezone
 
-from clubs.models import Club, ClubFair, EventShowing, Membership, RankingWeights
+from clubs.caching import club_list_cache
+from clubs.models import (
+    Club,
+    ClubApplication,
+    ClubFairRegistration,
+    EventShowing,
+    Favorite,
+    Membership,
+    RankingWeights,
+    Testimonial,
+)
 
 
 # Default weight values mirroring the historic constant scoring system
@@ -42,6 +53,60 @@ DEFAULT_WEIGHTS = {
 }
 
 
+# Each weight is multiplied by one feature column, in this order
+RANK_FEATURES = list(DEFAULT_WEIGHTS)
+
+RANK_STATE_CACHE_KEY = "rank:state"
+
+SOCIAL_FIELDS = [
+    "facebook",
+    "website",
+    "twitter",
+    "instagram",
+    "linkedin",
+    "github",
+    "youtube",
+]
+
+
+def count_by_club(queryset, index, field="club_id"):
+    """
+    Return an array with the number of rows in the queryset for each club.
+    """
+    counts = np.zeros(len(index))
+    rows = queryset.order_by().values(field).annotate(total=Count("*"))
+    for row in rows.values_list(field, "total"):
+        if row[0] in index:
+            counts[index[row[0]]] = row[1]
+    return counts
+
+
+def clubs_in(queryset, index, field="club_id"):
+    """
+    Return a boolean array of the clubs that appear in the queryset.
+    """
+    found = np.zeros(len(index), dtype=bool)
+    for club_id in queryset.order_by().values_list(field, flat=True).distinct():
+        if club_id in index:
+            found[index[club_id]] = True
+    return found
+
+
+def get_description_features(description):
+    """
+    Return the image and length features for a club description.
+    """
+    cleaned_description = bleach.clean(
+        description, tags=[], attributes={}, styles=[], strip=True
+    ).strip()
+    return [
+        "<img" in description or "<iframe" in description,
+        len(cleaned_description) > 25,
+        len(cleaned_description) > 250,
+        len(cleaned_description) > 1000,
+    ]
+
+
 class Command(BaseCommand):
     help = (
         "Precomputes ranking information for all clubs on Penn Clubs. "
@@ -51,9 +116,16 @@ class Command(BaseCommand):
     )
     web_execute = True
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only rescore clubs whose ranking inputs changed since the last run.",
+        )
+
     def handle(self, *args, **kwargs):
         self.set_recruiting_statuses()
-        self.rank()
+        self.rank(incremental=kwargs["incremental"])
 
     def set_recruiting_statuses(self):
         """
@@ -91,8 +163,168 @@ class Command(BaseCommand):
             )
         )
 
-    def rank(self):
-        count = 0
+    def get_event_features(self, index, now, window, min_description_length):
+        """
+        Return whether each club has a short showing in the window, and whether all
+        of the events with a showing in the window are also well described.
+        """
+        showings = EventShowing.objects.filter(
+            event__club__isnull=False,
+            end_time__gte=now,
+            start_time__lte=now + window,
+        ).annotate(description_length=Length("event__description"))
+        good = Q(description_length__gte=min_description_length) & ~Q(
+            event__description="Replace this description!"
+        )
+        rows = (
+            showings.order_by()
+            .values("event__club_id")
+            .annotate(
+                short=Count(
+                    "id",
+                    filter=Q(
+                        end_time__lt=F("start_time") + datetime.timedelta(hours=16)
+                    ),
+                ),
+                bad=Count("id", filter=~good),
+            )
+        )
+
+        base = np.zeros(len(index), dtype=bool)
+        well_described = np.zeros(len(index), dtype=bool)
+        for club_id, short, bad in rows.values_list("event__club_id", "short", "bad"):
+            if club_id in index and short > 0:
+                base[index[club_id]] = True
+                well_described[index[club_id]] = bad == 0
+        return base, well_described
+
+    def get_features(self, now, previous=None):
+        """
+        Return the ids of all clubs and a matrix with one column per ranking
+        feature, excluding the random column.
+
+        If the previous run is given, descriptions are only cleaned for clubs that
+        were saved since then.
+        """
+        rows = list(
+            Club.objects.order_by("id").values_list(
+                "id",
+                "active",
+                "subtitle",
+                "email",
+                "email_public",
+                "how_to_get_involved",
+                "updated_at",
+                *SOCIAL_FIELDS,
+            )
+        )
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        index = {club_id: i for i, club_id in enumerate(ids.tolist())}
+        features = np.zeros((len(ids), len(RANK_FEATURES)))
+        column = {key: i for i, key in enumerate(RANK_FEATURES)}
+
+        def set_column(key, values):
+            features[:, column[key]] = values
+
+        active = np.array([row[1] for row in rows], dtype=bool)
+        updated_at = np.array([row[6].timestamp() for row in rows])
+        set_column("inactive_penalty", ~active)
+
+        favorites = count_by_club(Favorite.objects, index)
+        set_column("favorites_per", favorites)
+
+        tags = count_by_club(Club.tags.through.objects, index)
+        set_column("tags_good", (tags >= 3) & (tags <= 7))
+        set_column("tags_many", tags > 7)
+
+        officers = count_by_club(
+            Membership.objects.filter(active=True, role__lte=Membership.ROLE_OFFICER),
+            index,
+        )
+        set_column("officer_bonus", officers >= 3)
+
+        members = count_by_club(
+            Membership.objects.filter(active=True, role__gte=Membership.ROLE_MEMBER),
+            index,
+        )
+        set_column("member_base", members >= 3)
+        set_column("member_per", members)
+
+        # an image field is never None, so every club has always received this bonus
+        set_column("logo_bonus", 1)
+
+        subtitles = [row[2].strip() for row in rows]
+        subtitle_bad = np.array([s.lower() == "your subtitle here" for s in subtitles])
+        set_column("subtitle_bad", subtitle_bad)
+        set_column(
+            "subtitle_good", ~subtitle_bad & np.array([len(s) > 3 for s in subtitles])
+        )
+
+        description_keys = ["images_bonus", "desc_short", "desc_med", "desc_long"]
+        description_columns = [column[key] for key in description_keys]
+        stale = np.ones(len(ids), dtype=bool)
+        if previous is not None:
+            previous_index = {
+                club_id: i for i, club_id in enumerate(previous["ids"].tolist())
+            }
+            saved = updated_at > previous["now"].timestamp()
+            for i, club_id in enumerate(ids.tolist()):
+                if club_id in previous_index and not saved[i]:
+                    features[i, description_columns] = previous["features"][
+                        previous_index[club_id], description_columns
+                    ]
+                    stale[i] = False
+        descriptions = Club.objects.filter(id__in=ids[stale].tolist()).values_list(
+            "id", "description"
+        )
+        for club_id, description in descriptions.iterator():
+            features[index[club_id], description_columns] = get_description_features(
+                description
+            )
+
+        set_column(
+            "fair_bonus",
+            clubs_in(
+                ClubFairRegistration.objects.filter(fair__end_time__gte=now),
+                index,
+            ),
+        )
+        set_column(
+            "application_bonus",
+            clubs_in(
+                ClubApplication.objects.filter(
+                    application_start_time__lte=now, application_end_time__gte=now
+                ),
+                index,
+            ),
+        )
+
+        base, good = self.get_event_features(index, now, datetime.timedelta(days=1), 3)
+        set_column("today_event_base", base)
+        set_column("today_event_good", good)
+        base, good = self.get_event_features(index, now, datetime.timedelta(weeks=1), 4)
+        set_column("week_event_base", base)
+        set_column("week_event_good", good)
+
+        set_column("email_bonus", [bool(row[3]) and row[4] for row in rows])
+        set_column(
+            "social_bonus",
+            [sum(1 for field in row[7:] if field) >= 2 for row in rows],
+        )
+        set_column("howto_penalty", [len(row[5].strip()) <= 3 for row in rows])
+        set_column(
+            "outdated_penalty",
+            updated_at < (now - datetime.timedelta(days=30 * 8)).timestamp(),
+        )
+
+        testimonials = count_by_club(Testimonial.objects, index)
+        set_column("testimonial_one", testimonials >= 1)
+        set_column("testimonial_three", testimonials >= 3)
+
+        return ids, features
+
+    def rank(self, incremental=False):
+        now = timezone.now()
 
         # Retrieve ranking weights singleton
         weights = RankingWeights.get()
@@ -104,208 +336,59 @@ class Command(BaseCommand):
                 return val
             return DEFAULT_WEIGHTS.get(key, 1.0)
 
-        clubs = Club.objects.prefetch_related(
-            "favorite_set",
-            "tags",
-            "membership_set",
-            "clubapplication_set",
-            "events",
-            "events__eventshowing_set",
-            "testimonials",
-        ).all()
-
-        for club in clubs:
-            ranking = 0
-
-            # inactive clubs get deprioritized
-            if not club.active:
-                ranking += _w("inactive_penalty")
-
-            # small points for favorites
-            ranking += club.favorite_set.count() * _w("favorites_per")
-
-            # points for minimum amount of tags
-            tags = club.tags.count()
-            if 3 <= tags <= 7:
-                ranking += _w("tags_good")
-            elif tags > 7:
-                ranking += _w("tags_many")
-
-            # lots of points for officers
-            officers = club.membership_set.filter(
-                active=True, role__lte=Membership.ROLE_OFFICER
-            ).count()
-            if officers >= 3:
-                ranking += _w("officer_bonus")
-
-            # ordinary members give even more points
-            members = club.membership_set.filter(
-                active=True, role__gte=Membership.ROLE_MEMBER
-            ).count()
-            if members >= 3:
-                ranking += _w("member_base")
-            ranking += members * _w("member_per")
-
-            # points for logo
-            if club.image is not None:
-                ranking += _w("logo_bonus")
-
-            # points for subtitle
-            subtitle = club.subtitle.strip()
-            if subtitle.lower() == "your subtitle here":
-                ranking += _w("subtitle_bad")
-            elif len(subtitle) > 3:
-                ranking += _w("subtitle_good")
-
-            # images in description? awesome
-            if "<img" in club.description or "<iframe" in club.description:
-                ranking += _w("images_bonus")
-
-            # points for longer descriptions
-            cleaned_description = bleach.clean(
-                club.description, tags=[], attributes={}, styles=[], strip=True
-            ).strip()
-
-            if len(cleaned_description) > 25:
-                ranking += _w("desc_short")
-
-            if len(cleaned_description) > 250:
-                ranking += _w("desc_med")
-
-            if len(cleaned_description) > 1000:
-                ranking += _w("desc_long")
-
-            # points for fair
-            now = timezone.now()
-            if ClubFair.objects.filter(
-                end_time__gte=now, participating_clubs=club
-            ).exists():
-                ranking += _w("fair_bonus")
-
-            # points for club applications
-            if club.clubapplication_set.filter(
-                application_start_time__lte=now, application_end_time__gte=now
-            ).exists():
-                ranking += _w("application_bonus")
-
-            # points for events
-            # Get all events with showings today
-            today_showings = EventShowing.objects.filter(
-                event__club=club,
-                end_time__gte=now,
-                start_time__lte=now + datetime.timedelta(days=1),
-            )
-
-            today_events = club.events.filter(
-                pk__in=today_showings.values_list("event_id", flat=True)
-            )
-
-            if today_events.exists():
-                # Create a list of showings with duration less than 16 hours
-                short_showings = (
-                    today_showings.annotate(
-                        duration=ExpressionWrapper(
-                            F("end_time") - F("start_time"),
-                            output_field=DurationField(),
-                        )
+        weight_vector = np.array([_w(key) for key in RANK_FEATURES], dtype=float)
+
+        previous = cache.get(RANK_STATE_CACHE_KEY) if incremental else None
+        if previous is not None and previous["weights"] != weights.updated_at:
+            previous = None
+
+        ids, features = self.get_features(now, previous)
+
+        # only rescore clubs whose features changed since the previous run
+        changed = np.ones(len(ids), dtype=bool)
+        if previous is not None:
+            previous_index = {
+                club_id: i for i, club_id in enumerate(previous["ids"].tolist())
+            }
+            for i, club_id in enumerate(ids.tolist()):
+                if club_id in previous_index:
+                    changed[i] = not np.array_equal(
+                        features[i, :-1],
+                        previous["features"][previous_index[club_id], :-1],
                     )
-                    .filter(duration__lt=datetime.timedelta(hours=16))
-                    .exists()
-                )
-
-                if short_showings:
-                    ranking += _w("today_event_base")
-                    # Check for events with good descriptions and images
-                    if all(
-                        len(e.description) >= 3
-                        and e.description not in {"Replace this description!"}
-                        and e.image is not None
-                        for e in today_events
-                    ):
-                        ranking += _w("today_event_good")
-
-            # Get all events with showings in the next week
-            close_showings = EventShowing.objects.filter(
-                event__club=club,
-                end_time__gte=now,
-                start_time__lte=now + datetime.timedelta(weeks=1),
-            )
-
-            close_events = club.events.filter(
-                pk__in=close_showings.values_list("event_id", flat=True)
-            )
 
-            if close_events.exists():
-                # Create a list of showings with duration less than 16 hours
-                short_showings = (
-                    close_showings.annotate(
-                        duration=ExpressionWrapper(
-                            F("end_time") - F("start_time"),
-                            output_field=DurationField(),
-                        )
-                    )
-                    .filter(duration__lt=datetime.timedelta(hours=16))
-                    .exists()
-                )
-
-                if short_showings:
-                    ranking += _w("week_event_base")
-                    # Check for events with good descriptions and images
-                    if all(
-                        len(e.description) > 3
-                        and e.description not in {"Replace this description!"}
-                        and e.image is not None
-                        for e in close_events
-                    ):
-                        ranking += _w("week_event_good")
-
-            # points for public contact email
-            if club.email and club.email_public:
-                ranking += _w("email_bonus")
-
-            # points for social links
-            social_fields = [
-                "facebook",
-                "website",
-                "twitter",
-                "instagram",
-                "linkedin",
-                "github",
-                "youtube",
-            ]
-            social_fields = [getattr(club, field) for field in social_fields]
-            has_fields = [
-                field is not None and len(field) >= 3 for field in social_fields
-            ]
-            has_fields = [field for field in social_fields if field]
-            if len(has_fields) >= 2:
-                ranking += _w("social_bonus")
-
-            # points for how to get involved
-            if len(club.how_to_get_involved.strip()) <= 3:
-                ranking += _w("howto_penalty")
-
-            # points for updated
-            if club.updated_at < now - datetime.timedelta(days=30 * 8):
-                ranking += _w("outdated_penalty")
-
-            # points for testimonials
-            num_testimonials = club.testimonials.count()
-            if num_testimonials >= 1:
-                ranking += _w("testimonial_one")
-            if num_testimonials >= 3:
-                ranking += _w("testimonial_three")
-
-            # random number, mostly shuffles similar clubs with average of 25 points
-            # but with long right tail to periodically feature less popular clubs
-            # given ~700 active clubs, multiplier c, expected # clubs with rand > cd
-            # is 257, 95, 35, 13, 5, 2, 1 for c = 1, 2, 3, 4, 5, 6, 7
-            ranking += np.random.standard_exponential() * _w("random_scale")
-
-            club.rank = floor(ranking)
-            club.skip_history_when_saving = True
-            count += 1
-
-        Club.objects.bulk_update(clubs, ["rank"])
+        # random number, mostly shuffles similar clubs with average of 25 points
+        # but with long right tail to periodically feature less popular clubs
+        # given ~700 active clubs, multiplier c, expected # clubs with rand > cd
+        # is 257, 95, 35, 13, 5, 2, 1 for c = 1, 2, 3, 4, 5, 6, 7
+        features[changed, -1] = np.random.standard_exponential(int(changed.sum()))
+
+        # sum the weighted features left to right, which gives exactly the same
+        # floating point result as adding up each score one term at a time
+        scores = (features[changed] * weight_vector).cumsum(axis=1)[:, -1]
+        ranks = np.floor(scores).astype(np.int64)
+
+        Club.objects.bulk_update(
+            [
+                Club(id=club_id, rank=rank)
+                for club_id, rank in zip(ids[changed].tolist(), ranks.tolist())
+            ],
+            ["rank"],
+            batch_size=500,
+        )
+        if changed.any():
+            club_list_cache.invalidate_all()
+
+        cache.set(
+            RANK_STATE_CACHE_KEY,
+            {
+                "now": now,
+                "weights": weights.updated_at,
+                "ids": ids,
+                "features": features,
+            },
+            None,
+        )
 
+        count = int(changed.sum())
         self.stdout.write(self.style.SUCCESS(f"Computed rankings for {count} clubs!"))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clubs.search import club_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the club search index. "
+        "Run this after bulk changes to clubs that do not send model signals."
+    )
+
+    def handle(self, *args, **kwargs):
+        start = time.monotonic()
+        club_search_index.request_rebuild()
+        club_search_index.rebuild()
+        elapsed = time.monotonic() - start
+
+        stats = club_search_index.stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {stats['clubs']} clubs with {stats['tokens']} tokens "
+                f"in {elapsed:.2f}s."
+            )
+        )
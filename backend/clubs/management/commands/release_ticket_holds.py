@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from clubs.models import Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Release ticket holds that have expired. "
+        "Run with --loop to keep releasing holds as they expire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and release each hold shortly after it expires.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="The maximum number of seconds to wait between sweeps.",
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            released, latency = Ticket.objects.sweep_holds()
+            if released or not kwargs["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Released {released} expired ticket hold(s) "
+                        f"in {latency * 1000:.1f}ms."
+                    )
+                )
+
+            if not kwargs["loop"]:
+                break
+
+            # sleep until the next hold expires, checking again at least once
+            # per interval to pick up holds placed in the meantime
+            delay = kwargs["interval"]
+            expiration = Ticket.objects.next_hold_expiration()
+            if expiration is not None:
+                delay = min(delay, (expiration - timezone.now()).total_seconds())
+            time.sleep(max(delay, 0.5))
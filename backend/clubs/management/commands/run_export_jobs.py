@@ -0,0 +1,240 @@
+import itertools
+import tempfile
+import time
+import traceback
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from clubs.mixins import SPREADSHEET_FORMATS, XLSXFormatterMixin, write_spreadsheet
+from clubs.models import (
+    ApplicationQuestionResponse,
+    ApplicationSubmission,
+    ClubApplication,
+    ExportJob,
+)
+from clubs.serializers import ApplicationSubmissionCSVSerializer
+from clubs.views import get_club_report_queryset, get_club_report_serializer_class
+
+
+# number of rows written between each progress update
+CHUNK_SIZE = 500
+
+
+class ClubReportExporter(XLSXFormatterMixin):
+    """
+    Formats the clubs in a report like a spreadsheet export of the club list
+    endpoint made by the user that requested the report.
+    """
+
+    def __init__(self, user, parameters):
+        super().__init__()
+        self.kwargs = {}
+        # the serializers read the user, the requested fields and the site domain
+        # from the request in their context
+        factory = RequestFactory(HTTP_HOST=settings.DEFAULT_DOMAIN)
+        self.request = Request(factory.get("/api/clubs/", parameters, secure=True))
+        self.request.user = user
+
+    def get_serializer_class(self):
+        return get_club_report_serializer_class(self.request.user)
+
+    def get_serializer(self, *args, **kwargs):
+        context = {"request": self.request, "view": self}
+        return self.get_serializer_class()(*args, context=context, **kwargs)
+
+
+def build_report(job):
+    """
+    Return the format, number of rows and rows of a club report, with the clubs
+    that the user that requested it can see in the club list.
+    """
+    parameters = job.get_parameters()
+    if parameters.get("format") not in SPREADSHEET_FORMATS:
+        parameters["format"] = "xlsx"
+
+    queryset = get_club_report_queryset(job.creator, parameters)
+    exporter = ClubReportExporter(job.creator, parameters)
+    return parameters["format"], queryset.count(), exporter.iter_export_rows(queryset)
+
+
+def iter_submission_rows(submissions):
+    header = None
+    while True:
+        chunk = list(itertools.islice(submissions, CHUNK_SIZE))
+        if not chunk:
+            break
+        for row in ApplicationSubmissionCSVSerializer(chunk, many=True).data:
+            if header is None:
+                header = list(row.keys())
+                yield header
+            yield [row.get(key) for key in header]
+
+
+def build_submissions(job):
+    """
+    Return the format, number of rows and rows of the submissions to a single
+    club application.
+    """
+    submissions = (
+        ApplicationSubmission.objects.filter(
+            application=job.get_parameters()["application"]
+        )
+        .select_related("user__profile", "committee", "application__club")
+        .prefetch_related(
+            Prefetch(
+                "responses",
+                queryset=ApplicationQuestionResponse.objects.select_related(
+                    "multiple_choice", "question"
+                ),
+            ),
+            "application__questions",
+            "responses__question__committees",
+            "responses__question__multiple_choice",
+        )
+        .order_by("pk")
+    )
+    return (
+        "csv",
+        submissions.count(),
+        iter_submission_rows(submissions.iterator(chunk_size=CHUNK_SIZE)),
+    )
+
+
+def build_all_submissions(job):
+    """
+    Return the format, number of rows and rows of the submissions to every
+    Wharton Council application in the cycle of the given application.
+    """
+    cycle = ClubApplication.objects.get(
+        id=job.get_parameters()["application"]
+    ).application_cycle
+    columns = {
+        "name": "application__name",
+        "application": "application",
+        "committee": "committee__name",
+        "club": "application__club__name",
+        "status": "status",
+        "user": "user",
+    }
+    submissions = (
+        ApplicationSubmission.objects.filter(
+            application__is_wharton_council=True,
+            application__application_cycle=cycle,
+        )
+        .order_by("pk")
+        .values_list(*columns.values())
+    )
+
+    def rows():
+        yield list(columns.keys())
+        yield from submissions.iterator(chunk_size=CHUNK_SIZE)
+
+    return "csv", submissions.count(), rows()
+
+
+BUILDERS = {
+    ExportJob.KIND_REPORT: build_report,
+    ExportJob.KIND_SUBMISSIONS: build_submissions,
+    ExportJob.KIND_ALL_SUBMISSIONS: build_all_submissions,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the spreadsheet exports that have been requested in the background "
+        "and remove expired exports. "
+        "Run with --loop to keep building exports as they are requested."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and build new exports shortly after they are requested.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="The number of seconds to wait between checks for new exports.",
+        )
+
+    def track_progress(self, job, rows):
+        """
+        Pass through the rows of an export, saving and publishing the progress of
+        the export and renewing its lease after every chunk of rows.
+        """
+        for i, row in enumerate(rows):
+            # the first row is the header
+            if i and i % CHUNK_SIZE == 0:
+                job.progress = i
+                job.renew_lease("progress")
+                job.publish()
+            yield row
+
+    def run_job(self, job):
+        export_format, job.total, rows = BUILDERS[job.kind](job)
+        job.renew_lease("total")
+        job.publish()
+
+        with tempfile.TemporaryFile() as output:
+            write_spreadsheet(self.track_progress(job, rows), export_format, output)
+            output.seek(0)
+            name = "{}-{}.{}".format(
+                job.kind, timezone.now().strftime("%Y%m%d-%H%M"), export_format
+            )
+            job.file.save(name, File(output), save=False)
+
+        job.status = ExportJob.DONE
+        job.progress = job.total
+        job.finished_at = timezone.now()
+        job.save()
+        job.publish()
+
+    def remove_expired(self):
+        expired = ExportJob.objects.filter(
+            created_at__lt=timezone.now() - ExportJob.MAX_AGE
+        )
+        for job in expired:
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
+
+    def handle(self, *args, **kwargs):
+        while True:
+            self.remove_expired()
+
+            count = 0
+            while (job := ExportJob.claim()) is not None:
+                start = time.monotonic()
+                try:
+                    self.run_job(job)
+                except Exception:
+                    self.stderr.write(
+                        f"Export {job.id} failed:\n{traceback.format_exc()}"
+                    )
+                    job.status = ExportJob.FAILED
+                    job.error = ExportJob.FAILURE_MESSAGE
+                    job.finished_at = timezone.now()
+                    job.save()
+                    job.publish()
+                else:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Built {job.kind} export {job.id} with {job.total} "
+                            f"row(s) in {time.monotonic() - start:.1f}s."
+                        )
+                    )
+                count += 1
+
+            if not kwargs["loop"]:
+                if not count:
+                    self.stdout.write("There are no exports to build.")
+                break
+            time.sleep(kwargs["interval"])
@@ -19,9 +19,11 @@ from clubs.models import (
     EventShowing,
     Membership,
     MembershipInvite,
+    OutboxBatch,
+    OutboxEmail,
     send_mail_helper,
 )
-from clubs.utils import fuzzy_lookup_club
+from clubs.utils import ClubNameMatcher
 
 
 def send_fair_email(club, email, template="fair"):
@@ -182,6 +184,16 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **kwargs):
+        # queue every email and deliver them together over one connection,
+        # anything that fails is retried by the send_outbox command
+        with OutboxBatch.collect(f"send_emails {kwargs['type']}") as batch:
+            self.send_emails(*args, **kwargs)
+
+        sent, failed = OutboxEmail.objects.send_pending(batch=batch)
+        if sent or failed:
+            self.stdout.write(f"Delivered {sent} email(s), {failed} to be retried.")
+
+    def send_emails(self, *args, **kwargs):
         dry_run = kwargs["dry_run"]
         only_sheet = kwargs["only_sheet"]
         action = kwargs["type"]
@@ -696,6 +708,7 @@ class Command(BaseCommand):
 
         # load email file
         if email_file is not None:
+            matcher = ClubNameMatcher()
             with open(email_file, "r") as f:
                 reader = csv.reader(f)
                 for line in reader:
@@ -705,7 +718,7 @@ class Command(BaseCommand):
                         )
                         continue
                     raw_name = line[0].strip()
-                    club = fuzzy_lookup_club(raw_name)
+                    club = matcher.lookup(raw_name)
 
                     if club is not None:
                         if verbosity >= 2:
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clubs.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver the emails queued in the outbox, reusing one connection to the "
+        "mail server and retrying failed emails with exponential backoff. "
+        "Run with --loop to keep delivering emails as they are queued."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and deliver new emails shortly after they are queued.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="The number of seconds to wait between checks for new emails.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=10,
+            help="The maximum number of emails to send per second.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="The maximum number of emails to send in each run.",
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            start = time.monotonic()
+            sent, failed = OutboxEmail.objects.send_pending(
+                limit=kwargs["limit"], rate=kwargs["rate"]
+            )
+            if sent or failed or not kwargs["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent {sent} email(s) with {failed} failure(s) "
+                        f"in {time.monotonic() - start:.1f}s."
+                    )
+                )
+
+            if not kwargs["loop"]:
+                break
+            time.sleep(kwargs["interval"])
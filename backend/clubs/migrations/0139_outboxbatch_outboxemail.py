@@ -0,0 +1,101 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:52
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clubs", "0138_membership_clubs_membe_person__16cabc_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxBatch",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "creator",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("template", models.CharField(max_length=255)),
+                ("subject", models.TextField()),
+                ("from_email", models.TextField()),
+                ("to", models.TextField()),
+                ("reply_to", models.TextField(default="[]")),
+                ("text_content", models.TextField()),
+                ("html_content", models.TextField()),
+                ("attachment", models.BinaryField(blank=True, null=True)),
+                ("attachment_filename", models.CharField(blank=True, max_length=255)),
+                ("attachment_mimetype", models.CharField(blank=True, max_length=255)),
+                ("attachment_content_id", models.CharField(blank=True, max_length=255)),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[(1, "Pending"), (2, "Sent"), (3, "Failed")], default=1
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="emails",
+                        to="clubs.outboxbatch",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="clubs_outbo_status_13b38a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:26
+
+import clubs.models
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0139_outboxbatch_outboxemail"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("report", "Club Report"),
+                            ("submissions", "Application Submissions"),
+                            ("all_submissions", "Application Submissions for Cycle"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("parameters", models.TextField(default="{}")),
+                ("fingerprint", models.CharField(db_index=True, max_length=64)),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[
+                            (1, "Pending"),
+                            (2, "Running"),
+                            (3, "Done"),
+                            (4, "Failed"),
+                        ],
+                        default=1,
+                    ),
+                ),
+                ("progress", models.IntegerField(default=0)),
+                ("total", models.IntegerField(blank=True, null=True)),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True, upload_to=clubs.models.get_export_file_name
+                    ),
+                ),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "creator",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:51
+
+import clubs.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0141_icsimportstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageSource",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64, unique=True)),
+                ("width", models.PositiveIntegerField(blank=True, null=True)),
+                ("height", models.PositiveIntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="club",
+            name="image_source",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="clubs.imagesource",
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="image_source",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="clubs.imagesource",
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="image_source",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="clubs.imagesource",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ImageVariant",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("width", models.PositiveIntegerField()),
+                ("format", models.CharField(max_length=8)),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to=clubs.models.get_image_variant_file_name
+                    ),
+                ),
+                ("size", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="clubs.imagesource",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("source", "width", "format")},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from clubs.utils import compute_club_ancestry
+
+
+def build_club_ancestry(apps, schema_editor):
+    Club = apps.get_model("clubs", "Club")
+    ClubAncestry = apps.get_model("clubs", "ClubAncestry")
+    links = Club.parent_orgs.through.objects.values_list("from_club_id", "to_club_id")
+    ClubAncestry.objects.bulk_create(
+        [
+            ClubAncestry(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+            for (ancestor, descendant), depth in compute_club_ancestry(links).items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0142_imagevariants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClubAncestry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="clubs.club",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="clubs.club",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["descendant", "ancestor"],
+                        name="clubs_cluba_descend_712e88_idx",
+                    )
+                ],
+                "unique_together": {("ancestor", "descendant")},
+            },
+        ),
+        migrations.RunPython(build_club_ancestry, migrations.RunPython.noop),
+    ]
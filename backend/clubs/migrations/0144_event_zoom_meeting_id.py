@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0143_clubancestry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="zoom_meeting_id",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=32
+            ),
+        ),
+    ]
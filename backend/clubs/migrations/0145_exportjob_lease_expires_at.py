@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0144_event_zoom_meeting_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
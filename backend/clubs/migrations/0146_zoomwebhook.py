@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0145_exportjob_lease_expires_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ZoomWebhook",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("action", models.CharField(max_length=64)),
+                ("payload", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clubs", "0146_zoomwebhook"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="zoomwebhook",
+            name="error",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,8 @@
+import csv
+import io
+import itertools
+import json
+import tempfile
 from collections import OrderedDict
 
 import dateutil.parser
@@ -6,15 +11,113 @@ from django.core.exceptions import (
     MultipleObjectsReturned,
     ObjectDoesNotExist,
 )
-from django.db.models import BooleanField, DateTimeField, ManyToManyField
+from django.db.models import BooleanField, DateTimeField, ManyToManyField, QuerySet
 from django.db.models.fields.reverse_related import ManyToOneRel
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
 from rest_framework import serializers
-from rest_framework.renderers import JSONRenderer
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
 
 
+# renderer formats that are exported as spreadsheets
+SPREADSHEET_FORMATS = {"xlsx", "csv"}
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class EchoBuffer:
+    """
+    File-like object that returns written values instead of storing them,
+    used to stream the output of a csv writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def flatten_spreadsheet_row(row, parent_key=""):
+    """
+    Flatten a serialized row into (column, value) pairs that can be written to a
+    spreadsheet cell. Nested objects are split into "parent.child" columns and
+    lists of values are joined together.
+    """
+    for key, value in row.items():
+        key = f"{parent_key}.{key}" if parent_key else key
+        if isinstance(value, dict):
+            yield from flatten_spreadsheet_row(value, key)
+        elif isinstance(value, (list, tuple)):
+            if any(isinstance(item, (dict, list, tuple)) for item in value):
+                yield key, json.dumps(value, ensure_ascii=False, default=str)
+            else:
+                yield key, ", ".join(str(item) for item in value)
+        elif value is None or isinstance(value, (str, int, float)):
+            yield key, value
+        else:
+            yield key, str(value)
+
+
+def write_spreadsheet(rows, export_format, output):
+    """
+    Write the header and rows to a binary file as a csv or xlsx spreadsheet,
+    without keeping all of the rows in memory.
+    """
+    if export_format == "csv":
+        text = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+        csv.writer(text).writerows(rows)
+        text.flush()
+        text.detach()
+        return
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    bold = Font(bold=True)
+    for i, row in enumerate(rows):
+        if i == 0:
+            header = []
+            for value in row:
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.font = bold
+                header.append(cell)
+            worksheet.append(header)
+            continue
+        worksheet.append(
+            [ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row]
+        )
+    workbook.save(output)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Render a list of objects, or a single object, as a csv file.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = [data]
+
+        rows = [dict(flatten_spreadsheet_row(row)) for row in data]
+        header = list(dict.fromkeys(key for row in rows for key in row))
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([row.get(key) for key in header])
+        return output.getvalue().encode(self.charset)
+
+
 class ManyToManySaveMixin(object):
     """
     Mixin for serializers that saves ManyToMany fields by looking up related models.
@@ -148,6 +251,11 @@ class XLSXFormatterMixin(object):
     Changes the default column header to be bolded.
     """
 
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer]
+
+    # number of objects loaded from the database at a time in a streaming export
+    export_chunk_size = 500
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -291,6 +399,12 @@ class XLSXFormatterMixin(object):
         """
         return "report-{}.xlsx".format(timezone.now().strftime("%Y%m%d-%H%M"))
 
+    def _get_export_filename(self, export_format):
+        filename = self.get_filename()
+        if export_format == "csv":
+            filename = "{}.csv".format(filename.rsplit(".", 1)[0])
+        return filename
+
     def get_column_header(self):
         """
         Return the style of the column header for an Excel export.
@@ -298,6 +412,80 @@ class XLSXFormatterMixin(object):
         """
         return {"style": {"font": {"bold": True}}}
 
+    def is_streaming_export(self):
+        """
+        Return whether the list being requested should be streamed to the client
+        row by row. This is the case for csv exports, and for xlsx exports that
+        pass stream=true.
+        """
+        request = getattr(self, "request", None)
+        renderer = getattr(request, "accepted_renderer", None)
+        if renderer is None or getattr(self, "action", None) != "list":
+            return False
+        if renderer.format == "csv":
+            return True
+        stream = request.query_params.get("stream", "").lower() == "true"
+        return renderer.format == "xlsx" and stream
+
+    def list(self, request, *args, **kwargs):
+        if self.is_streaming_export():
+            return self.stream_export(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
+
+    def iter_export_rows(self, queryset):
+        """
+        Serialize the queryset in chunks and yield the header, followed by the
+        formatted values of each row.
+        """
+        if isinstance(queryset, QuerySet):
+            objects = queryset.iterator(chunk_size=self.export_chunk_size)
+        else:
+            objects = iter(queryset)
+
+        self._field_dict = {}
+        header = None
+        while True:
+            chunk = list(itertools.islice(objects, self.export_chunk_size))
+            if not chunk:
+                break
+            for row in self.get_serializer(chunk, many=True).data:
+                row = dict(
+                    flatten_spreadsheet_row(
+                        OrderedDict(self._format_cell(k, v) for k, v in row.items())
+                    )
+                )
+                if header is None:
+                    header = list(row.keys())
+                    yield header
+                yield [row.get(key) for key in header]
+
+    def stream_export(self, queryset):
+        """
+        Return a streaming csv or xlsx export of the queryset, without keeping
+        the whole export in memory.
+        """
+        export_format = self.request.accepted_renderer.format
+        rows = self.iter_export_rows(queryset)
+
+        if export_format == "csv":
+            writer = csv.writer(EchoBuffer())
+            response = StreamingHttpResponse(
+                (writer.writerow(row) for row in rows),
+                content_type="text/csv; charset=utf-8",
+            )
+        else:
+            # rows are spooled to disk by the write only worksheet, the finished
+            # workbook is then streamed back from a temporary file
+            output = tempfile.TemporaryFile()
+            write_spreadsheet(rows, export_format, output)
+            output.seek(0)
+            response = FileResponse(output, content_type=XLSX_CONTENT_TYPE)
+
+        response["Content-Disposition"] = "attachment; filename={}".format(
+            self._get_export_filename(export_format)
+        )
+        return response
+
     def finalize_response(self, request, response, *args, **kwargs):
         """
         If the requested format is a spreadsheet, format the cell values before
@@ -309,7 +497,7 @@ class XLSXFormatterMixin(object):
         # If this is a spreadsheet response, intercept and format.
         if (
             isinstance(response, Response)
-            and response.accepted_renderer.format == "xlsx"
+            and response.accepted_renderer.format in SPREADSHEET_FORMATS
         ):
             self._field_dict = {}
             if isinstance(response.data, ReturnList):
@@ -338,6 +526,6 @@ class XLSXFormatterMixin(object):
                 return response
 
             response["Content-Disposition"] = "attachment; filename={}".format(
-                self.get_filename()
+                self._get_export_filename(response.accepted_renderer.format)
             )
         return response
@@ -1,66 +1,102 @@
+import collections
+import contextlib
+import contextvars
 import datetime
+import hashlib
+import json
+import logging
 import os
 import re
+import time
 import uuid
 import warnings
 from email.mime.image import MIMEImage
 from io import BytesIO
-from smtplib import SMTPAuthenticationError, SMTPServerDisconnected
+from smtplib import SMTPAuthenticationError, SMTPException, SMTPServerDisconnected
 from urllib.parse import urlparse
 
 import pytz
 import qrcode
 import requests
-import yaml
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
 from django.core.validators import validate_email
 from django.db import models, transaction
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
 from django.db.models.deletion import ProtectedError
 from django.dispatch import receiver
-from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.crypto import get_random_string
+from django.utils.dateparse import parse_datetime
 from django.utils.functional import cached_property
 from ics import Calendar
 from jinja2 import Environment, meta
 from model_clone.models import CloneModel
+from options.models import Option
 from phonenumber_field.modelfields import PhoneNumberField
 from simple_history.models import HistoricalRecords
 from urlextract import URLExtract
 
-from clubs.utils import clean, get_django_minified_image, get_domain, html_to_text
-
-
-subject_regex = re.compile(r"\s*<!--\s*SUBJECT:\s*(.*?)\s*-->", re.I)
-types_regex = re.compile(r"\s*<!--\s*TYPES:\s*(.*?)\s*-->", re.DOTALL)
+from clubs.caching import (
+    CLASSIFICATION_GROUP_CACHE_PREFIX,
+    CLASSIFICATION_GROUPS,
+    CLUB_LIST_M2M_FACETS,
+    calendar_feed_cache,
+    club_approved_snapshots,
+    club_list_cache,
+    fair_live_metrics,
+    site_options_cache,
+)
+from clubs.emails import email_templates
+from clubs.search import SEARCH_FIELD_WEIGHTS, club_search_index
+from clubs.utils import (
+    IMAGE_VARIANT_FORMATS,
+    clean,
+    compute_club_ancestry,
+    get_domain,
+    get_zoom_meeting_id,
+    html_to_text,
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_mail_type_annotation(name):
     """
     Given a template name, return the type annotation metadata.
     """
-    prefix = {"fyh": "fyh_emails"}.get(settings.BRANDING, "emails")
-    path = os.path.join(settings.BASE_DIR, "templates", prefix, f"{name}.html")
-    with open(path, "r") as f:
-        contents = f.read()
-    match = types_regex.search(contents)
-    if match is not None:
-        return yaml.safe_load(match.group(1).strip())
-    return None
+    return email_templates.get(name).types
+
+
+# the outbox batch that emails are currently queued in, if any
+current_outbox_batch = contextvars.ContextVar("current_outbox_batch", default=None)
 
 
 def send_mail_helper(
-    name, subject, emails, context, attachment=None, reply_to=None, num_retries=2
+    name,
+    subject,
+    emails,
+    context,
+    attachment=None,
+    reply_to=None,
+    num_retries=2,
+    batch=None,
 ):
     """
     A helper to send out an email given the template name, subject, to emails,
     and context. Returns true if an email was sent out, or false if no emails
     were sent out.
 
+    If an outbox batch is given or collecting, the email is queued in the outbox
+    instead of being sent right away.
+
     All emails should go through this function.
     """
     if not all(isinstance(email, str) for email in emails):
@@ -71,22 +107,13 @@ def send_mail_helper(
     if not emails:
         return False
 
-    # load email template
-    prefix = {"fyh": "fyh_emails"}.get(settings.BRANDING, "emails")
-    html_content = render_to_string(f"{prefix}/{name}.html", context)
-
-    # use subject from template if it exists
-    # subject should match: <!-- SUBJECT: (subject) --> and be the first line
-    match = subject_regex.search(html_content)
-    if match is not None:
-        subject = match.group(1)
-        html_content = subject_regex.sub("", html_content, count=1)
-
-    # remove type annotation comment
-    match = types_regex.search(html_content)
-    if match is not None:
-        html_content = types_regex.sub("", html_content, count=1)
-    else:
+    # load email template, using the subject from the template if it exists
+    template = email_templates.get(name)
+    template_subject, html_content = template.render(context)
+    if template_subject is not None:
+        subject = template_subject
+
+    if template.types is None:
         warnings.warn(
             f"There is no type annotation information for the template '{name}'! "
             "Email previews may work incorrectly without type information.",
@@ -126,6 +153,12 @@ def send_mail_helper(
 
     msg.attach_alternative(html_content, "text/html")
 
+    if batch is None:
+        batch = current_outbox_batch.get()
+    if batch is not None:
+        OutboxEmail.objects.enqueue(msg, name, batch)
+        return True
+
     # Retry to avoid one-off SMTP errors
     for attempt in range(num_retries + 1):
         try:
@@ -140,6 +173,14 @@ def get_asset_file_name(instance, fname):
     return os.path.join("assets", uuid.uuid4().hex, fname)
 
 
+def get_export_file_name(instance, fname):
+    return os.path.join("exports", uuid.uuid4().hex, fname)
+
+
+def get_image_variant_file_name(instance, fname):
+    return os.path.join("variants", instance.source.content_hash, fname)
+
+
 def get_club_file_name(instance, fname):
     return os.path.join(
         "clubs", "{}.{}".format(instance.code, fname.rsplit(".", 1)[-1])
@@ -201,33 +242,61 @@ class Report(models.Model):
         ]
 
 
-def create_thumbnail_helper(self, request, height):
+class ImageSource(models.Model):
     """
-    Helper to create thumbnail on "image_small" given "image" exists on the model.
+    An uploaded image, identified by the hash of its contents so that objects
+    sharing the same image also share its generated variants.
     """
-    if not self.image:
-        return False
-    image_url = self.image.url
 
-    # can't minify svgs
-    if image_url.endswith(".svg"):
-        return False
+    content_hash = models.CharField(max_length=64, unique=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
 
-    # fix path for development
-    if not image_url.startswith("http"):
-        if request is not None:
-            image_url = request.build_absolute_uri(image_url)
-        else:
-            return False
-
-    # if failed to download image, ignore
-    try:
-        self.image_small = get_django_minified_image(image_url, height=height)
-        self.skip_history_when_saving = True
-        self.save(update_fields=["image_small"])
-    except requests.exceptions.RequestException:
-        return False
-    return True
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def get_variant(self, width):
+        """
+        Return the smallest variant that is at least the given width, or the largest
+        variant if none are wide enough, in the most preferred format available.
+        Uses prefetched variants when they exist.
+        """
+        variants = list(self.variants.all())
+        for fmt in IMAGE_VARIANT_FORMATS:
+            candidates = sorted(
+                (variant for variant in variants if variant.format == fmt),
+                key=lambda variant: variant.width,
+            )
+            if candidates:
+                return next(
+                    (variant for variant in candidates if variant.width >= width),
+                    candidates[-1],
+                )
+        return None
+
+    def __str__(self):
+        return self.content_hash
+
+
+class ImageVariant(models.Model):
+    """
+    A resized and re-encoded copy of an uploaded image.
+    """
+
+    source = models.ForeignKey(
+        ImageSource, on_delete=models.CASCADE, related_name="variants"
+    )
+    width = models.PositiveIntegerField()
+    format = models.CharField(max_length=8)
+    file = models.FileField(upload_to=get_image_variant_file_name)
+    size = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} at {self.width}px as {self.format}"
+
+    class Meta:
+        unique_together = (("source", "width", "format"),)
 
 
 class GroupActivityOption(models.Model):
@@ -356,6 +425,9 @@ class Club(models.Model):
     image_small = models.ImageField(
         upload_to=get_club_small_file_name, null=True, blank=True
     )
+    image_source = models.ForeignKey(
+        ImageSource, on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
     tags = models.ManyToManyField("Tag", blank=True)
     classification = models.ForeignKey(
         "Classification",
@@ -424,7 +496,9 @@ class Club(models.Model):
 
     # signifies the existence of a previous instance within history with approved=True
     ghost = models.BooleanField(default=False)
-    history = HistoricalRecords(cascade_delete_history=True)
+    history = HistoricalRecords(
+        cascade_delete_history=True, excluded_fields=["image_source"]
+    )
 
     def __str__(self):
         return self.name
@@ -437,17 +511,17 @@ class Club(models.Model):
         """
         return self.category.designation if self.category else None
 
-    def create_thumbnail(self, request=None):
-        return create_thumbnail_helper(self, request, 200)
-
     @cached_property
     def is_wharton(self):
         return any(badge.label == "Wharton Council" for badge in self.badges.all())
 
-    def add_ics_events(self):
+    def add_ics_events(self, calendar=None):
         """
         Fetch the ICS events from the club's calendar URL
         and return the number of modified events.
+
+        If an already fetched calendar is passed, its events are imported instead.
+        Existing events are matched in memory and written back in bulk.
         """
         # random but consistent uuid used to generate uuid5s from invalid uuids
         ics_import_uuid_namespace = uuid.UUID("8f37c140-3775-42e8-91d4-fda7a2e44152")
@@ -455,126 +529,171 @@ class Club(models.Model):
         extractor = URLExtract()
 
         url = self.ics_import_url
-        if url:
-            calendar = Calendar(requests.get(url).text)
-            event_list = Event.objects.filter(is_ics_event=True, club=self)
-            modified_events = []
-            for ics_event in calendar.events:
-                tries = [
-                    Event.objects.filter(
-                        club=self,
-                        is_ics_event=True,
-                    )
-                    .filter(
-                        eventshowing__start_time=ics_event.begin.datetime,
-                        eventshowing__end_time=ics_event.end.datetime,
-                    )
-                    .first(),
-                    Event(),
-                ]
-
-                # try matching using uuid if it is valid
-                if ics_event.uid:
-                    try:
-                        event_uuid = uuid.UUID(ics_event.uid[:36])
-                    except ValueError:
-                        # generate uuid from malformed/invalid uuids
-                        event_uuid = uuid.uuid5(
-                            ics_import_uuid_namespace, ics_event.uid
-                        )
-
-                    tries.insert(0, Event.objects.filter(ics_uuid=event_uuid).first())
-                else:
-                    event_uuid = None
-
-                for ev in tries:
-                    if ev:
-                        ev.club = self
-                        ev.name = ics_event.name.strip()
-                        ev.description = clean(ics_event.description.strip())
-                        ev.is_ics_event = True
-
-                        # very simple type detection, only perform on first time
-                        if ev.pk is None:
-                            ev.type = Event.OTHER
-                            for val, lbl in Event.TYPES:
-                                if val in {Event.FAIR}:
-                                    continue
-                                if (
-                                    lbl.lower() in ev.name.lower()
-                                    or lbl.lower() in ev.description.lower()
-                                ):
-                                    ev.type = val
-                                    break
-
-                        # extract urls from description
-                        if ev.description:
-                            urls = extractor.find_urls(ev.description)
-                            urls.sort(
-                                key=lambda url: any(
-                                    domain in url
-                                    for domain in {
-                                        "zoom.us",
-                                        "bluejeans.com",
-                                        "hangouts.google.com",
-                                    }
-                                ),
-                                reverse=True,
-                            )
-                            if urls:
-                                ev.url = urls[0]
-
-                        # extract url from url or location
-                        if ics_event.url:
-                            ev.url = ics_event.url
-
-                        # format url properly with schema
-                        if ev.url:
-                            parsed = urlparse(ev.url)
-                            if not parsed.netloc:
-                                parsed = parsed._replace(netloc=parsed.path, path="")
-                            if not parsed.scheme:
-                                parsed = parsed._replace(scheme="https")
-                            ev.url = parsed.geturl()
-
-                        # add uuid if it exists, otherwise will be autogenerated
-                        if event_uuid:
-                            ev.ics_uuid = event_uuid
-
-                        # ensure length limits are met before saving
-                        if ev.name:
-                            ev.name = ev.name[:255]
-                        if ev.code:
-                            ev.code = ev.code[:255]
-                        if ev.url:
-                            ev.url = ev.url[:2048]
-
-                        ev.save()
-
-                        # Update corresponding showing (one per event)
-                        showing, created = EventShowing.objects.get_or_create(
-                            event=ev,
-                            start_time=ics_event.begin.datetime,
-                            end_time=ics_event.end.datetime,
-                            defaults={
-                                "location": ics_event.location[:255]
-                                if ics_event.location
-                                else None,
-                            },
-                        )
-
-                        if not created:
-                            showing.location = (
-                                ics_event.location[:255] if ics_event.location else None
-                            )
-                            showing.save()
+        if not url:
+            return 0
+
+        if calendar is None:
+            calendar = Calendar(requests.get(url, timeout=ICSImportState.TIMEOUT).text)
+
+        ics_events = []
+        for ics_event in calendar.events:
+            # try matching using uuid if it is valid
+            if ics_event.uid:
+                try:
+                    event_uuid = uuid.UUID(ics_event.uid[:36])
+                except ValueError:
+                    # generate uuid from malformed/invalid uuids
+                    event_uuid = uuid.uuid5(ics_import_uuid_namespace, ics_event.uid)
+            else:
+                event_uuid = None
+            ics_events.append((ics_event, event_uuid))
+
+        # load every event and showing that could be matched up front
+        by_uuid = {
+            ev.ics_uuid: ev
+            for ev in Event.objects.filter(
+                ics_uuid__in=[event_uuid for _, event_uuid in ics_events if event_uuid]
+            )
+        }
+        existing = {ev.pk: ev for ev in by_uuid.values()}
+        for ev in Event.objects.filter(club=self, is_ics_event=True):
+            existing.setdefault(ev.pk, ev)
+        previous_clubs = {ev.club_id for ev in existing.values()}
+
+        # unsaved events are unhashable, so key their showings by identity
+        showings = collections.defaultdict(dict)
+        by_time = {}
+        for showing in EventShowing.objects.filter(
+            event__in=list(existing.keys())
+        ).order_by("pk"):
+            ev = existing[showing.event_id]
+            showings[id(ev)][(showing.start_time, showing.end_time)] = showing
+            if ev.club_id == self.pk and ev.is_ics_event:
+                by_time.setdefault((showing.start_time, showing.end_time), ev)
+
+        fields = ["club_id", "name", "description", "is_ics_event", "type", "url"]
+        fields += ["ics_uuid", "code", "zoom_meeting_id"]
+        snapshots = {
+            pk: [getattr(ev, field) for field in fields] for pk, ev in existing.items()
+        }
 
-                        modified_events.append(ev)
+        new_events = []
+        new_showings = []
+        changed_showings = {}
+        kept = set()
+        for ics_event, event_uuid in ics_events:
+            start, end = ics_event.begin.datetime, ics_event.end.datetime
+            ev = (event_uuid and by_uuid.get(event_uuid)) or by_time.get((start, end))
+            if ev is None:
+                ev = Event()
+                new_events.append(ev)
+            elif ev.pk is not None:
+                kept.add(ev.pk)
+
+            ev.club = self
+            ev.name = ics_event.name.strip()
+            ev.description = clean((ics_event.description or "").strip())
+            ev.is_ics_event = True
+
+            # very simple type detection, only perform on first time
+            if ev.pk is None and id(ev) not in showings:
+                ev.type = Event.OTHER
+                for val, lbl in Event.TYPES:
+                    if val in {Event.FAIR}:
+                        continue
+                    if (
+                        lbl.lower() in ev.name.lower()
+                        or lbl.lower() in ev.description.lower()
+                    ):
+                        ev.type = val
                         break
 
-            event_list.exclude(pk__in=[e.pk for e in modified_events]).delete()
-            return len(modified_events)
-        return 0
+            # extract urls from description
+            if ev.description:
+                urls = extractor.find_urls(ev.description)
+                urls.sort(
+                    key=lambda url: any(
+                        domain in url
+                        for domain in {
+                            "zoom.us",
+                            "bluejeans.com",
+                            "hangouts.google.com",
+                        }
+                    ),
+                    reverse=True,
+                )
+                if urls:
+                    ev.url = urls[0]
+
+            # extract url from url or location
+            if ics_event.url:
+                ev.url = ics_event.url
+
+            # format url properly with schema
+            if ev.url:
+                parsed = urlparse(ev.url)
+                if not parsed.netloc:
+                    parsed = parsed._replace(netloc=parsed.path, path="")
+                if not parsed.scheme:
+                    parsed = parsed._replace(scheme="https")
+                ev.url = parsed.geturl()
+
+            # add uuid if it exists, otherwise will be autogenerated
+            if event_uuid:
+                ev.ics_uuid = event_uuid
+                by_uuid[event_uuid] = ev
+
+            # ensure length limits are met before saving
+            if ev.name:
+                ev.name = ev.name[:255]
+            if ev.code:
+                ev.code = ev.code[:255]
+            if ev.url:
+                ev.url = ev.url[:2048]
+            ev.zoom_meeting_id = get_zoom_meeting_id(ev.url)
+
+            # update corresponding showing (one per event)
+            location = ics_event.location[:255] if ics_event.location else None
+            showing = showings[id(ev)].get((start, end))
+            if showing is None:
+                showing = EventShowing(
+                    event=ev, start_time=start, end_time=end, location=location
+                )
+                showings[id(ev)][(start, end)] = showing
+                new_showings.append(showing)
+            elif showing.location != location:
+                showing.location = location
+                if showing.pk is not None:
+                    changed_showings[showing.pk] = showing
+            by_time.setdefault((start, end), ev)
+
+        now = timezone.now()
+        changed_events = [
+            ev
+            for pk, ev in existing.items()
+            if snapshots[pk] != [getattr(ev, field) for field in fields]
+        ]
+        for obj in [*changed_events, *changed_showings.values()]:
+            obj.updated_at = now
+
+        with transaction.atomic():
+            Event.objects.bulk_create(new_events, batch_size=500)
+            Event.objects.bulk_update(
+                changed_events, [*fields, "updated_at"], batch_size=500
+            )
+            EventShowing.objects.bulk_create(new_showings, batch_size=500)
+            EventShowing.objects.bulk_update(
+                changed_showings.values(), ["location", "updated_at"], batch_size=500
+            )
+            Event.objects.filter(club=self, is_ics_event=True).exclude(
+                pk__in=kept | {ev.pk for ev in new_events}
+            ).delete()
+
+        # bulk queries do not send the signals that refresh the calendar feeds
+        for club_id in previous_clubs | {self.pk}:
+            calendar_feed_cache.touch_club(club_id)
+
+        return len(ics_events)
 
     def send_virtual_fair_email(
         self, request=None, email="setup", fair=None, emails=None, extra=False
@@ -788,6 +907,81 @@ class Club(models.Model):
         ]
 
 
+class ClubAncestry(models.Model):
+    """
+    Closure table of the parent organization hierarchy, with a row for every club and
+    each of its direct or indirect parent organizations.
+
+    This is kept up to date by signals whenever parent organizations change, so that
+    any ancestor or descendant lookup is a single indexed query.
+    """
+
+    ancestor = models.ForeignKey(
+        Club, on_delete=models.CASCADE, related_name="descendant_links"
+    )
+    descendant = models.ForeignKey(
+        Club, on_delete=models.CASCADE, related_name="ancestor_links"
+    )
+    depth = models.PositiveIntegerField()
+
+    @classmethod
+    def rebuild(cls, club_ids=None):
+        """
+        Bring the table in line with the current parent organizations, only writing
+        the rows that have changed. If club ids are given, only the ancestors of
+        those clubs are updated.
+
+        Rows inserted by a concurrent rebuild are skipped instead of violating the
+        unique constraint.
+        """
+        expected = compute_club_ancestry(
+            Club.parent_orgs.through.objects.values_list("from_club_id", "to_club_id")
+        )
+        rows = cls.objects.all()
+        if club_ids is not None:
+            club_ids = set(club_ids)
+            expected = {
+                key: depth for key, depth in expected.items() if key[1] in club_ids
+            }
+            rows = rows.filter(descendant_id__in=club_ids)
+
+        with transaction.atomic():
+            existing = {
+                (ancestor, descendant): (pk, depth)
+                for pk, ancestor, descendant, depth in rows.values_list(
+                    "pk", "ancestor_id", "descendant_id", "depth"
+                )
+            }
+            cls.objects.filter(
+                pk__in=[pk for key, (pk, _) in existing.items() if key not in expected]
+            ).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+                    for (ancestor, descendant), depth in expected.items()
+                    if (ancestor, descendant) not in existing
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            cls.objects.bulk_update(
+                [
+                    cls(pk=existing[key][0], depth=depth)
+                    for key, depth in expected.items()
+                    if key in existing and existing[key][1] != depth
+                ],
+                ["depth"],
+                batch_size=1000,
+            )
+
+    def __str__(self):
+        return f"{self.ancestor_id} is an ancestor of {self.descendant_id}"
+
+    class Meta:
+        unique_together = (("ancestor", "descendant"),)
+        indexes = [models.Index(fields=["descendant", "ancestor"])]
+
+
 class TargetStudentType(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE)
     target_student_types = models.ForeignKey(
@@ -997,9 +1191,16 @@ class Event(models.Model):
     image_small = models.ImageField(
         upload_to=get_event_small_file_name, null=True, blank=True
     )
+    image_source = models.ForeignKey(
+        ImageSource, on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
     description = models.TextField(blank=True)  # rich html
     ics_uuid = models.UUIDField(default=uuid.uuid4)
     is_ics_event = models.BooleanField(default=False, blank=True)
+    # the meeting id of zoom links, kept up to date when the url is saved
+    zoom_meeting_id = models.CharField(
+        max_length=32, blank=True, default="", db_index=True, editable=False
+    )
 
     OTHER = 0
     RECRUITMENT = 1
@@ -1024,8 +1225,15 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def create_thumbnail(self, request=None):
-        return create_thumbnail_helper(self, request, 400)
+    def save(self, *args, **kwargs):
+        """
+        Override save method to keep the zoom meeting id in sync with the url.
+        """
+        self.zoom_meeting_id = get_zoom_meeting_id(self.url)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "url" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "zoom_meeting_id"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -1056,6 +1264,59 @@ class EventShowing(models.Model):
         return f"{self.event.name} showing at {self.start_time}"
 
 
+class ICSImportState(models.Model):
+    """
+    Remembers what was last imported from a club's ICS calendar URL, so that
+    calendars that have not changed since then can be skipped.
+    """
+
+    # seconds to wait for a calendar server before giving up
+    TIMEOUT = 30
+
+    club = models.OneToOneField(
+        Club, on_delete=models.CASCADE, related_name="ics_import_state"
+    )
+    url = models.URLField(max_length=200)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def fetch(self, force=False):
+        """
+        Download the club's calendar and return its contents, or None if it has not
+        changed since the last import.
+
+        Only the fields of this instance are updated, so this is safe to call from
+        another thread. Save the instance once the calendar has been imported.
+        """
+        url = self.club.ics_import_url
+        headers = {}
+        if not force and self.url == url:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        resp = requests.get(url, headers=headers, timeout=self.TIMEOUT)
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+
+        content_hash = hashlib.sha256(resp.text.encode("utf-8")).hexdigest()
+        changed = force or self.url != url or self.content_hash != content_hash
+        self.url = url
+        self.etag = resp.headers.get("ETag", "")[:255]
+        self.last_modified = resp.headers.get("Last-Modified", "")[:255]
+        self.content_hash = content_hash
+        return resp.text if changed else None
+
+    def __str__(self):
+        return f"ICS import state for {self.club.code}"
+
+
 class Favorite(models.Model):
     """
     Used when people favorite a club to keep track of which clubs were favorited.
@@ -1144,6 +1405,100 @@ class ZoomMeetingVisit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    JOINED = "meeting.participant_joined"
+    LEFT = "meeting.participant_left"
+
+    @classmethod
+    def ingest(cls, webhooks):
+        """
+        Apply a batch of Zoom webhooks, given as (action, payload object) pairs in
+        the order they were received.
+
+        Events and users are looked up once for the whole batch, new visits are
+        inserted together and every affected event is only broadcast once.
+        Returns the number of visits that were created or closed.
+        """
+        joins = collections.OrderedDict()
+        leaves = {}
+        for action, obj in webhooks:
+            participant = obj.get("participant") or {}
+            key = (str(obj.get("id", "")), str(participant.get("user_id", "")))
+            if action == cls.JOINED:
+                joins.setdefault(key, []).append(
+                    [participant.get("email"), participant.get("join_time"), None]
+                )
+            elif action == cls.LEFT:
+                # close the newest visit from this batch first
+                pending = [visit for visit in joins.get(key, []) if visit[2] is None]
+                if pending:
+                    pending[-1][2] = participant.get("leave_time")
+                else:
+                    leaves[key] = participant.get("leave_time")
+
+        events = {}
+        for event_id, meeting_id in (
+            Event.objects.filter(zoom_meeting_id__in={key[0] for key in joins})
+            .order_by("pk")
+            .values_list("id", "zoom_meeting_id")
+        ):
+            events.setdefault(meeting_id, event_id)
+
+        usernames = {
+            email.split("@")[0]
+            for visits in joins.values()
+            for email, _, _ in visits
+            if email
+        }
+        people = dict(
+            get_user_model()
+            .objects.filter(username__in=usernames)
+            .values_list("username", "id")
+        )
+
+        new_visits = [
+            cls(
+                person_id=people.get(email.split("@")[0]) if email else None,
+                event_id=events[meeting_id],
+                meeting_id=meeting_id,
+                participant_id=participant_id,
+                join_time=join_time,
+                leave_time=leave_time,
+            )
+            for (meeting_id, participant_id), visits in joins.items()
+            if meeting_id in events
+            for email, join_time, leave_time in visits
+        ]
+
+        # only the newest open visit of each participant is closed
+        closed = {}
+        if leaves:
+            query = Q()
+            for meeting_id, participant_id in leaves:
+                query |= Q(meeting_id=meeting_id, participant_id=participant_id)
+            for visit in cls.objects.filter(query, leave_time__isnull=True).order_by(
+                "-created_at", "-pk"
+            ):
+                key = (visit.meeting_id, visit.participant_id)
+                if key not in closed:
+                    visit.leave_time = leaves[key]
+                    visit.updated_at = timezone.now()
+                    closed[key] = visit
+
+        with transaction.atomic():
+            cls.objects.bulk_create(new_visits, batch_size=500)
+            cls.objects.bulk_update(
+                closed.values(), ["leave_time", "updated_at"], batch_size=500
+            )
+            actions = {
+                visit.event_id: cls.JOINED if visit.leave_time is None else cls.LEFT
+                for visit in new_visits
+            }
+            actions.update({visit.event_id: cls.LEFT for visit in closed.values()})
+            if actions:
+                transaction.on_commit(lambda: fair_live_metrics.visits_changed(actions))
+
+        return len(new_visits) + len(closed)
+
     def __str__(self):
         return "<ZoomMeetingVisit: {} in Zoom meeting {}>".format(
             self.person.username if self.person is not None else self.participant_id,
@@ -1151,6 +1506,118 @@ class ZoomMeetingVisit(models.Model):
         )
 
 
+class ZoomWebhook(models.Model):
+    """
+    A Zoom participant webhook that has been received but not applied to the
+    meeting visits yet.
+
+    During a virtual fair Zoom sends thousands of join and leave callbacks a minute.
+    Instead of writing each visit as it arrives, webhooks are staged here and
+    applied together once the oldest one has waited for the configured delay, or
+    by the ingest_zoom_webhooks command. Staged webhooks survive restarts.
+    Webhooks that cannot be applied are kept with their error and skipped.
+    """
+
+    action = models.CharField(max_length=64)
+    # json object of the webhook payload
+    payload = models.TextField()
+    # why the webhook could not be applied, if it failed
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    def stage(cls, action, obj):
+        """
+        Store a webhook, applying every staged webhook if the oldest one has waited
+        for the configured delay.
+        """
+        cls.objects.create(action=action, payload=json.dumps(obj))
+
+        oldest = (
+            cls.objects.filter(error__isnull=True)
+            .order_by("id")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        delay = datetime.timedelta(seconds=settings.ZOOM_WEBHOOK_BATCH_DELAY)
+        if oldest is not None and timezone.now() - oldest >= delay:
+            try:
+                cls.ingest_staged()
+            except Exception:
+                # the webhooks stay staged for the ingest_zoom_webhooks command
+                logger.exception("Failed to apply staged Zoom webhooks")
+
+    @staticmethod
+    def parse(action, payload):
+        """
+        Return the payload object of a webhook, raising a ValueError if it cannot
+        be applied to the meeting visits.
+        """
+        obj = json.loads(payload)
+        participant = obj.get("participant") if isinstance(obj, dict) else None
+        if not isinstance(participant, dict):
+            raise ValueError("Webhook does not describe a participant.")
+        if not isinstance(participant.get("email") or "", str):
+            raise ValueError("Webhook participant email is not a string.")
+
+        field = "join_time" if action == ZoomMeetingVisit.JOINED else "leave_time"
+        value = participant.get(field)
+        if not isinstance(value, str) or parse_datetime(value) is None:
+            raise ValueError(f"Webhook has no valid {field}.")
+        return obj
+
+    @classmethod
+    def ingest_staged(cls, limit=BATCH_SIZE):
+        """
+        Apply and remove up to limit of the oldest staged webhooks in one
+        transaction, returning the number of webhooks processed.
+
+        Webhooks are applied in the order they were received, so nothing is applied
+        while older webhooks are being applied by another process. Webhooks that
+        cannot be applied are marked as failed so that later webhooks are not held
+        up by them.
+        """
+        with transaction.atomic():
+            pending = cls.objects.filter(error__isnull=True).order_by("id")
+            webhooks = list(pending.select_for_update(skip_locked=True)[:limit])
+            if not webhooks:
+                return 0
+            if pending.values_list("id", flat=True).first() != webhooks[0].id:
+                return 0
+
+            valid = []
+            for webhook in webhooks:
+                try:
+                    valid.append((webhook, cls.parse(webhook.action, webhook.payload)))
+                except ValueError as e:
+                    webhook.error = str(e)
+
+            try:
+                with transaction.atomic():
+                    ZoomMeetingVisit.ingest([(w.action, obj) for w, obj in valid])
+            except Exception:
+                # retry each webhook on its own to find the ones that fail
+                for webhook, obj in valid:
+                    try:
+                        with transaction.atomic():
+                            ZoomMeetingVisit.ingest([(webhook.action, obj)])
+                    except Exception as e:
+                        logger.exception("Failed to apply Zoom webhook %d", webhook.id)
+                        webhook.error = f"{type(e).__name__}: {e}"
+
+            failed = [webhook for webhook in webhooks if webhook.error is not None]
+            cls.objects.bulk_update(failed, ["error"])
+            cls.objects.filter(
+                id__in=[webhook.id for webhook in webhooks if webhook.error is None]
+            ).delete()
+        return len(webhooks)
+
+    def __str__(self):
+        return f"<ZoomWebhook: {self.action} at {self.created_at}>"
+
+
 class SearchQuery(models.Model):
     person = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=True)
     query = models.TextField()
@@ -1835,6 +2302,9 @@ class Profile(models.Model):
         get_user_model(), on_delete=models.CASCADE, primary_key=True
     )
     image = models.ImageField(upload_to=get_user_file_name, null=True, blank=True)
+    image_source = models.ForeignKey(
+        ImageSource, on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
     uuid_secret = models.UUIDField(default=uuid.uuid4)
 
     has_been_prompted = models.BooleanField(default=False)
@@ -2188,12 +2658,160 @@ class TicketQuerySet(models.query.QuerySet):
 
 
 class TicketManager(models.Manager):
-    # Update holds for all tickets
-    def update_holds(self):
+    HOLD_DURATION = datetime.timedelta(minutes=10)
+    HOLD_STATS_PREFIX = "tickets:holds:stats"
+
+    def held_q(self, now=None):
+        """
+        Return a filter for tickets with a hold that has not expired yet.
+        Expired holds are released in the background by the release_ticket_holds
+        command, so requests should use this instead of checking the holder.
+        """
+        if now is None:
+            now = timezone.now()
+        return Q(holder__isnull=False) & ~Q(holding_expiration__lte=now)
+
+    # Release expired holds for all tickets, or only the tickets for a showing
+    def update_holds(self, showing=None):
+        queryset = self.get_queryset().filter(
+            holder__isnull=False, holding_expiration__lte=timezone.now()
+        )
+        if showing is not None:
+            queryset = queryset.filter(showing=showing)
+        return queryset.update(holder=None)
+
+    def next_hold_expiration(self):
+        """
+        Return the earliest expiration time of any hold, using the index on
+        holding_expiration.
+        """
+        return (
+            self.get_queryset()
+            .filter(holder__isnull=False, holding_expiration__isnull=False)
+            .order_by("holding_expiration")
+            .values_list("holding_expiration", flat=True)
+            .first()
+        )
+
+    def sweep_holds(self):
+        """
+        Release all expired holds and record how many were released and how long
+        the sweep took.
+        """
+        start = time.monotonic()
+        released = self.update_holds()
+        latency = time.monotonic() - start
+
+        for name, value in [("sweeps", 1), ("released", released)]:
+            key = f"{self.HOLD_STATS_PREFIX}:{name}"
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+        cache.set(
+            f"{self.HOLD_STATS_PREFIX}:last",
+            {
+                "time": timezone.now().isoformat(),
+                "released": released,
+                "latency": latency,
+            },
+            None,
+        )
+        return released, latency
+
+    def hold_stats(self):
+        return {
+            "sweeps": int(cache.get(f"{self.HOLD_STATS_PREFIX}:sweeps", 0)),
+            "released": int(cache.get(f"{self.HOLD_STATS_PREFIX}:released", 0)),
+            "last_sweep": cache.get(f"{self.HOLD_STATS_PREFIX}:last"),
+        }
+
+    def counts_by_showing(self, showing_ids):
+        """
+        Return the number of total, sold and held tickets for each showing, and the
+        number of available tickets of each type, in one grouped query.
+        """
+        counts = {
+            showing_id: {"total": 0, "sold": 0, "held": 0, "available": {}}
+            for showing_id in showing_ids
+        }
+        if not counts:
+            return counts
+
+        held = self.held_q()
+        rows = (
+            self.get_queryset()
+            .filter(showing_id__in=counts.keys())
+            .order_by()
+            .values("showing_id", "type")
+            .annotate(
+                total=Count("id"),
+                sold=Count("id", filter=Q(owner__isnull=False)),
+                held=Count("id", filter=Q(owner__isnull=True) & held),
+                available=Count(
+                    "id", filter=Q(owner__isnull=True, buyable=True) & ~held
+                ),
+            )
+        )
+        for row in rows:
+            showing = counts[row["showing_id"]]
+            for key in ["total", "sold", "held"]:
+                showing[key] += row[key]
+            if row["available"]:
+                showing["available"][row["type"]] = row["available"]
+        return counts
+
+    def reserve(self, showing, type, count, user, exclude=None):
+        """
+        Place a hold for the user on count available tickets of a type for a
+        showing, skipping tickets that are locked by concurrent reservations.
+
+        Returns the ids of the held tickets, or None if there are not enough
+        available tickets, in which case nothing is held.
+        """
+        now = timezone.now()
+        expiration = now + self.HOLD_DURATION
+        available = self.get_queryset().filter(
+            ~self.held_q(now),
+            showing=showing,
+            type=type,
+            owner__isnull=True,
+            buyable=True,
+        )
+        if exclude is not None:
+            available = available.exclude(id__in=exclude)
+
         with transaction.atomic():
-            self.get_queryset().select_for_update().filter(
-                holder__isnull=False, holding_expiration__lte=timezone.now()
-            ).update(holder=None)
+            held = []
+            while len(held) < count:
+                ids = list(
+                    available.select_for_update(skip_locked=True).values_list(
+                        "id", flat=True
+                    )[: count - len(held)]
+                )
+                if not ids:
+                    break
+
+                # the holder check keeps this safe on databases without row locks
+                won = (
+                    self.get_queryset()
+                    .filter(~self.held_q(now), id__in=ids, owner__isnull=True)
+                    .update(holder=user, holding_expiration=expiration)
+                )
+                if won < len(ids):
+                    ids = (
+                        self.get_queryset()
+                        .filter(id__in=ids, holder=user, holding_expiration=expiration)
+                        .values_list("id", flat=True)
+                    )
+                held.extend(ids)
+
+            if len(held) < count:
+                self.get_queryset().filter(id__in=held).update(
+                    holder=None, holding_expiration=None
+                )
+                return None
+        return held
 
     def get_queryset(self):
         return TicketQuerySet(self.model)
@@ -2394,6 +3012,34 @@ class ClubApprovalResponseTemplate(models.Model):
         return self.title
 
 
+@receiver(models.signals.pre_save, sender=Club)
+@receiver(models.signals.pre_save, sender=Event)
+@receiver(models.signals.pre_save, sender=Profile)
+def image_source_changed(sender, instance, **kwargs):
+    instance._image_changed = False
+    if instance.image_source_id is None:
+        return
+
+    # a newly assigned file has not been committed to storage yet,
+    # files saved directly to storage have a different name instead
+    instance._image_changed = (
+        not instance.image
+        or not instance.image._committed
+        or not sender.objects.filter(pk=instance.pk, image=instance.image.name).exists()
+    )
+
+
+@receiver(models.signals.post_save, sender=Club)
+@receiver(models.signals.post_save, sender=Event)
+@receiver(models.signals.post_save, sender=Profile)
+def image_source_reset(sender, instance, **kwargs):
+    # queue the new image for the generate_image_variants command
+    if getattr(instance, "_image_changed", False):
+        instance._image_changed = False
+        instance.image_source = None
+        sender.objects.filter(pk=instance.pk).update(image_source=None)
+
+
 @receiver(models.signals.pre_delete, sender=Asset)
 def asset_delete_cleanup(sender, instance, **kwargs):
     if instance.file:
@@ -2407,6 +3053,185 @@ def club_delete_cleanup(sender, instance, **kwargs):
         instance.image_small.delete(save=True)
 
 
+@receiver(models.signals.pre_save, sender=Club)
+@receiver(models.signals.pre_delete, sender=Club)
+def club_list_cache_snapshot(sender, instance, **kwargs):
+    club_list_cache.snapshot(instance)
+
+
+@receiver(models.signals.post_save, sender=Club)
+def club_list_cache_save(sender, instance, **kwargs):
+    club_list_cache.invalidate_club(instance)
+
+
+@receiver(models.signals.post_delete, sender=Club)
+def club_list_cache_delete(sender, instance, **kwargs):
+    club_list_cache.invalidate_club(instance, deleted=True)
+
+
+def club_list_cache_m2m_changed(sender, instance, action, reverse, **kwargs):
+    # reverse changes (ex: tag.club_set.add) can touch any number of clubs
+    if reverse:
+        if action.startswith("post_"):
+            club_list_cache.invalidate_all()
+    elif action.startswith("pre_"):
+        club_list_cache.snapshot(instance)
+    else:
+        club_list_cache.invalidate_club(instance)
+
+
+for field in CLUB_LIST_M2M_FACETS:
+    models.signals.m2m_changed.connect(
+        club_list_cache_m2m_changed, sender=getattr(Club, field).through
+    )
+
+
+@receiver(models.signals.m2m_changed, sender=Club.parent_orgs.through)
+def club_ancestry_parents_changed(sender, action, **kwargs):
+    if action in {"post_add", "post_remove", "post_clear"}:
+        ClubAncestry.rebuild()
+
+
+@receiver(models.signals.pre_delete, sender=Club)
+def club_ancestry_club_deleting(sender, instance, **kwargs):
+    # the rows of the club itself are removed by the cascade, but its descendants
+    # may also have been linked to its ancestors through it
+    instance._ancestry_descendants = []
+    if ClubAncestry.objects.filter(descendant=instance).exists():
+        instance._ancestry_descendants = list(
+            ClubAncestry.objects.filter(ancestor=instance).values_list(
+                "descendant_id", flat=True
+            )
+        )
+
+
+@receiver(models.signals.post_delete, sender=Club)
+def club_ancestry_club_deleted(sender, instance, **kwargs):
+    descendants = getattr(instance, "_ancestry_descendants", None)
+    if descendants:
+        ClubAncestry.rebuild(descendants)
+
+
+@receiver(models.signals.post_save, sender=TargetStudentType)
+@receiver(models.signals.post_save, sender=TargetYear)
+@receiver(models.signals.post_save, sender=TargetSchool)
+@receiver(models.signals.post_save, sender=TargetMajor)
+@receiver(models.signals.post_delete, sender=TargetStudentType)
+@receiver(models.signals.post_delete, sender=TargetYear)
+@receiver(models.signals.post_delete, sender=TargetSchool)
+@receiver(models.signals.post_delete, sender=TargetMajor)
+def club_list_cache_target_changed(sender, instance, created=True, **kwargs):
+    # only new or removed rows change which clubs match a filter
+    if not created:
+        return
+    club = Club.objects.filter(pk=instance.club_id).first()
+    if club is not None:
+        field = {
+            TargetStudentType: "student_types",
+            TargetYear: "target_years",
+            TargetSchool: "target_schools",
+            TargetMajor: "target_majors",
+        }[sender]
+        club_list_cache.invalidate_club(club, wildcard=[field])
+
+
+@receiver(models.signals.post_save, sender=Club)
+@receiver(models.signals.post_delete, sender=Club)
+def club_search_index_update(sender, instance, update_fields=None, **kwargs):
+    # skip partial saves that don't touch any indexed text
+    if update_fields is not None and not SEARCH_FIELD_WEIGHTS.keys() & update_fields:
+        return
+    club_search_index.mark_changed(instance.pk)
+
+
+@receiver(models.signals.post_save, sender=Club)
+def club_approved_snapshot_update(sender, instance, **kwargs):
+    # pending changes leave the previously approved snapshot in place
+    if instance.approved:
+        club_approved_snapshots.save(instance)
+
+
+@receiver(models.signals.m2m_changed, sender=Club.tags.through)
+def club_search_index_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        club_search_index.mark_changed(instance.pk)
+    elif pk_set is not None:
+        for pk in pk_set:
+            club_search_index.mark_changed(pk)
+    else:
+        club_search_index.request_rebuild()
+
+
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+def club_search_index_tag_renamed(sender, instance, created=False, **kwargs):
+    if not created:
+        club_search_index.request_rebuild()
+
+
+@receiver(models.signals.post_save, sender=Classification)
+@receiver(models.signals.post_delete, sender=Classification)
+def classification_group_cache_invalidate(sender, instance, **kwargs):
+    cache.delete_many(
+        [
+            f"{CLASSIFICATION_GROUP_CACHE_PREFIX}:{group}"
+            for group in CLASSIFICATION_GROUPS
+        ]
+    )
+
+
+@receiver(models.signals.post_save, sender=Option)
+@receiver(models.signals.post_delete, sender=Option)
+@receiver(models.signals.post_save, sender=ClubFair)
+@receiver(models.signals.post_delete, sender=ClubFair)
+def site_options_cache_invalidate(sender, instance, **kwargs):
+    # invalidate again once committed, in case the options were rebuilt in between
+    site_options_cache.invalidate()
+    transaction.on_commit(site_options_cache.invalidate)
+
+
+@receiver(models.signals.post_save, sender=ZoomMeetingVisit)
+@receiver(models.signals.post_delete, sender=ZoomMeetingVisit)
+def fair_live_metrics_visit_changed(sender, instance, signal, **kwargs):
+    event_id = instance.event_id
+    action = (
+        ZoomMeetingVisit.JOINED
+        if signal is models.signals.post_save and instance.leave_time is None
+        else ZoomMeetingVisit.LEFT
+    )
+    transaction.on_commit(lambda: fair_live_metrics.visit_changed(event_id, action))
+
+
+@receiver(models.signals.post_save, sender=Event)
+@receiver(models.signals.post_delete, sender=Event)
+def calendar_feed_event_changed(sender, instance, **kwargs):
+    calendar_feed_cache.touch_club(instance.club_id)
+
+
+@receiver(models.signals.post_save, sender=EventShowing)
+@receiver(models.signals.post_delete, sender=EventShowing)
+def calendar_feed_showing_changed(sender, instance, **kwargs):
+    club_id = (
+        Event.objects.filter(pk=instance.event_id)
+        .values_list("club_id", flat=True)
+        .first()
+    )
+    calendar_feed_cache.touch_club(club_id)
+
+
+@receiver(models.signals.post_save, sender=Club)
+def calendar_feed_club_changed(sender, instance, **kwargs):
+    calendar_feed_cache.touch_club(instance.pk)
+
+
+@receiver(models.signals.post_save, sender=Favorite)
+@receiver(models.signals.post_delete, sender=Favorite)
+def calendar_feed_favorites_changed(sender, instance, **kwargs):
+    calendar_feed_cache.touch(f"favorites:{instance.person_id}")
+
+
 @receiver(models.signals.post_delete, sender=Event)
 def event_delete_cleanup(sender, instance, **kwargs):
     if instance.image:
@@ -2577,3 +3402,429 @@ class RankingWeights(models.Model):
     def get(cls):
         obj, _ = cls.objects.get_or_create(pk=cls.SINGLETON_PK)
         return obj
+
+
+class OutboxBatch(models.Model):
+    """
+    A group of emails queued in the outbox together, such as the invitations of a
+    mass invite, used to report on their delivery.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255)
+    creator = models.ForeignKey(
+        get_user_model(), on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    @contextlib.contextmanager
+    def collect(cls, name, creator=None):
+        """
+        Queue every email sent with send_mail_helper inside this block in a new
+        batch instead of sending it right away. If the block raises an exception,
+        none of its emails are queued.
+        """
+        batch = cls.objects.create(name=name, creator=creator)
+        # emails are inserted together when the block exits
+        batch.buffer = []
+        token = current_outbox_batch.set(batch)
+        try:
+            yield batch
+        except BaseException:
+            batch.buffer = None
+            raise
+        else:
+            OutboxEmail.objects.bulk_create(batch.buffer, batch_size=500)
+            batch.buffer = None
+        finally:
+            current_outbox_batch.reset(token)
+
+    def progress(self):
+        """
+        Return the number of emails in this batch with each delivery status.
+        """
+        counts = dict(
+            self.emails.order_by()
+            .values("status")
+            .annotate(count=Count("id"))
+            .values_list("status", "count")
+        )
+        return {
+            "total": sum(counts.values()),
+            "pending": counts.get(OutboxEmail.PENDING, 0),
+            "sent": counts.get(OutboxEmail.SENT, 0),
+            "failed": counts.get(OutboxEmail.FAILED, 0),
+        }
+
+    def __str__(self):
+        return f"{self.name} ({self.created_at})"
+
+
+class OutboxEmailManager(models.Manager):
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = datetime.timedelta(minutes=1)
+    # emails claimed by a worker are only retried by another worker after this
+    LEASE_DURATION = datetime.timedelta(minutes=5)
+    CLAIM_SIZE = 50
+
+    def enqueue(self, message, template, batch=None):
+        """
+        Store a fully rendered message to be sent by the send_outbox command.
+        """
+        email = self.model(
+            batch=batch,
+            template=template,
+            subject=message.subject,
+            from_email=message.from_email,
+            to=json.dumps(message.to),
+            reply_to=json.dumps(message.reply_to),
+            text_content=message.body,
+            html_content=message.alternatives[0][0] if message.alternatives else "",
+            next_attempt_at=timezone.now(),
+        )
+        for attachment in message.attachments[:1]:
+            if isinstance(attachment, MIMEImage):
+                email.attachment = attachment.get_payload(decode=True)
+                email.attachment_filename = attachment.get_filename() or ""
+                email.attachment_mimetype = attachment.get_content_type()
+                email.attachment_content_id = attachment["Content-ID"].strip("<>")
+            else:
+                filename, content, mimetype = attachment
+                email.attachment = content
+                email.attachment_filename = filename
+                email.attachment_mimetype = mimetype
+        if batch is not None and getattr(batch, "buffer", None) is not None:
+            batch.buffer.append(email)
+        else:
+            email.save()
+        return email
+
+    def claim(self, limit, batch=None):
+        """
+        Lease up to limit emails that are due, skipping emails that are locked by
+        other workers.
+        """
+        now = timezone.now()
+        queryset = self.get_queryset().filter(
+            status=OutboxEmail.PENDING, next_attempt_at__lte=now
+        )
+        if batch is not None:
+            queryset = queryset.filter(batch=batch)
+
+        with transaction.atomic():
+            ids = list(
+                queryset.order_by("next_attempt_at", "id")
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:limit]
+            )
+            self.get_queryset().filter(id__in=ids).update(
+                next_attempt_at=now + self.LEASE_DURATION
+            )
+        return list(self.get_queryset().filter(id__in=ids).order_by("id"))
+
+    def send_pending(self, batch=None, limit=None, rate=None):
+        """
+        Send the emails that are due over a single reused connection, sending at
+        most rate emails per second. Failed emails are retried with exponential
+        backoff until they run out of attempts.
+
+        Returns the number of emails that were sent and that failed.
+        """
+        connection = get_connection()
+        sent = failed = 0
+        last_send = None
+        try:
+            while limit is None or sent + failed < limit:
+                size = self.CLAIM_SIZE
+                if limit is not None:
+                    size = min(size, limit - sent - failed)
+                emails = self.claim(size, batch)
+                if not emails:
+                    break
+
+                for email in emails:
+                    if rate and last_send is not None:
+                        time.sleep(max(0, last_send + 1 / rate - time.monotonic()))
+                    last_send = time.monotonic()
+
+                    email.attempts += 1
+                    try:
+                        connection.open()
+                        connection.send_messages([email.to_message(connection)])
+                    except (SMTPException, OSError) as e:
+                        # the server may have dropped the connection
+                        connection.close()
+                        email.last_error = str(e)
+                        if email.attempts >= self.MAX_ATTEMPTS:
+                            email.status = OutboxEmail.FAILED
+                        else:
+                            email.next_attempt_at = timezone.now() + (
+                                self.RETRY_DELAY * 2 ** (email.attempts - 1)
+                            )
+                        failed += 1
+                    else:
+                        email.status = OutboxEmail.SENT
+                        email.sent_at = timezone.now()
+                        sent += 1
+                    email.save(
+                        update_fields=[
+                            "status",
+                            "attempts",
+                            "next_attempt_at",
+                            "last_error",
+                            "sent_at",
+                        ]
+                    )
+        finally:
+            connection.close()
+        return sent, failed
+
+
+class OutboxEmail(models.Model):
+    """
+    A rendered email waiting to be delivered by the send_outbox command.
+    """
+
+    PENDING = 1
+    SENT = 2
+    FAILED = 3
+    STATUS_CHOICES = ((PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed"))
+
+    batch = models.ForeignKey(
+        OutboxBatch,
+        on_delete=models.CASCADE,
+        related_name="emails",
+        null=True,
+        blank=True,
+    )
+    template = models.CharField(max_length=255)
+    subject = models.TextField()
+    from_email = models.TextField()
+    # json lists of email addresses
+    to = models.TextField()
+    reply_to = models.TextField(default="[]")
+    text_content = models.TextField()
+    html_content = models.TextField()
+
+    attachment = models.BinaryField(null=True, blank=True)
+    attachment_filename = models.CharField(max_length=255, blank=True)
+    attachment_mimetype = models.CharField(max_length=255, blank=True)
+    # only set for inline images
+    attachment_content_id = models.CharField(max_length=255, blank=True)
+
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxEmailManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def to_message(self, connection=None):
+        msg = EmailMultiAlternatives(
+            self.subject,
+            self.text_content,
+            self.from_email,
+            json.loads(self.to),
+            reply_to=json.loads(self.reply_to) or None,
+            connection=connection,
+        )
+        if self.attachment is not None:
+            content = bytes(self.attachment)
+            if self.attachment_content_id:
+                image = MIMEImage(
+                    content, _subtype=self.attachment_mimetype.split("/")[-1]
+                )
+                image.add_header("Content-ID", f"<{self.attachment_content_id}>")
+                image.add_header(
+                    "Content-Disposition",
+                    "inline",
+                    filename=self.attachment_filename,
+                )
+                msg.attach(image)
+                msg.mixed_subtype = "related"
+            else:
+                msg.attach(self.attachment_filename, content, self.attachment_mimetype)
+        msg.attach_alternative(self.html_content, "text/html")
+        return msg
+
+    def __str__(self):
+        return f"<OutboxEmail: {self.template} to {self.to}>"
+
+
+class ExportJob(models.Model):
+    """
+    A spreadsheet export that is built in the background by the run_export_jobs
+    command, instead of inside of the request that asked for it.
+    """
+
+    PENDING = 1
+    RUNNING = 2
+    DONE = 3
+    FAILED = 4
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    KIND_REPORT = "report"
+    KIND_SUBMISSIONS = "submissions"
+    KIND_ALL_SUBMISSIONS = "all_submissions"
+    KIND_CHOICES = (
+        (KIND_REPORT, "Club Report"),
+        (KIND_SUBMISSIONS, "Application Submissions"),
+        (KIND_ALL_SUBMISSIONS, "Application Submissions for Cycle"),
+    )
+
+    # identical requests made within this window reuse the same export
+    REUSE_WINDOW = datetime.timedelta(minutes=15)
+    # download links and finished exports expire after this long
+    MAX_AGE = datetime.timedelta(days=1)
+    # running exports whose worker has not reported back for this long are retried
+    LEASE_DURATION = datetime.timedelta(minutes=5)
+    # shown to the creator of a failed export, the details are only in the logs
+    FAILURE_MESSAGE = "This export could not be generated. Please try again later."
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    creator = models.ForeignKey(
+        get_user_model(), on_delete=models.SET_NULL, null=True, blank=True
+    )
+    # json object of the options the export was requested with
+    parameters = models.TextField(default="{}")
+    fingerprint = models.CharField(max_length=64, db_index=True)
+
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING)
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    file = models.FileField(upload_to=get_export_file_name, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    @staticmethod
+    def get_fingerprint(kind, creator, parameters):
+        key = json.dumps([kind, creator.pk, parameters], sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def request(cls, kind, creator, parameters):
+        """
+        Queue an export, or return the export queued by an identical request
+        within the reuse window if there is one. Returns (job, created).
+
+        Failed exports and exports whose worker stopped reporting back are not
+        reused.
+        """
+        now = timezone.now()
+        fingerprint = cls.get_fingerprint(kind, creator, parameters)
+        existing = (
+            cls.objects.filter(
+                fingerprint=fingerprint,
+                created_at__gte=now - cls.REUSE_WINDOW,
+            )
+            .exclude(status=cls.FAILED)
+            .exclude(status=cls.RUNNING, lease_expires_at__lt=now)
+            .order_by("-created_at")
+            .first()
+        )
+        if existing is not None:
+            return existing, False
+
+        job = cls.objects.create(
+            kind=kind,
+            creator=creator,
+            parameters=json.dumps(parameters),
+            fingerprint=fingerprint,
+        )
+        return job, True
+
+    @classmethod
+    def claim(cls):
+        """
+        Lease the oldest pending export, or running export whose lease has lapsed,
+        mark it as running and return it, skipping exports that are locked by
+        other workers.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                cls.objects.filter(
+                    Q(status=cls.PENDING)
+                    | Q(status=cls.RUNNING, lease_expires_at__lt=now)
+                )
+                .order_by("created_at")
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if job is not None:
+                job.status = cls.RUNNING
+                job.progress = 0
+                job.started_at = now
+                job.lease_expires_at = now + cls.LEASE_DURATION
+                job.save(
+                    update_fields=[
+                        "status",
+                        "progress",
+                        "started_at",
+                        "lease_expires_at",
+                    ]
+                )
+        return job
+
+    def renew_lease(self, *fields):
+        """
+        Extend the lease of a running export, saving the given fields with it.
+        """
+        self.lease_expires_at = timezone.now() + self.LEASE_DURATION
+        self.save(update_fields=["lease_expires_at", *fields])
+
+    def get_parameters(self):
+        return json.loads(self.parameters)
+
+    def get_download_token(self):
+        return TimestampSigner(salt="export-job").sign(str(self.id))
+
+    @classmethod
+    def from_download_token(cls, token):
+        """
+        Return the finished export that the download token was signed for,
+        or None if the token is invalid or has expired.
+        """
+        try:
+            job_id = TimestampSigner(salt="export-job").unsign(
+                token, max_age=cls.MAX_AGE
+            )
+        except (BadSignature, SignatureExpired):
+            return None
+        return cls.objects.filter(id=job_id, status=cls.DONE).first()
+
+    def publish(self):
+        """
+        Send the progress of this export to the clients that are watching it.
+        """
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(
+            f"exports-{self.id}",
+            {
+                "type": "export_progress",
+                "status": self.status,
+                "progress": self.progress,
+                "total": self.total,
+            },
+        )
+
+    def __str__(self):
+        return f"<ExportJob: {self.kind} by {self.creator}>"
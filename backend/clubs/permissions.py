@@ -1,30 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from rest_framework import permissions
 
-from clubs.models import Club, Membership
-
-
-def codes_extract_helper(obj, key):
-    """
-    Traverses parent tree and returns
-    flattened list of parent club codes
-    """
-    arr = []
-
-    def extract(obj, arr, key):
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if isinstance(v, (dict, list)):
-                    extract(v, arr, key)
-                elif k == key:
-                    arr.append(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                extract(item, arr, key)
-        return arr
-
-    values = extract(obj, arr, key)
-    return values
+from clubs.models import Club, ClubAncestry, Membership
 
 
 def find_membership_helper(user, club):
@@ -34,18 +12,89 @@ def find_membership_helper(user, club):
 
     Returns None if there is no membership between the specified club and user.
     """
-    from clubs.views import find_relationship_helper
-
-    related_codes = codes_extract_helper(
-        find_relationship_helper("parent_orgs", club, {club.code}), "code"
-    )
-    membership_instance = (
-        Membership.objects.filter(person=user, club__code__in=related_codes)
+    return (
+        Membership.objects.filter(
+            Q(club=club) | Q(club__descendant_links__descendant=club), person=user
+        )
         .order_by("role")
         .first()
     )
 
-    return membership_instance
+
+class ClubRoleResolver:
+    """
+    Resolves the most authoritative role that a user has in each club, counting
+    memberships in the parent organizations of the club.
+
+    The memberships of the user are loaded once and the ancestry of every batch of
+    clubs is loaded in a single query, so checking permissions for any number of
+    clubs takes a constant number of queries. Roles are keyed by club code and are
+    None if the user has no membership in the club or its parents.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._memberships = None
+        self._roles = {}
+
+    def get_memberships(self):
+        if self._memberships is None:
+            self._memberships = {}
+            if self.user.is_authenticated:
+                self._memberships = {
+                    club_id: (code, role)
+                    for club_id, code, role in Membership.objects.filter(
+                        person=self.user
+                    ).values_list("club_id", "club__code", "role")
+                }
+        return self._memberships
+
+    def prefetch(self, codes):
+        """
+        Resolve the roles of the user in all of the given clubs at once.
+        """
+        codes = {code for code in codes if code not in self._roles}
+        if not codes:
+            return
+
+        memberships = self.get_memberships()
+        roles = {code: role for code, role in memberships.values() if code in codes}
+        if memberships:
+            for code, ancestor in ClubAncestry.objects.filter(
+                ancestor_id__in=memberships.keys(), descendant__code__in=codes
+            ).values_list("descendant__code", "ancestor_id"):
+                role = memberships[ancestor][1]
+                roles[code] = min(roles.get(code, role), role)
+
+        for code in codes:
+            self._roles[code] = roles.get(code)
+
+    def get_role(self, code):
+        self.prefetch([code])
+        return self._roles[code]
+
+    def is_member(self, code):
+        return self.get_role(code) is not None
+
+    def is_officer(self, code):
+        role = self.get_role(code)
+        return role is not None and role <= Membership.ROLE_OFFICER
+
+    def is_owner(self, code):
+        role = self.get_role(code)
+        return role is not None and role <= Membership.ROLE_OWNER
+
+
+def get_club_roles(request):
+    """
+    Return the club role resolver of the requesting user, which is shared by every
+    permission check made during the request.
+    """
+    resolver = getattr(request, "_club_roles", None)
+    if resolver is None or resolver.user != request.user:
+        resolver = ClubRoleResolver(request.user)
+        request._club_roles = resolver
+    return resolver
 
 
 class ReadOnly(permissions.BasePermission):
@@ -141,7 +190,7 @@ class ClubPermission(permissions.BasePermission):
             return request.user.is_authenticated and (
                 request.user.has_perm("clubs.see_pending_clubs")
                 or request.user.has_perm("clubs.manage_club")
-                or find_membership_helper(request.user, obj) is not None
+                or get_club_roles(request).is_member(obj.code)
             )
 
         if not request.user.is_authenticated:
@@ -161,14 +210,11 @@ class ClubPermission(permissions.BasePermission):
             return True
 
         # user must be in club or parent club to perform non-view actions
-        membership = find_membership_helper(request.user, obj)
-        if membership is None:
-            return False
         # user has to be an owner to delete a club, an officer to edit it
         if view.action in {"destroy"}:
-            return membership.role <= Membership.ROLE_OWNER
+            return get_club_roles(request).is_owner(obj.code)
         else:
-            return membership.role <= Membership.ROLE_OFFICER
+            return get_club_roles(request).is_officer(obj.code)
 
     def has_permission(self, request, view):
         if view.action in {"email_blast"}:
@@ -328,9 +374,7 @@ class ClubItemPermission(permissions.BasePermission):
                 return False
             if request.user.has_perm("clubs.manage_club"):
                 return True
-            obj = Club.objects.get(code=view.kwargs["club_code"])
-            membership = find_membership_helper(request.user, obj)
-            return membership is not None and membership.role <= Membership.ROLE_OFFICER
+            return get_club_roles(request).is_officer(view.kwargs["club_code"])
         else:
             return True
 
@@ -348,9 +392,7 @@ class ClubSensitiveItemPermission(permissions.BasePermission):
             return False
         if request.user.has_perm("clubs.manage_club"):
             return True
-        obj = Club.objects.get(code=view.kwargs["club_code"])
-        membership = find_membership_helper(request.user, obj)
-        return membership is not None and membership.role <= Membership.ROLE_OFFICER
+        return get_club_roles(request).is_officer(view.kwargs["club_code"])
 
 
 class IsSuperuser(permissions.BasePermission):
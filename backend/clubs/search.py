@@ -0,0 +1,274 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from django.core.cache import cache
+
+
+# relative importance of a match in each indexed field
+SEARCH_FIELD_WEIGHTS = {
+    "name": 10,
+    "code": 8,
+    "subtitle": 4,
+    "terms": 4,
+    "tags": 3,
+    "description": 1,
+}
+
+# most clubs returned for a single search, best matches first
+SEARCH_RESULT_LIMIT = 200
+
+token_regex = re.compile(r"\w+", re.UNICODE)
+html_tag_regex = re.compile(r"<[^>]+>")
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens for indexing and querying.
+    """
+    if not text:
+        return []
+    return token_regex.findall(html_tag_regex.sub(" ", text).lower())
+
+
+def get_club_document(club, tags=None):
+    """
+    Return the text of each indexed field for a club.
+    If tags are not given, they are read from the club.
+    """
+    if tags is None:
+        tags = [tag.name for tag in club.tags.all()]
+    return {
+        "name": club.name,
+        "code": club.code,
+        "subtitle": club.subtitle,
+        "terms": club.terms,
+        "tags": " ".join(tags),
+        "description": club.description,
+    }
+
+
+def get_document_tokens(document):
+    """
+    Return a mapping of each token in the document to its best field weight.
+    """
+    tokens = {}
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        for token in tokenize(document.get(field)):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+def tokens_match_query(tokens, query):
+    """
+    Return whether every term in the query is a prefix of one of the tokens.
+    """
+    return all(
+        any(token.startswith(term) for token in tokens) for term in tokenize(query)
+    )
+
+
+class ClubSearchIndex:
+    """
+    A tokenized, prefix capable inverted index over club text, held in process
+    memory.
+
+    Every process keeps its own copy. Saves are recorded as numbered changes in the
+    shared cache, and each process replays the changes it has not seen yet before
+    answering a query, falling back to a full rebuild if it fell too far behind.
+    """
+
+    PREFIX = "clubs:search"
+    CHANGE_TIMEOUT = 60 * 60
+    MAX_REPLAY = 500
+    # rebuild periodically to pick up writes that bypass model signals
+    REBUILD_INTERVAL = 60 * 60
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._documents = {}
+        self._sorted_tokens = None
+        self._version = None
+        self._generation = None
+        self._built_at = None
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else cache
+
+    def _key(self, *parts):
+        return ":".join([self.PREFIX, *(str(part) for part in parts)])
+
+    def _incr(self, key):
+        try:
+            return self.backend.incr(key)
+        except ValueError:
+            self.backend.set(key, 1, None)
+            return 1
+
+    def _load_documents(self, ids=None):
+        from clubs.models import Club
+
+        queryset = Club.objects.prefetch_related("tags").only(
+            "id", "name", "code", "subtitle", "terms", "description"
+        )
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        return {club.id: get_club_document(club) for club in queryset}
+
+    def _remove(self, club_id):
+        for token in self._documents.pop(club_id, {}):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(club_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._sorted_tokens = None
+
+    def _add(self, club_id, document):
+        tokens = get_document_tokens(document)
+        self._documents[club_id] = tokens
+        for token, weight in tokens.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                self._sorted_tokens = None
+            self._postings[token][club_id] = weight
+
+    def index(self, documents):
+        """
+        Replace the contents of the index with the given club documents.
+        """
+        with self._lock:
+            self._postings = {}
+            self._documents = {}
+            self._sorted_tokens = None
+            for club_id, document in documents.items():
+                self._add(club_id, document)
+
+    def update(self, club_id, document):
+        """
+        Reindex a single club, or remove it from the index if document is None.
+        """
+        with self._lock:
+            self._remove(club_id)
+            if document is not None:
+                self._add(club_id, document)
+
+    def mark_changed(self, club_id):
+        """
+        Record that a club was modified so that every process reindexes it.
+        """
+        version = self._incr(self._key("version"))
+        self.backend.set(self._key("change", version), club_id, self.CHANGE_TIMEOUT)
+
+    def request_rebuild(self):
+        """
+        Make every process rebuild its index from the database.
+        """
+        return self._incr(self._key("generation"))
+
+    def rebuild(self):
+        state = self.backend.get_many([self._key("version"), self._key("generation")])
+        self.index(self._load_documents())
+        self._built_at = time.monotonic()
+        self._version = state.get(self._key("version"), 0)
+        self._generation = state.get(self._key("generation"), 0)
+
+    def sync(self):
+        """
+        Bring the index up to date with changes made by any process.
+        """
+        state = self.backend.get_many([self._key("version"), self._key("generation")])
+        version = state.get(self._key("version"), 0)
+        generation = state.get(self._key("generation"), 0)
+
+        with self._lock:
+            if (
+                self._version is None
+                or generation != self._generation
+                or version < self._version
+                or version - self._version > self.MAX_REPLAY
+                or time.monotonic() - self._built_at > self.REBUILD_INTERVAL
+            ):
+                self.rebuild()
+                return
+
+            if version == self._version:
+                return
+
+            keys = [
+                self._key("change", v) for v in range(self._version + 1, version + 1)
+            ]
+            changes = self.backend.get_many(keys)
+            if len(changes) != len(keys):
+                self.rebuild()
+                return
+
+            ids = set(changes.values())
+            documents = self._load_documents(ids)
+            for club_id in ids:
+                self.update(club_id, documents.get(club_id))
+            self._version = version
+
+    def stats(self):
+        with self._lock:
+            return {"clubs": len(self._documents), "tokens": len(self._postings)}
+
+    def _expand(self, term):
+        """
+        Return every indexed token that starts with the term.
+        """
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        end = bisect.bisect_left(self._sorted_tokens, term + "\U0010ffff")
+        return self._sorted_tokens[start:end]
+
+    def search(self, query, limit=None):
+        """
+        Return the ids of the clubs matching every term in the query, best match
+        first. Exact token matches rank above prefix matches.
+        If a limit is given, only that many of the best matches are returned.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        self.sync()
+
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self._expand(term):
+                    bonus = 2 if token == term else 1
+                    for club_id, weight in self._postings[token].items():
+                        score = weight * bonus
+                        if term_scores.get(club_id, 0) < score:
+                            term_scores[club_id] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        club_id: score + term_scores[club_id]
+                        for club_id, score in scores.items()
+                        if club_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+        def rank(club_id):
+            return (-scores[club_id], club_id)
+
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=rank)
+        return sorted(scores, key=rank)
+
+
+club_search_index = ClubSearchIndex()
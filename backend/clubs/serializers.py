@@ -13,11 +13,13 @@ from django.core.validators import URLValidator
 from django.db import IntegrityError, models, transaction
 from django.db.models import Prefetch
 from django.template.defaultfilters import slugify
+from django.urls import reverse
 from django.utils import timezone
 from html_diff import diff
 from rest_framework import serializers, validators
 from simple_history.utils import update_change_reason
 
+from clubs.caching import club_approved_snapshots, club_fragment_cache
 from clubs.mixins import ManyToManySaveMixin
 from clubs.models import (
     AdminNote,
@@ -43,6 +45,7 @@ from clubs.models import (
     Eligibility,
     Event,
     EventShowing,
+    ExportJob,
     Favorite,
     GroupActivityOption,
     Major,
@@ -72,7 +75,7 @@ from clubs.models import (
     Type,
     Year,
 )
-from clubs.permissions import ClubPermission
+from clubs.permissions import get_club_roles
 from clubs.utils import clean, html_to_text
 
 
@@ -112,6 +115,34 @@ class ClubRouteMixin(object):
         return super().save()
 
 
+class ImageVariantMixin(object):
+    """
+    Mixin for serializers that return image URLs, serving the smallest generated
+    variant of an image that is wide enough for where it is displayed.
+    """
+
+    def get_image_variant_url(self, source, width, *images):
+        """
+        Return the URL of the best variant of the image source, falling back to the
+        first of the given image fields that is set if no variants exist yet.
+        """
+        variant = source.get_variant(width) if source is not None else None
+        if variant is not None:
+            image = variant.file
+        else:
+            image = next((image for image in images if image), None)
+
+        # correct path rendering
+        if not image:
+            return None
+        if image.url.startswith("http"):
+            return image.url
+        elif "request" in self.context:
+            return self.context["request"].build_absolute_uri(image.url)
+        else:
+            return image.url
+
+
 class ApplicationCycleSerializer(serializers.ModelSerializer):
     class Meta:
         model = ApplicationCycle
@@ -392,6 +423,37 @@ class ReportSerializer(serializers.ModelSerializer):
         )
 
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField("get_download_url")
+
+    def get_download_url(self, obj):
+        """
+        Return a signed link to download the export once it has finished.
+        """
+        if obj.status != ExportJob.DONE:
+            return None
+        url = "{}?token={}".format(
+            reverse("exports-download", args=(obj.id,)), obj.get_download_token()
+        )
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "progress",
+            "total",
+            "error",
+            "download_url",
+            "created_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
 class YearSerializer(serializers.ModelSerializer):
     name = serializers.CharField()
     year = serializers.ReadOnlyField()
@@ -409,6 +471,29 @@ class AdvisorSerializer(
         fields = ("id", "name", "title", "department", "email", "phone", "visibility")
 
 
+def attach_ticket_counts(showings):
+    """
+    Set the ticket counts on each showing that does not have them yet, using one
+    grouped query instead of loading any tickets.
+    """
+    missing = [showing for showing in showings if not hasattr(showing, "ticket_counts")]
+    if missing:
+        counts = Ticket.objects.counts_by_showing([showing.id for showing in missing])
+        for showing in missing:
+            showing.ticket_counts = counts[showing.id]
+
+
+class EventShowingListSerializer(serializers.ListSerializer):
+    """
+    Loads the ticket counts for every listed showing at once.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        attach_ticket_counts(iterable)
+        return super().to_representation(iterable)
+
+
 class EventShowingSerializer(serializers.ModelSerializer):
     """
     Serializer for an event showing.
@@ -417,8 +502,9 @@ class EventShowingSerializer(serializers.ModelSerializer):
     event = serializers.PrimaryKeyRelatedField(read_only=True)
     ticketed = serializers.SerializerMethodField("get_ticketed")
 
-    def get_ticketed(self, obj):
-        return obj.tickets.exists()
+    def get_ticketed(self, obj) -> bool:
+        attach_ticket_counts([obj])
+        return obj.ticket_counts["total"] > 0
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -445,6 +531,7 @@ class EventShowingSerializer(serializers.ModelSerializer):
             "ticket_drop_time",
             "ticketed",
         ]
+        list_serializer_class = EventShowingListSerializer
 
 
 class EventShowingWriteSerializer(EventShowingSerializer):
@@ -529,7 +616,25 @@ class EventShowingWriteSerializer(EventShowingSerializer):
         return super().update(instance, validated_data)
 
 
-class ClubEventSerializer(serializers.ModelSerializer):
+class EventListSerializer(serializers.ListSerializer):
+    """
+    Loads the ticket counts for the showings of every listed event at once.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        attach_ticket_counts(
+            [
+                showing
+                for event in iterable
+                if "eventshowing_set" in getattr(event, "_prefetched_objects_cache", {})
+                for showing in event.eventshowing_set.all()
+            ]
+        )
+        return super().to_representation(iterable)
+
+
+class ClubEventSerializer(ImageVariantMixin, serializers.ModelSerializer):
     """
     Within the context of an existing club, return events that are a part of this club.
     """
@@ -550,6 +655,10 @@ class ClubEventSerializer(serializers.ModelSerializer):
     latest_end_time = serializers.DateTimeField(read_only=True)
 
     def get_ticketed(self, obj) -> bool:
+        if "eventshowing_set" in getattr(obj, "_prefetched_objects_cache", {}):
+            showings = obj.eventshowing_set.all()
+            attach_ticket_counts(showings)
+            return any(showing.ticket_counts["total"] > 0 for showing in showings)
         return obj.eventshowing_set.filter(tickets__isnull=False).exists()
 
     def get_event_url(self, obj):
@@ -580,20 +689,10 @@ class ClubEventSerializer(serializers.ModelSerializer):
             return image.url
 
     def get_image_url(self, obj):
-        # use thumbnail if exists
-        image = obj.image_small
-        if not image:
-            image = obj.image
-
-        # fix image path in development
-        if not image:
-            return None
-        if image.url.startswith("http"):
-            return image.url
-        elif "request" in self.context:
-            return self.context["request"].build_absolute_uri(image.url)
-        else:
-            return image.url
+        # use generated variant or thumbnail if exists
+        return self.get_image_variant_url(
+            obj.image_source, 640, obj.image_small, obj.image
+        )
 
     def validate_url(self, value):
         """
@@ -662,6 +761,7 @@ class ClubEventSerializer(serializers.ModelSerializer):
             "earliest_end_time",
             "latest_end_time",
         ]
+        list_serializer_class = EventListSerializer
 
 
 class EventSerializer(ClubEventSerializer):
@@ -689,6 +789,7 @@ class EventSerializer(ClubEventSerializer):
             "badges",
             "pinned",
         ]
+        list_serializer_class = EventListSerializer
 
 
 class EventWriteSerializer(EventSerializer):
@@ -1077,7 +1178,26 @@ class ClubDiffSerializer(serializers.ModelSerializer):
         return {instance.code: diff}
 
 
-class ClubListSerializer(serializers.ModelSerializer):
+class ClubFragmentListSerializer(serializers.ListSerializer):
+    """
+    Serializes a list of clubs from cached per club fragments, only evaluating the
+    fields specific to the requesting user.
+    """
+
+    user_fields = ["is_favorite", "is_subscribe", "is_member"]
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        iterable = self.child.get_visible_instances(list(iterable))
+
+        # subclasses can add their own user specific fields
+        if type(self.child) is not ClubListSerializer:
+            return super().to_representation(iterable)
+
+        return club_fragment_cache.represent(self.child, iterable, self.user_fields)
+
+
+class ClubListSerializer(ImageVariantMixin, serializers.ModelSerializer):
     """
     The club list serializer returns a subset of the information that the full
     serializer returns.
@@ -1149,20 +1269,10 @@ class ClubListSerializer(serializers.ModelSerializer):
         return mship.role
 
     def get_image_url(self, obj):
-        # use small version if exists
-        image = obj.image_small
-        if not image:
-            image = obj.image
-
-        # correct path rendering
-        if not image:
-            return None
-        if image.url.startswith("http"):
-            return image.url
-        elif "request" in self.context:
-            return self.context["request"].build_absolute_uri(image.url)
-        else:
-            return image.url
+        # use generated variant or small version if exists
+        return self.get_image_variant_url(
+            obj.image_source, 320, obj.image_small, obj.image
+        )
 
     def get_fields(self):
         """
@@ -1192,37 +1302,55 @@ class ClubListSerializer(serializers.ModelSerializer):
 
         return fields_subset if len(fields_subset) > 0 else all_fields
 
+    def get_visible_instances(self, instances):
+        """
+        Replace every ghost club with pending changes that the requesting user
+        should not see with its last approved version.
+        """
+        pending = [club for club in instances if club.ghost and not club.approved]
+        if not pending:
+            return instances
+
+        request = self.context["request"]
+        user = request.user
+
+        # admins, club members, and anyone with permission to edit the club
+        # can see its latest, potentially unapproved version
+        if user.is_authenticated and (
+            user.has_perm("clubs.see_pending_clubs")
+            or user.has_perm("clubs.manage_club")
+        ):
+            hidden = []
+        elif user.is_authenticated:
+            roles = get_club_roles(request)
+            roles.prefetch(club.code for club in pending)
+            # members can see their own clubs, and officers of a parent club can
+            # see the clubs that they are allowed to edit
+            member_codes = {code for code, _ in roles.get_memberships().values()}
+            hidden = [
+                club
+                for club in pending
+                if club.code not in member_codes and not roles.is_officer(club.code)
+            ]
+        else:
+            hidden = pending
+
+        for club in pending:
+            club._pending_visible = True
+        approved = club_approved_snapshots.get_many(hidden)
+        return [approved.get(club.pk, club) for club in instances]
+
     def to_representation(self, instance):
         """
         Return the previous approved version of a club for users
         that should not see unapproved content.
         """
-        if instance.ghost and not instance.approved:
-            user = self.context["request"].user
-
-            # admins, club members, and anyone with permission to edit the club
-            # can see its latest, potentially unapproved version
-            can_see_pending = (
-                user.has_perm("clubs.see_pending_clubs")
-                or user.has_perm("clubs.manage_club")
-                or ClubPermission().has_object_permission(
-                    self.context["request"], FakeView("update"), instance
-                )
-            )
-            is_member = (
-                user.is_authenticated
-                and instance.membership_set.filter(person=user).exists()
-            )
-            if not can_see_pending and not is_member:
-                historical_club = (
-                    instance.history.filter(approved=True)
-                    .order_by("-approved_on")
-                    .first()
-                )
-                if historical_club is not None:
-                    approved_instance = historical_club.instance
-                    approved_instance._is_historical = True
-                    return super().to_representation(approved_instance)
+        if (
+            instance.ghost
+            and not instance.approved
+            and not getattr(instance, "_pending_visible", False)
+        ):
+            instance = self.get_visible_instances([instance])[0]
         return super().to_representation(instance)
 
     class Meta:
@@ -1252,6 +1380,7 @@ class ClubListSerializer(serializers.ModelSerializer):
             "subtitle",
             "tags",
         ]
+        list_serializer_class = ClubFragmentListSerializer
         extra_kwargs = {
             "name": {
                 "validators": [validators.UniqueValidator(queryset=Club.objects.all())],
@@ -1543,9 +1672,11 @@ class ClubSerializer(ManyToManySaveMixin, ClubListSerializer):
             event__in=events, end_time__gte=now
         ).order_by("start_time")
 
-        active_events = Event.objects.filter(
-            id__in=active_showings.values_list("event", flat=True)
-        ).distinct()
+        active_events = (
+            Event.objects.filter(id__in=active_showings.values_list("event", flat=True))
+            .prefetch_related("image_source__variants")
+            .distinct()
+        )
 
         return ClubEventSerializer(
             active_events,
@@ -2483,7 +2614,7 @@ class MinimalUserProfileSerializer(serializers.ModelSerializer):
         fields = ["name", "username", "email"]
 
 
-class UserProfileSerializer(MinimalUserProfileSerializer):
+class UserProfileSerializer(ImageVariantMixin, MinimalUserProfileSerializer):
     """
     A profile serializer used to display user information to other users.
     """
@@ -2496,14 +2627,9 @@ class UserProfileSerializer(MinimalUserProfileSerializer):
     major = MajorSerializer(many=True, source="profile.major")
 
     def get_image_url(self, obj):
-        if not obj.profile.image:
-            return None
-        if obj.profile.image.url.startswith("http"):
-            return obj.profile.image.url
-        elif "request" in self.context:
-            return self.context["request"].build_absolute_uri(obj.profile.image.url)
-        else:
-            return obj.profile.image.url
+        return self.get_image_variant_url(
+            obj.profile.image_source, 160, obj.profile.image
+        )
 
     def get_clubs(self, obj):
         user = self.context["request"].user
@@ -2511,6 +2637,7 @@ class UserProfileSerializer(MinimalUserProfileSerializer):
             user = None
         queryset = Club.objects.filter(membership__person=obj).prefetch_related(
             "tags",
+            "image_source__variants",
             Prefetch(
                 "favorite_set",
                 queryset=Favorite.objects.filter(person=user),
@@ -2555,7 +2682,7 @@ class UserProfileSerializer(MinimalUserProfileSerializer):
         ]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ImageVariantMixin, serializers.ModelSerializer):
     username = serializers.CharField(read_only=True)
     email = serializers.EmailField(read_only=True)
     name = serializers.SerializerMethodField("get_full_name")
@@ -2604,14 +2731,9 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def get_image_url(self, obj):
-        if not obj.profile.image:
-            return None
-        if obj.profile.image.url.startswith("http"):
-            return obj.profile.image.url
-        elif "request" in self.context:
-            return self.context["request"].build_absolute_uri(obj.profile.image.url)
-        else:
-            return obj.profile.image.url
+        return self.get_image_variant_url(
+            obj.profile.image_source, 160, obj.profile.image
+        )
 
     def get_full_name(self, obj):
         return obj.get_full_name()
@@ -3298,7 +3420,9 @@ class ApplicationSubmissionCSVSerializer(serializers.ModelSerializer):
         )
 
 
-class ClubApplicationSerializer(ClubRouteMixin, serializers.ModelSerializer):
+class ClubApplicationSerializer(
+    ClubRouteMixin, ImageVariantMixin, serializers.ModelSerializer
+):
     name = serializers.SerializerMethodField("get_name")
     cycle = serializers.SerializerMethodField("get_cycle")
     committees = ApplicationCommitteeSerializer(
@@ -3329,22 +3453,14 @@ class ClubApplicationSerializer(ClubRouteMixin, serializers.ModelSerializer):
 
     def get_updated_time(self, obj):
         updated_at = obj.updated_at
-        questions = ApplicationQuestion.objects.filter(application=obj)
-        for question in questions:
+        # uses the prefetched questions in application lists
+        for question in obj.questions.all():
             if question.updated_at > updated_at:
                 updated_at = question.updated_at
         return updated_at
 
     def get_image_url(self, obj):
-        image = obj.club.image
-        if not image:
-            return None
-        if image.url.startswith("http"):
-            return image.url
-        elif "request" in self.context:
-            return self.context["request"].build_absolute_uri(image.url)
-        else:
-            return image.url
+        return self.get_image_variant_url(obj.club.image_source, 320, obj.club.image)
 
     def validate(self, data):
         acceptance_template = data.get("acceptance_email", "")
@@ -28,6 +28,7 @@ from clubs.views import (
     EmailInvitesAPIView,
     EventShowingViewSet,
     EventViewSet,
+    ExportJobViewSet,
     ExternalMemberListViewSet,
     FavoriteCalendarAPIView,
     FavoriteEventsAPIView,
@@ -43,8 +44,10 @@ from clubs.views import (
     MembershipRequestViewSet,
     MembershipViewSet,
     MemberViewSet,
+    MetricsView,
     NoteViewSet,
     OptionListView,
+    OutboxBatchAPIView,
     OwnershipRequestManagementViewSet,
     OwnershipRequestViewSet,
     QuestionAnswerViewSet,
@@ -102,6 +105,7 @@ router.register(r"schools", SchoolViewSet, basename="schools")
 router.register(r"majors", MajorViewSet, basename="majors")
 router.register(r"student_types", StudentTypeViewSet, basename="student_types")
 router.register(r"reports", ReportViewSet, basename="reports")
+router.register(r"exports", ExportJobViewSet, basename="exports")
 router.register(r"years", YearViewSet, basename="years")
 router.register(r"types", TypeViewSet, basename="types")
 router.register(r"statuses", StatusViewSet, basename="statuses")
@@ -201,6 +205,11 @@ urlpatterns = [
         MassInviteAPIView.as_view(),
         name="club-invite",
     ),
+    path(
+        r"emails/outbox/<uuid:batch_id>/",
+        OutboxBatchAPIView.as_view(),
+        name="email-outbox",
+    ),
     path(
         r"clubs/<slug:club_code>/public-visibility/<str:token>/",
         ClubPublicVisibilityMagicLinkView.as_view(),
@@ -228,6 +237,7 @@ urlpatterns = [
         name="wharton-applications-status",
     ),
     path(r"health/", HealthView.as_view(), name="health"),
+    path(r"metrics/", MetricsView.as_view(), name="metrics"),
     path(
         "settings/queue/",
         RegistrationQueueSettingsView.as_view(),
@@ -1,15 +1,14 @@
+import collections
 import io
 import re
 from urllib.parse import urlparse
 
 import bleach
-import requests
 from bs4 import BeautifulSoup, Comment, NavigableString
 from django.conf import settings
-from django.core.files.images import ImageFile
 from django.db.models import CharField, F, Q, Value
 from django.template.defaultfilters import slugify
-from PIL import Image
+from PIL import Image, ImageOps
 
 
 def get_domain(request):
@@ -163,6 +162,52 @@ def clean(text):
     )
 
 
+def get_zoom_meeting_id(url):
+    """
+    Accepts the URL of an event.
+    Returns the Zoom meeting id in the URL, or an empty string if the URL is not a
+    Zoom meeting link. For example, https://upenn.zoom.us/j/123456789?pwd=abc gives
+    123456789.
+    """
+    if not url:
+        return ""
+    parsed = urlparse(url.strip())
+    netloc = parsed.netloc.lower().split(":")[0]
+    if netloc != "zoom.us" and not netloc.endswith(".zoom.us"):
+        return ""
+    parts = parsed.path.strip("/").split("/")
+    if len(parts) != 2 or not parts[1].isdigit():
+        return ""
+    return parts[1]
+
+
+def compute_club_ancestry(links):
+    """
+    Accepts an iterable of (child id, parent id) pairs of club parent organizations.
+    Returns a dictionary mapping every (ancestor id, descendant id) pair to the
+    length of the shortest path between them. Cycles are allowed, but a club is never
+    its own ancestor.
+    """
+    parents = collections.defaultdict(set)
+    for child, parent in links:
+        parents[child].add(parent)
+
+    ancestry = {}
+    for club in parents:
+        depths = {club: 0}
+        queue = collections.deque([club])
+        while queue:
+            current = queue.popleft()
+            for parent in parents.get(current, ()):
+                if parent not in depths:
+                    depths[parent] = depths[current] + 1
+                    queue.append(parent)
+        for ancestor, depth in depths.items():
+            if ancestor != club:
+                ancestry[(ancestor, club)] = depth
+    return ancestry
+
+
 def min_edit(s1, s2):
     """
     Return the Levenshtein distance between two strings.
@@ -319,39 +364,289 @@ def fuzzy_lookup_club(name):
     return None
 
 
-def resize_image(content, width=None, height=None):
+def bounded_min_edit(s1, s2, bound):
     """
-    Accepts a byte string representing an input image file.
-    Returns a byte string representing the minified output image file.
+    Return the Levenshtein distance between two strings if it is at most the bound,
+    or any number larger than the bound otherwise.
+    """
+    if abs(len(s1) - len(s2)) > bound:
+        return bound + 1
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    distances = range(len(s1) + 1)
+    for index2, char2 in enumerate(s2):
+        newDistances = [index2 + 1]
+        for index1, char1 in enumerate(s1):
+            if char1 == char2:
+                newDistances.append(distances[index1])
+            else:
+                newDistances.append(
+                    1
+                    + min((distances[index1], distances[index1 + 1], newDistances[-1]))
+                )
+        if min(newDistances) > bound:
+            return bound + 1
+        distances = newDistances
+    return distances[-1]
+
+
+class ClubNameMatcher:
+    """
+    Match many free form names to clubs in memory, with the same results as
+    calling fuzzy_lookup_club on each name.
+
+    The names and subtitles of all clubs are loaded once and indexed by trigram,
+    so that each lookup is a single pass over the candidate clubs instead of a
+    series of database queries. Results are memoized for the lifetime of the
+    matcher, so a new matcher should be created for every batch of lookups.
     """
-    img = Image.open(io.BytesIO(content))
 
-    # ensure parameter is specified
-    if height is None and width is None:
-        raise ValueError(
-            "You must specify either the maximum width or the maximum height!"
+    NGRAM = 3
+
+    def __init__(self, queryset=None):
+        from clubs.models import Club
+
+        if queryset is None:
+            queryset = Club.objects.all()
+
+        # keep the database ordering, since ties are broken by the first match
+        self.clubs = list(queryset.only("id", "code", "name", "subtitle"))
+        self.names = [club.name.lower() for club in self.clubs]
+        self.subtitles = [club.subtitle.lower() for club in self.clubs]
+        self.codes = {club.code: club for club in self.clubs}
+        self.memo = {}
+        self.index = {
+            "name": self.build_index(self.names),
+            "subtitle": self.build_index(self.subtitles),
+        }
+
+    @classmethod
+    def ngrams(cls, text):
+        return {text[i : i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+
+    @classmethod
+    def build_index(cls, values):
+        index = {}
+        for i, value in enumerate(values):
+            for ngram in cls.ngrams(value):
+                index.setdefault(ngram, []).append(i)
+        return index
+
+    def contains(self, field, text):
+        """
+        Return the indices of the clubs where the field contains the text,
+        ignoring case, in database order.
+        """
+        text = text.lower()
+        values = self.names if field == "name" else self.subtitles
+        ngrams = self.ngrams(text)
+        if not ngrams:
+            return [i for i, value in enumerate(values) if text in value]
+
+        postings = sorted(
+            (self.index[field].get(ngram, []) for ngram in ngrams), key=len
         )
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return [i for i in sorted(candidates) if text in values[i]]
+
+    def contained_in(self, field, text):
+        """
+        Return the indices of the clubs where the field is contained in the text,
+        ignoring case, in database order.
+        """
+        text = text.lower()
+        values = self.names if field == "name" else self.subtitles
+        counts = {}
+        for ngram in self.ngrams(text):
+            for i in self.index[field].get(ngram, []):
+                counts[i] = counts.get(i, 0) + 1
+        return [
+            i
+            for i, value in enumerate(values)
+            if (len(value) < self.NGRAM or counts.get(i, 0) == len(self.ngrams(value)))
+            and value in text
+        ]
+
+    def iexact(self, field, text):
+        text = text.lower()
+        values = self.names if field == "name" else self.subtitles
+        return [i for i in self.contains(field, text) if values[i] == text]
+
+    def iregex(self, regex):
+        regex = re.compile(regex, re.I)
+        return [i for i, club in enumerate(self.clubs) if regex.search(club.name)]
+
+    def closest(self, indices, name):
+        """
+        Return the first club with the smallest edit distance to the name.
+        """
+        best, best_distance = None, None
+        for i in indices:
+            if best_distance is None:
+                distance = min_edit(self.names[i], name)
+            else:
+                distance = bounded_min_edit(self.names[i], name, best_distance - 1)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = self.clubs[i], distance
+        return best, best_distance
+
+    def lookup(self, name):
+        """
+        Return the club matching the name, or None if no club could be found.
+        """
+        if name not in self.memo:
+            self.memo[name] = self.find(name)
+        return self.memo[name]
+
+    def lookup_many(self, names):
+        """
+        Return a dictionary mapping each of the names to its club or None.
+        """
+        return {name: self.lookup(name) for name in names}
+
+    def find(self, name):
+        # this mirrors each step of fuzzy_lookup_club, so keep them in sync
+        name = name.strip()
+
+        if not name:
+            return None
+
+        club = self.iexact("name", name)
+        if club:
+            if len(club) > 1:
+                club = [i for i in club if self.clubs[i].name == name]
+                if club:
+                    return self.clubs[club[0]]
+            else:
+                return self.clubs[club[0]]
+
+        code = slugify(re.sub(r"\(.+?\)$", "", name).strip())
+        if code in self.codes:
+            return self.codes[code]
+
+        for old, new in [("and", "&"), ("&", "and")]:
+            if old in name:
+                mod_name = name.replace(old, new)
+                club = self.contains("name", mod_name)
+                if club:
+                    if len(club) == 1:
+                        return self.clubs[club[0]]
+                    club = self.iexact("name", mod_name)
+                    if club:
+                        return self.clubs[club[0]]
+
+        club = self.iexact("subtitle", name)
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        club = self.contains("subtitle", name)
+        if len(club) == 1:
+            return self.clubs[club[0]]
+
+        club = [
+            i
+            for i in self.contained_in("subtitle", name)
+            if re.search(".......", self.clubs[i].subtitle)
+        ]
+        if len(club) == 1:
+            return self.clubs[club[0]]
+
+        regex = "^{}$".format(
+            re.escape(name.replace("-", " ").strip()).replace("\\ ", r"[\s-]")
+        )
+        club = self.iregex(regex)
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        club = self.iregex(r" ?".join(re.sub(r"\W+", "", name)))
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        name = re.sub(r"\(.+?\)$", "", name).strip()
+        club = self.contains("name", name)
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        club = self.contained_in("name", name)
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        modified_name = re.sub(
+            r"university of pennsylvania", "", name, flags=re.I
+        ).strip()
+        modified_name = re.sub(
+            r"upenn|the|club|penn", "", modified_name, flags=re.I
+        ).strip()
+        club = self.contains("name", modified_name)
+        if club:
+            return self.closest(club, name.lower())[0]
+
+        close_clubs = set()
+        for word in name.split(" "):
+            if word not in {"the", "of", "penn", "club"}:
+                close_clubs.update(self.contains("name", word.strip()))
+        close_clubs = sorted(close_clubs)
+
+        if close_clubs:
+            club, distance = self.closest(close_clubs, name.lower())
+            if distance <= 2:
+                return club
+
+            no_prefix_name = re.sub(r"^\w+\s?-", "", name, flags=re.I).strip().lower()
+            club, distance = self.closest(close_clubs, no_prefix_name)
+            if distance <= 2:
+                return club
+
+        return None
 
-    # preserve aspect ratio
-    if height is not None:
-        width = img.width * (height / img.height)
-    elif width is not None:
-        height = img.height * (width / img.width)
 
-    # if image is already smaller, then don't bother resizing
-    if img.width > width or img.height > height:
-        img.thumbnail((width, height))
+# widths that image variants are generated at, in pixels
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
 
-    # save final image
-    with io.BytesIO() as output:
-        img.convert("RGBA").save(output, format="PNG", optimize=True)
-        return output.getvalue()
+# variant formats in order of preference, the first supported format is served
+IMAGE_VARIANT_FORMATS = ("webp", "jpeg", "png")
 
 
-def get_django_minified_image(url, **kwargs):
+def generate_image_variants(content, widths=IMAGE_VARIANT_WIDTHS):
     """
-    Accepts a URL to an image and returns the minified ImageFile for that image.
+    Accepts a byte string representing an input image file.
+    Returns the width and height of the image and a list of (width, format, bytes)
+    tuples, one WebP and one JPEG (or PNG for transparent images) per target width
+    that is smaller than the image, along with one at the original width capped to
+    the largest target width.
     """
-    resp = requests.get(url)
-    new_image = resize_image(resp.content, **kwargs)
-    return ImageFile(io.BytesIO(new_image), name="image.png")
+    img = Image.open(io.BytesIO(content))
+    img = ImageOps.exif_transpose(img)
+
+    transparent = img.mode in {"RGBA", "LA", "PA"} or "transparency" in img.info
+    img = img.convert("RGBA" if transparent else "RGB")
+    fallback = "png" if transparent else "jpeg"
+
+    targets = {width for width in widths if width < img.width}
+    targets.add(min(img.width, max(widths)))
+
+    variants = []
+    for width in sorted(targets):
+        if width == img.width:
+            resized = img
+        else:
+            height = max(round(img.height * width / img.width), 1)
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+
+        for fmt in ("webp", fallback):
+            with io.BytesIO() as output:
+                if fmt == "webp":
+                    resized.save(output, format="WEBP", quality=80, method=4)
+                elif fmt == "jpeg":
+                    resized.save(
+                        output,
+                        format="JPEG",
+                        quality=85,
+                        optimize=True,
+                        progressive=True,
+                    )
+                else:
+                    resized.save(output, format="PNG")
+                variants.append((width, fmt, output.getvalue()))
+
+    return img.width, img.height, variants
@@ -13,7 +13,6 @@ import secrets
 import string
 import uuid
 from decimal import Decimal, InvalidOperation
-from functools import wraps
 from urllib.parse import quote, urlparse
 
 import pandas as pd
@@ -21,8 +20,6 @@ import pytz
 import qrcode
 import requests
 from analytics.entries import FuncEntry
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from dateutil.parser import ParserError, parse
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -33,7 +30,6 @@ from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import UploadedFile
 from django.core.mail import EmailMultiAlternatives
 from django.core.management import call_command, get_commands, load_command_class
-from django.core.serializers.json import DjangoJSONEncoder
 from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
 from django.core.validators import validate_email
 from django.db import transaction
@@ -44,6 +40,7 @@ from django.db.models import (
     DurationField,
     ExpressionWrapper,
     F,
+    IntegerField,
     Max,
     Min,
     OuterRef,
@@ -56,20 +53,17 @@ from django.db.models import (
 )
 from django.db.models.functions import SHA1, Concat, Lower, Trunc
 from django.db.models.query import prefetch_related_objects
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render
 from django.template import TemplateDoesNotExist
-from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.utils.text import slugify
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_cookie
-from ics import Calendar as ICSCal
-from ics import Event as ICSEvent
-from ics.grammar import parse as ICSParse
 from jinja2 import Template
-from options.models import Option
 from rest_framework import filters, generics, parsers, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
@@ -81,9 +75,23 @@ from rest_framework.views import APIView
 from social_django.utils import load_strategy
 from tatsu.exceptions import FailedParse
 
-from clubs.filters import RandomOrderingFilter, RandomPageNumberPagination
+from clubs.caching import (
+    CLASSIFICATION_GROUP_CACHE_PREFIX,
+    application_submission_cache,
+    calendar_feed_cache,
+    club_fragment_cache,
+    club_list_cache,
+    fair_live_metrics,
+    site_options_cache,
+)
+from clubs.emails import email_templates
+from clubs.filters import (
+    OptionalCursorPagination,
+    RandomOrderingFilter,
+    RandomPageNumberPagination,
+)
 from clubs.management.commands.sync import Command as SyncCommand
-from clubs.mixins import XLSXFormatterMixin
+from clubs.mixins import SPREADSHEET_FORMATS, XLSXFormatterMixin
 from clubs.models import (
     AdminNote,
     Advisor,
@@ -99,6 +107,7 @@ from clubs.models import (
     Category,
     Classification,
     Club,
+    ClubAncestry,
     ClubApplication,
     ClubApprovalResponseTemplate,
     ClubFair,
@@ -109,13 +118,16 @@ from clubs.models import (
     Eligibility,
     Event,
     EventShowing,
+    ExportJob,
     Favorite,
     GroupActivityOption,
+    ICSImportState,
     Major,
     Membership,
     MembershipInvite,
     MembershipRequest,
     Note,
+    OutboxBatch,
     OwnershipRequest,
     QuestionAnswer,
     RankingWeights,
@@ -134,7 +146,7 @@ from clubs.models import (
     Type,
     Year,
     ZoomMeetingVisit,
-    get_mail_type_annotation,
+    ZoomWebhook,
     send_mail_helper,
 )
 from clubs.permissions import (
@@ -158,7 +170,9 @@ from clubs.permissions import (
     ReadOnly,
     WhartonApplicationPermission,
     find_membership_helper,
+    get_club_roles,
 )
+from clubs.search import SEARCH_RESULT_LIMIT, club_search_index, tokenize
 from clubs.serializers import (
     AdminClubSerializer,
     AdminNoteSerializer,
@@ -193,6 +207,7 @@ from clubs.serializers import (
     EventShowingSerializer,
     EventShowingWriteSerializer,
     EventWriteSerializer,
+    ExportJobSerializer,
     ExternalMemberListSerializer,
     FakeView,
     FavoriteSerializer,
@@ -238,28 +253,10 @@ from clubs.serializers import (
     WritableClubFairSerializer,
     YearSerializer,
 )
-from clubs.utils import fuzzy_lookup_club, html_to_text
+from clubs.utils import ClubNameMatcher, html_to_text
 from pennclubs.analytics import LabsAnalytics
 
 
-CLUBS_LIST_CACHE_VERSION_KEY = "clubs:list:anon:version"
-
-
-def _bump_clubs_list_cache_version():
-    """
-    Bump anonymous club list cache version so clubs removed from public view don't
-    remain visible due to cached list responses.
-    """
-    try:
-        cache.incr(CLUBS_LIST_CACHE_VERSION_KEY)
-    except ValueError:
-        cache.set(CLUBS_LIST_CACHE_VERSION_KEY, 2, None)
-
-
-def _get_clubs_list_cache_version() -> int:
-    return int(cache.get(CLUBS_LIST_CACHE_VERSION_KEY, 1))
-
-
 def is_public_viewer(request) -> bool:
     """
     Return True if the request should be treated as a public viewer
@@ -343,7 +340,6 @@ class ClubPublicVisibilityMagicLinkView(APIView):
         club.save(update_fields=["visible_to_public"])
 
         cache.delete(f"clubs:{club.id}-anon")
-        _bump_clubs_list_cache_version()
 
         state = "public" if club.visible_to_public else "private"
         club_url = settings.VIEW_URL.format(
@@ -352,19 +348,6 @@ class ClubPublicVisibilityMagicLinkView(APIView):
         return HttpResponseRedirect(f"{club_url}?visibility_updated={state}")
 
 
-def update_holds(func):
-    """
-    Decorator to update ticket holds
-    """
-
-    @wraps(func)
-    def wrap(self, request, *args, **kwargs):
-        Ticket.objects.update_holds()
-        return func(self, request, *args, **kwargs)
-
-    return wrap
-
-
 def file_upload_endpoint_helper(request, code):
     obj = get_object_or_404(Club, code=code)
     if "file" in request.data and isinstance(request.data["file"], UploadedFile):
@@ -418,24 +401,43 @@ def upload_endpoint_helper(request, cls, keyword, field, save=True, **kwargs):
 def find_relationship_helper(relationship, club_object, found):
     """
     Format and retrieve all parents or children of a club into tree.
+
+    The related clubs and the links between them are loaded up front using the club
+    ancestry table, and the tree is then built in memory.
     """
-    children = getattr(club_object, relationship).all().prefetch_related(relationship)
-    children_recurse = []
-    for child in children:
-        if child.code not in found:
-            found.add(child.code)
-            children_recurse.append(
-                find_relationship_helper(relationship, child, found)
-            )
-            found.remove(child.code)
+    if relationship == "parent_orgs":
+        related = ClubAncestry.objects.filter(descendant=club_object).values("ancestor")
+    else:
+        related = ClubAncestry.objects.filter(ancestor=club_object).values("descendant")
+    clubs = {club.pk: club for club in Club.objects.filter(pk__in=related)}
+    clubs[club_object.pk] = club_object
+
+    links = collections.defaultdict(list)
+    for child, parent in Club.parent_orgs.through.objects.filter(
+        from_club__in=clubs.keys(), to_club__in=clubs.keys()
+    ).values_list("from_club_id", "to_club_id"):
+        if relationship == "parent_orgs":
+            links[child].append(clubs[parent])
         else:
-            children_recurse.append({"name": child.name, "code": child.code})
+            links[parent].append(clubs[child])
+
+    def build(club):
+        children_recurse = []
+        for child in sorted(links[club.pk], key=lambda child: (child.name, child.pk)):
+            if child.code not in found:
+                found.add(child.code)
+                children_recurse.append(build(child))
+                found.remove(child.code)
+            else:
+                children_recurse.append({"name": child.name, "code": child.code})
 
-    return {
-        "name": club_object.name,
-        "code": club_object.code,
-        "children": children_recurse,
-    }
+        return {
+            "name": club.name,
+            "code": club.code,
+            "children": children_recurse,
+        }
+
+    return build(club_object)
 
 
 def filter_note_permission(queryset, club, user):
@@ -532,211 +534,318 @@ class ReportViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Report.objects.filter(Q(creator=self.request.user) | Q(public=True))
 
+    @action(detail=True, methods=["post"])
+    def export(self, request, *args, **kwargs):
+        """
+        Queue the generation of this report in the background. Identical requests
+        made shortly after each other share the same export.
+        ---
+        requestBody: {}
+        responses:
+            "202":
+                content:
+                    application/json:
+                        schema:
+                            $ref: "#/components/schemas/ExportJob"
+        ---
+        """
+        report = self.get_object()
+        parameters = {"bypass": "true", **json.loads(report.parameters or "{}")}
+        job, _ = ExportJob.request(ExportJob.KIND_REPORT, request.user, parameters)
+        return Response(
+            ExportJobSerializer(job, context={"request": request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 
-class ClubsSearchFilter(filters.BaseFilterBackend):
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    A DRF filter to implement custom filtering logic for the frontend.
-    If model is not a Club, expects the model to have a club foreign key to Club.
+    list:
+    Return the exports that the current user has requested.
+
+    retrieve:
+    Return the progress of an export, with a signed download link once it has
+    finished. Progress updates are also sent over the export websocket.
     """
 
-    def filter_queryset(self, request, queryset, view):
-        params = request.GET.dict()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
 
-        classification_group = params.pop("classification_group", "").strip().lower()
-        if classification_group:
-            group_values = [
-                val.strip().replace(" ", "_")
-                for val in classification_group.split(",")
-                if val.strip()
-            ]
-            normalized_group = group_values[0] if group_values else ""
+    def get_permissions(self):
+        # the signed token in the download link grants access to the export
+        if self.action == "download":
+            return [AllowAny()]
+        return super().get_permissions()
 
-            if {"undergraduate", "graduate"} <= set(group_values):
-                normalized_group = ""
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return ExportJob.objects.all()
+        return ExportJob.objects.filter(creator=self.request.user)
 
-            if normalized_group in {"all", "both"}:
-                normalized_group = ""
-            elif normalized_group in {"undergrad", "undergraduate", "ug"}:
-                normalized_group = "undergraduate"
-            elif normalized_group in {"grad", "graduate", "g"}:
-                normalized_group = "graduate"
+    @action(detail=True, methods=["get"])
+    def download(self, request, *args, **kwargs):
+        """
+        Download a finished export using the signed link for the export.
+        ---
+        responses:
+            "200":
+                content:
+                    application/octet-stream:
+                        schema:
+                            type: string
+                            format: binary
+            "404":
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                detail:
+                                    type: string
+        ---
+        """
+        job = ExportJob.from_download_token(request.query_params.get("token", ""))
+        if job is None or str(job.id) != kwargs["pk"] or not job.file:
+            raise Http404
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=os.path.basename(job.file.name),
+        )
 
-            if queryset.model == Club:
-                classification_field = "classification__id__in"
-            else:
-                classification_field = "club__classification__id__in"
 
-            classifications = Classification.objects.all()
-            classification_ids = []
+def get_classification_group_ids(group):
+    """
+    Return the ids of the classifications that belong to the normalized
+    classification group, either "undergraduate" or "graduate".
+    Cached until a classification is modified.
+    """
 
-            if normalized_group == "undergraduate":
-                classification_ids = list(
-                    classifications.filter(
-                        Q(symbol__istartswith="ug") | Q(name__icontains="undergrad")
-                    ).values_list("id", flat=True)
-                )
-            elif normalized_group == "graduate":
-                classification_ids = list(
-                    classifications.filter(
-                        Q(symbol__istartswith="g") | Q(name__icontains="graduate")
-                    )
-                    .exclude(
-                        Q(symbol__istartswith="ug") | Q(name__icontains="undergrad")
-                    )
-                    .values_list("id", flat=True)
-                )
+    def compute():
+        classifications = Classification.objects.all()
+        undergrad = Q(symbol__istartswith="ug") | Q(name__icontains="undergrad")
+        if group == "undergraduate":
+            classifications = classifications.filter(undergrad)
+        else:
+            classifications = classifications.filter(
+                Q(symbol__istartswith="g") | Q(name__icontains="graduate")
+            ).exclude(undergrad)
+        return list(classifications.values_list("id", flat=True))
 
-            if classification_ids:
-                queryset = queryset.filter(**{classification_field: classification_ids})
-
-        def parse_year(field, value, operation, queryset):
-            if value.isdigit():
-                suffix = ""
-                if operation in {"lt", "gt", "lte", "gte"}:
-                    suffix = f"__{operation}"
-                return {f"{field}__year{suffix}": int(value)}
-            if value.lower() in {"none", "null"}:
-                return {f"{field}__isnull": True}
-            return {}
-
-        def parse_int(field, value, operation, queryset):
-            if operation == "in":
-                values = value.strip().split(",")
-                sizes = [int(size) for size in values if size]
-                return {f"{field}__in": sizes}
-
-            if "," in value:
-                values = [int(x.strip()) for x in value.split(",") if x]
-                if operation == "and":
-                    for value in values:
-                        queryset = queryset.filter(**{field: value})
-                    return queryset
-                return {f"{field}__in": values}
-
-            if value.isdigit():
-                suffix = ""
-                if operation in {"lt", "gt", "lte", "gte"}:
-                    suffix = f"__{operation}"
-                return {f"{field}{suffix}": int(value)}
-            if value.lower() in {"none", "null"}:
-                return {f"{field}__isnull": True}
-            return {}
-
-        def parse_many_to_many(label, field, value, operation, queryset):
-            tags = value.strip().split(",")
-            if operation == "or":
-                if tags[0].isdigit():
-                    tags = [int(tag) for tag in tags if tag]
-                    return {f"{field}__id__in": tags}
-                else:
-                    return {f"{field}__{label}__in": tags}
+    return cache.get_or_set(
+        f"{CLASSIFICATION_GROUP_CACHE_PREFIX}:{group}", compute, 60 * 60
+    )
 
-            if tags[0].isdigit() or operation == "id":
-                tags = [int(tag) for tag in tags if tag]
-                if settings.BRANDING == "fyh":
-                    queryset = queryset.filter(**{f"{field}__id__in": tags})
-                else:
-                    for tag in tags:
-                        queryset = queryset.filter(**{f"{field}__id": tag})
-            else:
-                for tag in tags:
-                    queryset = queryset.filter(**{f"{field}__{label}": tag})
+
+class ClubsSearchFilterPlan:
+    """
+    The filter grammar used by ClubsSearchFilter, compiled once per model.
+
+    Maps each supported query parameter to the parser that turns it into either a
+    dictionary of lookups or a filtered queryset.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.prefix = "" if model == Club else "club__"
+
+        fields = {
+            "accepting_members": self.parse_boolean,
+            "active": self.parse_boolean,
+            "application_required": self.parse_int,
+            "appointment_needed": self.parse_boolean,
+            "approved": self.parse_boolean,
+            "available_virtually": self.parse_boolean,
+            "badges": self.parse_badges,
+            "code": self.parse_string,
+            "classification": self.parse_int,
+            "enables_subscription": self.parse_boolean,
+            "favorite_count": self.parse_int,
+            "founded": self.parse_year,
+            "recruiting_cycle": self.parse_int,
+            "size": self.parse_int,
+            "tags": self.parse_tags,
+            "target_majors": self.parse_tags,
+            "target_schools": self.parse_tags,
+            "target_years": self.parse_tags,
+            "target_students": self.parse_tags,
+            "student_types": self.parse_tags,
+        }
+        self.fields = {f"{self.prefix}{k}": v for k, v in fields.items()}
+
+        if model == Event:
+            self.fields.update(
+                {
+                    "type": self.parse_int,
+                    "fair": self.parse_fair,
+                    "earliest_start_time": self.parse_datetime,
+                    "latest_start_time": self.parse_datetime,
+                    "earliest_end_time": self.parse_datetime,
+                    "latest_end_time": self.parse_datetime,
+                }
+            )
+
+    def parse_classification_group(self, value, queryset):
+        group_values = [
+            val.strip().replace(" ", "_") for val in value.split(",") if val.strip()
+        ]
+        normalized_group = group_values[0] if group_values else ""
+
+        if {"undergraduate", "graduate"} <= set(group_values):
+            normalized_group = ""
+
+        if normalized_group in {"undergrad", "undergraduate", "ug"}:
+            normalized_group = "undergraduate"
+        elif normalized_group in {"grad", "graduate", "g"}:
+            normalized_group = "graduate"
+        else:
             return queryset
 
-        def parse_badges(field, value, operation, queryset):
-            return parse_many_to_many("label", field, value, operation, queryset)
+        classification_ids = get_classification_group_ids(normalized_group)
+        if classification_ids:
+            queryset = queryset.filter(
+                **{f"{self.prefix}classification__id__in": classification_ids}
+            )
+        return queryset
 
-        def parse_tags(field, value, operation, queryset):
-            return parse_many_to_many("name", field, value, operation, queryset)
+    def parse_year(self, field, value, operation, queryset):
+        if value.isdigit():
+            suffix = ""
+            if operation in {"lt", "gt", "lte", "gte"}:
+                suffix = f"__{operation}"
+            return {f"{field}__year{suffix}": int(value)}
+        if value.lower() in {"none", "null"}:
+            return {f"{field}__isnull": True}
+        return {}
 
-        def parse_boolean(field, value, operation, queryset):
-            value = value.strip().lower()
+    def parse_int(self, field, value, operation, queryset):
+        if operation == "in":
+            values = value.strip().split(",")
+            sizes = [int(size) for size in values if size]
+            return {f"{field}__in": sizes}
+
+        if "," in value:
+            values = [int(x.strip()) for x in value.split(",") if x]
+            if operation == "and":
+                for value in values:
+                    queryset = queryset.filter(**{field: value})
+                return queryset
+            return {f"{field}__in": values}
+
+        if value.isdigit():
+            suffix = ""
+            if operation in {"lt", "gt", "lte", "gte"}:
+                suffix = f"__{operation}"
+            return {f"{field}{suffix}": int(value)}
+        if value.lower() in {"none", "null"}:
+            return {f"{field}__isnull": True}
+        return {}
 
-            if operation == "in":
-                if set(value.split(",")) == {"true", "false"}:
-                    return
+    def filter_all_related(self, field, lookup, values, queryset):
+        """
+        Restrict the queryset to objects related to every one of the values.
+
+        Uses a single grouped subquery over the through table instead of one join
+        per value.
+        """
+        values = set(values)
+        if not values:
+            return queryset
 
-            if value in {"true", "yes"}:
-                boolval = True
-            elif value in {"false", "no"}:
-                boolval = False
-            elif value in {"null", "none"}:
-                boolval = None
+        m2m = Club._meta.get_field(field[len(self.prefix) :]).remote_field
+        source = m2m.through._meta.get_field(m2m.field.m2m_field_name()).attname
+        target = m2m.field.m2m_reverse_field_name()
+        club_ids = (
+            m2m.through.objects.filter(**{f"{target}__{lookup}__in": values})
+            .values(source)
+            .annotate(matches=Count(f"{target}__{lookup}", distinct=True))
+            .filter(matches=len(values))
+            .values(source)
+        )
+        return queryset.filter(**{f"{self.prefix}id__in": club_ids})
+
+    def parse_many_to_many(self, label, field, value, operation, queryset):
+        tags = value.strip().split(",")
+        if operation == "or":
+            if tags[0].isdigit():
+                tags = [int(tag) for tag in tags if tag]
+                return {f"{field}__id__in": tags}
             else:
-                return
+                return {f"{field}__{label}__in": tags}
 
-            if boolval is None:
-                return {f"{field}__isnull": True}
+        if tags[0].isdigit() or operation == "id":
+            tags = [int(tag) for tag in tags if tag]
+            if settings.BRANDING == "fyh":
+                return {f"{field}__id__in": tags}
+            return self.filter_all_related(field, "id", tags, queryset)
+        return self.filter_all_related(field, label, tags, queryset)
 
-            return {f"{field}": boolval}
+    def parse_badges(self, field, value, operation, queryset):
+        return self.parse_many_to_many("label", field, value, operation, queryset)
 
-        def parse_string(field, value, operation, queryset):
-            if operation == "in":
-                values = [x.strip() for x in value.split(",")]
-                values = [x for x in values if x]
-                return {f"{field}__in": values}
-            return {f"{field}": value}
+    def parse_tags(self, field, value, operation, queryset):
+        return self.parse_many_to_many("name", field, value, operation, queryset)
 
-        def parse_datetime(field, value, operation, queryset):
-            try:
-                value = parse(value.strip())
-            except (ValueError, OverflowError):
+    def parse_boolean(self, field, value, operation, queryset):
+        value = value.strip().lower()
+
+        if operation == "in":
+            if set(value.split(",")) == {"true", "false"}:
                 return
 
-            if operation in {"gt", "lt", "gte", "lte"}:
-                return {f"{field}__{operation}": value}
+        if value in {"true", "yes"}:
+            boolval = True
+        elif value in {"false", "no"}:
+            boolval = False
+        elif value in {"null", "none"}:
+            boolval = None
+        else:
             return
 
-        fields = {
-            "accepting_members": parse_boolean,
-            "active": parse_boolean,
-            "application_required": parse_int,
-            "appointment_needed": parse_boolean,
-            "approved": parse_boolean,
-            "available_virtually": parse_boolean,
-            "badges": parse_badges,
-            "code": parse_string,
-            "classification": parse_int,
-            "enables_subscription": parse_boolean,
-            "favorite_count": parse_int,
-            "founded": parse_year,
-            "recruiting_cycle": parse_int,
-            "size": parse_int,
-            "tags": parse_tags,
-            "target_majors": parse_tags,
-            "target_schools": parse_tags,
-            "target_years": parse_tags,
-            "target_students": parse_tags,
-            "student_types": parse_tags,
-        }
+        if boolval is None:
+            return {f"{field}__isnull": True}
 
-        def parse_fair(field, value, operation, queryset):
-            try:
-                value = int(value.strip())
-            except ValueError:
-                return
+        return {f"{field}": boolval}
 
-            fair = ClubFair.objects.filter(id=value).first()
-            if fair:
-                return {
-                    "start_time__gte": fair.start_time,
-                    "end_time__lte": fair.end_time,
-                }
+    def parse_string(self, field, value, operation, queryset):
+        if operation == "in":
+            values = [x.strip() for x in value.split(",")]
+            values = [x for x in values if x]
+            return {f"{field}__in": values}
+        return {f"{field}": value}
 
-        if not queryset.model == Club:
-            fields = {f"club__{k}": v for k, v in fields.items()}
+    def parse_datetime(self, field, value, operation, queryset):
+        try:
+            value = parse(value.strip())
+        except (ValueError, OverflowError):
+            return
 
-        if queryset.model == Event:
-            fields.update(
-                {
-                    "type": parse_int,
-                    "fair": parse_fair,
-                    "earliest_start_time": parse_datetime,
-                    "latest_start_time": parse_datetime,
-                    "earliest_end_time": parse_datetime,
-                    "latest_end_time": parse_datetime,
-                }
-            )
+        if operation in {"gt", "lt", "gte", "lte"}:
+            return {f"{field}__{operation}": value}
+        return
+
+    def parse_fair(self, field, value, operation, queryset):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            return
+
+        fair = ClubFair.objects.filter(id=value).first()
+        if fair:
+            return {
+                "start_time__gte": fair.start_time,
+                "end_time__lte": fair.end_time,
+            }
+
+    def apply(self, params, queryset):
+        """
+        Filter the queryset using the given query parameters.
+        """
+        params = dict(params)
+
+        classification_group = params.pop("classification_group", "").strip().lower()
+        if classification_group:
+            queryset = self.parse_classification_group(classification_group, queryset)
 
         query = {}
 
@@ -753,19 +862,71 @@ class ClubsSearchFilter(filters.BaseFilterBackend):
                 type = field[1].lower()
                 field = field[0]
 
-            if field not in fields:
+            if field not in self.fields:
                 continue
 
-            condition = fields[field](field, value.strip(), type, queryset)
+            condition = self.fields[field](field, value.strip(), type, queryset)
             if isinstance(condition, dict):
                 query.update(condition)
             elif condition is not None:
                 queryset = condition
 
-        queryset = queryset.filter(**query)
+        return queryset.filter(**query)
+
+
+def search_clubs(queryset, query):
+    """
+    Return the best clubs in the queryset that match the search query, annotated
+    with their position in the search results as search_rank.
 
+    Only the first SEARCH_RESULT_LIMIT matches are returned, which keeps the ranking
+    expression small for short queries that match most clubs.
+    """
+    if not tokenize(query):
         return queryset
 
+    ids = club_search_index.search(query, limit=SEARCH_RESULT_LIMIT)
+    if not ids:
+        return queryset.none()
+
+    return queryset.filter(id__in=ids).annotate(
+        search_rank=Case(
+            *[When(id=pk, then=Value(pos)) for pos, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    )
+
+
+class ClubsIndexSearchFilter(filters.SearchFilter):
+    """
+    Full text search for clubs backed by the in memory club search index, instead
+    of icontains lookups over every search field.
+
+    Results are annotated with their position in the search results as search_rank,
+    which ClubsOrderingFilter uses when no explicit ordering is requested.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return search_clubs(queryset, request.query_params.get(self.search_param, ""))
+
+
+class ClubsSearchFilter(filters.BaseFilterBackend):
+    """
+    A DRF filter to implement custom filtering logic for the frontend.
+    If model is not a Club, expects the model to have a club foreign key to Club.
+    """
+
+    plans = {}
+
+    @classmethod
+    def get_plan(cls, model):
+        if model not in cls.plans:
+            cls.plans[model] = ClubsSearchFilterPlan(model)
+        return cls.plans[model]
+
+    def filter_queryset(self, request, queryset, view):
+        return self.get_plan(queryset.model).apply(request.GET.dict(), queryset)
+
 
 class ClubsOrderingFilter(RandomOrderingFilter):
     """
@@ -801,6 +962,10 @@ class ClubsOrderingFilter(RandomOrderingFilter):
         ordering = [
             arg for arg in request.GET.get("ordering", "").strip().split(",") if arg
         ]
+        # show the best search matches first unless another ordering was requested
+        if not ordering and "search_rank" in queryset.query.annotations:
+            return queryset.order_by("search_rank")
+
         if not ordering and hasattr(view, "ordering"):
             ordering = [view.ordering]
 
@@ -916,79 +1081,7 @@ class ClubFairViewSet(viewsets.ModelViewSet):
         ---
         """
         fair = self.get_object()
-        clubs = fair.participating_clubs.all()
-
-        events = Event.objects.filter(club__in=clubs, type=Event.FAIR)
-
-        # Calculate metrics per showing
-        metrics = (
-            events.annotate(
-                participant_count=Count(
-                    "visits__person",
-                    distinct=True,
-                    filter=Q(visits__leave_time__isnull=True),
-                ),
-                already_attended=Count(
-                    "visits__person",
-                    distinct=True,
-                    filter=Q(visits__leave_time__isnull=False),
-                ),
-            )
-            .filter(
-                Q(visits__leave_time__isnull=False) | Q(visits__leave_time__isnull=True)
-            )
-            .annotate(
-                durations=ExpressionWrapper(
-                    F("visits__leave_time") - F("visits__join_time"),
-                    output_field=DurationField(),
-                )
-            )
-        )
-
-        median_list = collections.defaultdict(list)
-        for event_id, duration in metrics.values_list("id", "durations").order_by(
-            "durations"
-        ):
-            if duration is not None:
-                median_list[event_id].append(duration.total_seconds())
-
-        # Calculate metrics per event
-        event_medians = {k: v[len(v) // 2] if v else 0 for k, v in median_list.items()}
-
-        # Aggregate metrics by event
-        event_participant_counts = collections.defaultdict(int)
-        event_already_attended = collections.defaultdict(int)
-
-        for event_id, participant_count, attended_count in metrics.values_list(
-            "id", "participant_count", "already_attended"
-        ):
-            event_participant_counts[event_id] += participant_count
-            event_already_attended[event_id] += attended_count
-
-        # Get officers who are currently in any showing of the event
-        officer_mapping = collections.defaultdict(list)
-        for event_id, username in (
-            events.filter(
-                club__in=clubs,
-                club__membership__role__lte=10,
-                visits__leave_time__isnull=True,
-            )
-            .values_list("id", "club__membership__person__username")
-            .distinct()
-        ):
-            officer_mapping[event_id].append(username)
-
-        # Format the response with event IDs as keys
-        formatted = {}
-        for event_id in events.values_list("id", flat=True):
-            formatted[event_id] = {
-                "participant_count": event_participant_counts.get(event_id, 0),
-                "already_attended": event_already_attended.get(event_id, 0),
-                "officers": officer_mapping.get(event_id, []),
-                "median": event_medians.get(event_id, 0),
-            }
-
-        return Response(formatted)
+        return Response(fair_live_metrics.get(fair.id))
 
     @action(detail=True, methods=["post"])
     def create_events(self, request, *args, **kwargs):
@@ -1279,6 +1372,139 @@ class ClubFairViewSet(viewsets.ModelViewSet):
         return ClubFair.objects.filter(end_time__gte=now).order_by("start_time")
 
 
+def prefetch_clubs(queryset, user, parameters, export=False):
+    """
+    Prefetch the relations that are serialized for every club in a list or
+    spreadsheet export of clubs requested by the user.
+    """
+    person = user if user.is_authenticated else None
+    queryset = queryset.prefetch_related(
+        Prefetch(
+            "favorite_set",
+            queryset=Favorite.objects.filter(person=person),
+            to_attr="user_favorite_set",
+        ),
+        Prefetch(
+            "subscribe_set",
+            queryset=Subscribe.objects.filter(person=person),
+            to_attr="user_subscribe_set",
+        ),
+        Prefetch(
+            "membership_set",
+            queryset=Membership.objects.filter(person=person),
+            to_attr="user_membership_set",
+        ),
+        "badges",
+        "group_activity_assessment",
+        "eligibility",
+        "image_source__variants",
+    )
+
+    fields = parameters.get("fields", "")
+    # fields = "" means all fields are being exported
+    # only prefetch members if exporting to Excel with "members" field
+    if export and ("members" in fields or fields == ""):
+        membership_queryset = Membership.objects.select_related("person__profile")
+
+        queryset = queryset.prefetch_related(
+            Prefetch("membership_set", queryset=membership_queryset),
+        )
+
+    return queryset.select_related(
+        "classification",
+        "category",
+        "category__designation",
+        "type",
+        "status",
+    )
+
+
+def filter_visible_clubs(queryset, user, parameters, action="list"):
+    """
+    Restrict a club queryset to the clubs that the user can see for the action,
+    applying the in and bypass query parameters of the club endpoints.
+    """
+    # select subset of clubs if requested
+    subset = parameters.get("in", None)
+
+    if subset:
+        subset = [x.strip() for x in subset.strip().split(",")]
+        queryset = queryset.filter(code__in=subset)
+
+    # filter out archived clubs
+    queryset = queryset.filter(archived=False)
+
+    bypass = parameters.get("bypass", "").lower() == "true"
+
+    # filter out inactive clubs for non-admins
+    if action == "list" and not bypass:
+        is_superuser = user.is_authenticated and user.is_superuser
+        has_special_perms = (
+            user.has_perm("clubs.see_pending_clubs")
+            or user.has_perm("clubs.manage_club")
+            or user.has_perm("clubs.approve_club")
+        )
+
+        # Only filter out inactive clubs for regular users
+        # Superusers and users with special permissions can see all inactive clubs
+        if not (is_superuser or has_special_perms):
+            queryset = queryset.filter(active=True)
+
+    # Restrict unauthenticated viewers to explicitly public clubs.
+    if not user.is_authenticated:
+        queryset = queryset.filter(visible_to_public=True)
+
+    # filter by approved clubs
+    if user.has_perm("clubs.see_pending_clubs") or bypass or action not in {"list"}:
+        return queryset
+    else:
+        return queryset.filter(Q(approved=True) | Q(ghost=True))
+
+
+def order_clubs(queryset, ordering):
+    """
+    Order clubs by the comma separated ordering parameter of the club list
+    endpoint, as a report generator who can order by any club field.
+    """
+    ordering = [arg for arg in (ordering or "").strip().split(",") if arg]
+    if not ordering:
+        if "search_rank" in queryset.query.annotations:
+            return queryset.order_by("search_rank")
+        ordering = ["featured"]
+
+    if "featured" in ordering:
+        return queryset.order_by("-rank", "-favorite_count", "-id")
+    if "alphabetical" in ordering:
+        return queryset.order_by(Lower("name"))
+
+    valid_fields = {field.name for field in Club._meta.fields}
+    ordering = [arg for arg in ordering if arg.lstrip("-") in valid_fields]
+    return queryset.order_by(*ordering, "-id")
+
+
+def get_club_report_queryset(user, parameters):
+    """
+    Return the clubs in a spreadsheet export of the club list endpoint for the
+    user, with the search, filter and ordering query parameters applied.
+    """
+    queryset = prefetch_clubs(
+        Club.objects.prefetch_related("tags"), user, parameters, export=True
+    )
+    queryset = filter_visible_clubs(queryset, user, parameters)
+    queryset = search_clubs(queryset, parameters.get("search", ""))
+    queryset = ClubsSearchFilter.get_plan(Club).apply(parameters, queryset)
+    return order_clubs(queryset, parameters.get("ordering"))
+
+
+def get_club_report_serializer_class(user):
+    """
+    Return the serializer for the clubs in a spreadsheet export by the user.
+    """
+    if user.has_perm("clubs.generate_reports") or user.is_superuser:
+        return ReportClubSerializer
+    return ClubSerializer
+
+
 class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
     """
     retrieve:
@@ -1307,8 +1533,7 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
         Club.objects.all().prefetch_related("tags").order_by("-favorite_count", "name")
     )
     permission_classes = [ClubPermission | IsSuperuser]
-    filter_backends = [filters.SearchFilter, ClubsSearchFilter, ClubsOrderingFilter]
-    search_fields = ["name", "subtitle", "code", "terms"]
+    filter_backends = [ClubsIndexSearchFilter, ClubsSearchFilter, ClubsOrderingFilter]
     ordering_fields = ["favorite_count", "name"]
     ordering = "featured"
 
@@ -1319,54 +1544,12 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        # additional prefetch optimizations
-        person = self.request.user
-        if not person.is_authenticated:
-            person = None
-
         if self.action in {"list", "retrieve"}:
-            queryset = queryset.prefetch_related(
-                Prefetch(
-                    "favorite_set",
-                    queryset=Favorite.objects.filter(person=person),
-                    to_attr="user_favorite_set",
-                ),
-                Prefetch(
-                    "subscribe_set",
-                    queryset=Subscribe.objects.filter(person=person),
-                    to_attr="user_subscribe_set",
-                ),
-                Prefetch(
-                    "membership_set",
-                    queryset=Membership.objects.filter(person=person),
-                    to_attr="user_membership_set",
-                ),
-                "badges",
-                "group_activity_assessment",
-                "eligibility",
-            )
-
-            fields = self.request.query_params.get("fields", "")
-            # fields = "" means all fields are being exported
-            export_members = self.request.accepted_renderer.format == "xlsx" and (
-                "members" in fields or fields == ""
-            )
-            # only prefetch members if exporting to Excel with "members" field
-            if export_members:
-                membership_queryset = Membership.objects.select_related(
-                    "person__profile"
-                )
-
-                queryset = queryset.prefetch_related(
-                    Prefetch("membership_set", queryset=membership_queryset),
-                )
-
-            queryset = queryset.select_related(
-                "classification",
-                "category",
-                "category__designation",
-                "type",
-                "status",
+            queryset = prefetch_clubs(
+                queryset,
+                self.request.user,
+                self.request.query_params,
+                export=self.request.accepted_renderer.format in SPREADSHEET_FORMATS,
             )
 
             if self.action in {"retrieve"}:
@@ -1412,46 +1595,9 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
                 query=self.request.query_params.get("search"),
             ).save()
 
-        # select subset of clubs if requested
-        subset = self.request.query_params.get("in", None)
-
-        if subset:
-            subset = [x.strip() for x in subset.strip().split(",")]
-            queryset = queryset.filter(code__in=subset)
-
-        # filter out archived clubs
-        queryset = queryset.filter(archived=False)
-
-        bypass = self.request.query_params.get("bypass", "").lower() == "true"
-
-        # filter out inactive clubs for non-admins
-        if self.action == "list" and not bypass:
-            user = self.request.user
-            is_superuser = user.is_authenticated and user.is_superuser
-            has_special_perms = (
-                user.has_perm("clubs.see_pending_clubs")
-                or user.has_perm("clubs.manage_club")
-                or user.has_perm("clubs.approve_club")
-            )
-
-            # Only filter out inactive clubs for regular users
-            # Superusers and users with special permissions can see all inactive clubs
-            if not (is_superuser or has_special_perms):
-                queryset = queryset.filter(active=True)
-
-        # Restrict unauthenticated viewers to explicitly public clubs.
-        if is_public_viewer(self.request):
-            queryset = queryset.filter(visible_to_public=True)
-
-        # filter by approved clubs
-        if (
-            self.request.user.has_perm("clubs.see_pending_clubs")
-            or bypass
-            or self.action not in {"list"}
-        ):
-            return queryset
-        else:
-            return queryset.filter(Q(approved=True) | Q(ghost=True))
+        return filter_visible_clubs(
+            queryset, self.request.user, self.request.query_params, self.action
+        )
 
     def _has_elevated_view_perms(self, instance):
         """
@@ -1545,10 +1691,6 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
                     "ghost",
                 ]
             )
-            _bump_clubs_list_cache_version()
-
-            # create thumbnail
-            club.create_thumbnail(request)
 
         return resp
 
@@ -2044,6 +2186,9 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
                 .delete()
             )  # showings will be deleted by cascade
 
+            # make sure the next scheduled import brings the events back
+            ICSImportState.objects.filter(club=club).delete()
+
             return Response(
                 {
                     "success": True,
@@ -2163,12 +2308,13 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
                 "name", "code"
             )
         }
+        matcher = ClubNameMatcher()
         output = []
         for name in clubs:
             if name in simple:
                 output.append(simple[name])
             elif name:
-                fuzzy = fuzzy_lookup_club(name)
+                fuzzy = matcher.lookup(name)
                 if fuzzy is None:
                     fuzzy = "None"
                 else:
@@ -2396,22 +2542,20 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
             and (not is_superuser)
             and (not has_special_perms)
             and (not bypass)
+            and (not self.is_streaming_export())
         )
 
-        key = None
-        if use_cache:
-            key = (
-                f"clubs:list:anon:v{_get_clubs_list_cache_version()}:"
-                f"{self.request.build_absolute_uri()}"
-            )
-            cached_object = cache.get(key)
+        # cached pages are evicted by club saves that could affect them
+        key = club_list_cache.get_page_key(self.request) if use_cache else None
+        if key is not None:
+            cached_object = club_list_cache.get(key)
             if cached_object:
                 return Response(cached_object)
 
         resp = super().list(*args, **kwargs)
 
-        if use_cache and key is not None:
-            cache.set(key, resp.data, 60 * 60)
+        if key is not None:
+            club_list_cache.set(key, resp.data)
         return resp
 
     def retrieve(self, *args, **kwargs):
@@ -2447,7 +2591,6 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
         self.check_approval_permission(request)
         cache.delete(f"clubs:{self.get_object().id}-authed")
         cache.delete(f"clubs:{self.get_object().id}-anon")
-        _bump_clubs_list_cache_version()
         return super().update(request, *args, **kwargs)
 
     def partial_update(self, request, *args, **kwargs):
@@ -2457,7 +2600,6 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
         self.check_approval_permission(request)
         cache.delete(f"clubs:{self.get_object().id}-authed")
         cache.delete(f"clubs:{self.get_object().id}-anon")
-        _bump_clubs_list_cache_version()
         return super().partial_update(request, *args, **kwargs)
 
     def perform_destroy(self, instance):
@@ -2470,7 +2612,6 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
         instance.archived_by = self.request.user
         instance.archived_on = timezone.now()
         instance.save()
-        _bump_clubs_list_cache_version()
 
         # Send notice to club officers and executor
         context = {
@@ -2687,6 +2828,10 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
                                     type: string
                                     description: A message indicating how many
                                         recipients received the blast
+                                outbox:
+                                    type: string
+                                    description: The id of the outbox batch that
+                                        can be used to track delivery progress
             "400":
                 description: Content or target field was empty or missing
                 content:
@@ -2734,19 +2879,26 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
             .distinct()
         )
 
-        send_mail_helper(
-            name="blast",
-            subject=f"Update from {settings.BRANDING_SITE_NAME}",
-            emails=emails,
-            context={
-                "sender": settings.BRANDING_SITE_NAME,
-                "content": content,
-                "reply_emails": settings.OSA_EMAILS + [settings.BRANDING_SITE_EMAIL],
-            },
-            reply_to=settings.OSA_EMAILS + [settings.BRANDING_SITE_EMAIL],
-        )
+        with OutboxBatch.collect("email_blast", creator=request.user) as batch:
+            send_mail_helper(
+                name="blast",
+                subject=f"Update from {settings.BRANDING_SITE_NAME}",
+                emails=emails,
+                context={
+                    "sender": settings.BRANDING_SITE_NAME,
+                    "content": content,
+                    "reply_emails": settings.OSA_EMAILS
+                    + [settings.BRANDING_SITE_EMAIL],
+                },
+                reply_to=settings.OSA_EMAILS + [settings.BRANDING_SITE_EMAIL],
+            )
 
-        return Response({"detail": (f"Blast sent to {len(emails)} recipients")})
+        return Response(
+            {
+                "detail": (f"Blast sent to {len(emails)} recipients"),
+                "outbox": str(batch.id),
+            }
+        )
 
     def get_serializer_class(self):
         """
@@ -2768,16 +2920,10 @@ class ClubViewSet(XLSXFormatterMixin, viewsets.ModelViewSet):
             return ApprovalHistorySerializer
         if self.action in {"list", "fields"}:
             if self.request is not None and (
-                self.request.accepted_renderer.format == "xlsx"
+                self.request.accepted_renderer.format in SPREADSHEET_FORMATS
                 or self.action == "fields"
             ):
-                if (
-                    self.request.user.has_perm("clubs.generate_reports")
-                    or self.request.user.is_superuser
-                ):
-                    return ReportClubSerializer
-                else:
-                    return ClubSerializer
+                return get_club_report_serializer_class(self.request.user)
             return ClubListSerializer
 
         if self.request is not None and self.request.user.is_authenticated:
@@ -3053,13 +3199,7 @@ class ClubEventViewSet(viewsets.ModelViewSet):
         event = Event.objects.get(id=kwargs["id"])
         self.check_object_permissions(request, event)
 
-        resp = upload_endpoint_helper(request, Event, "image", "image", pk=event.pk)
-
-        # if image uploaded, create thumbnail
-        if status.is_success(resp.status_code):
-            event.create_thumbnail(request)
-
-        return resp
+        return upload_endpoint_helper(request, Event, "image", "image", pk=event.pk)
 
     def create(self, request, *args, **kwargs):
         """
@@ -3184,7 +3324,7 @@ class ClubEventViewSet(viewsets.ModelViewSet):
         showings = EventShowing.objects.filter(event=event)
         if (
             Ticket.objects.filter(showing__in=showings)
-            .filter(Q(owner__isnull=False) | Q(holder__isnull=False))
+            .filter(Q(owner__isnull=False) | Ticket.objects.held_q())
             .exists()
         ):
             raise DRFValidationError(
@@ -3250,14 +3390,11 @@ class ClubEventViewSet(viewsets.ModelViewSet):
         return (
             qs.select_related("club", "creator")
             .prefetch_related(
+                "image_source__variants",
                 Prefetch(
                     "eventshowing_set",
                     queryset=EventShowing.objects.all(),
                 ),
-                Prefetch(
-                    "eventshowing_set__tickets",
-                    queryset=Ticket.objects.select_related("owner", "holder"),
-                ),
                 Prefetch(
                     "club__badges",
                     queryset=(
@@ -3601,7 +3738,7 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
                 or showing.ticket_drop_time <= timezone.now()
             )
             and Ticket.objects.filter(showing=showing)
-            .filter(Q(owner__isnull=False) | Q(holder__isnull=False))
+            .filter(Q(owner__isnull=False) | Ticket.objects.held_q())
             .exists()
         ):
             raise DRFValidationError(
@@ -3617,7 +3754,7 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
         showing = self.get_object()
         if (
             Ticket.objects.filter(showing=showing)
-            .filter(Q(owner__isnull=False) | Q(holder__isnull=False))
+            .filter(Q(owner__isnull=False) | Ticket.objects.held_q())
             .exists()
         ):
             raise DRFValidationError(
@@ -3630,7 +3767,6 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     @transaction.atomic
-    @update_holds
     @LabsAnalytics.record_api_function(FuncEntry(name="add_to_cart"))
     def add_to_cart(self, request, *args, **kwargs):
         """
@@ -3731,7 +3867,10 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        cart, _ = Cart.objects.get_or_create(owner=self.request.user)
+        # lock the cart so that concurrent requests respect the order limit
+        cart, _ = Cart.objects.select_for_update().get_or_create(
+            owner=self.request.user
+        )
 
         # Check if the showing has already ended
         if showing.end_time < timezone.now():
@@ -3769,23 +3908,17 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        # hold the new tickets so that concurrent buyers never get the same ticket
+        in_cart = cart.tickets.filter(showing=showing).values("id")
         for item in quantities:
             type = item["type"]
             count = item["count"]
 
-            tickets = (
-                Ticket.objects.filter(
-                    showing=showing,
-                    type=type,
-                    owner__isnull=True,
-                    holder__isnull=True,
-                    buyable=True,
-                )
-                .prefetch_related("carts")
-                .exclude(carts__owner=self.request.user)
+            held = Ticket.objects.reserve(
+                showing, type, count, self.request.user, exclude=in_cart
             )
-
-            if tickets.count() < count:
+            if held is None:
+                transaction.set_rollback(True)
                 return Response(
                     {
                         "detail": f"Not enough tickets of type {type} left!",
@@ -3793,7 +3926,7 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
                     },
                     status=status.HTTP_403_FORBIDDEN,
                 )
-            cart.tickets.add(*tickets[:count])
+            cart.tickets.add(*held)
 
         cart.save()
         return Response(
@@ -3802,7 +3935,6 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     @transaction.atomic
-    @update_holds
     def remove_from_cart(self, request, *args, **kwargs):
         """
         Remove tickets from cart
@@ -3895,9 +4027,12 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
             tickets_to_remove = cart.tickets.filter(type=type, showing=showing)
 
             # Only remove as many as we have
-            count = min(count, tickets_to_remove.count())
-            cart.tickets.remove(*tickets_to_remove[:count])
-            total_removed += count
+            removed = list(tickets_to_remove.values_list("id", flat=True)[:count])
+            cart.tickets.remove(*removed)
+            Ticket.objects.filter(id__in=removed, holder=self.request.user).update(
+                holder=None, holding_expiration=None
+            )
+            total_removed += len(removed)
 
         cart.save()
         return Response(
@@ -4011,7 +4146,7 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
             .order_by("type")
         )
         available = (
-            tickets.filter(owner__isnull=True, holder__isnull=True, buyable=True)
+            tickets.filter(~Ticket.objects.held_q(), owner__isnull=True, buyable=True)
             .values("type")
             .annotate(price=Max("price"))
             .annotate(count=Count("type"))
@@ -4037,7 +4172,7 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
         # Tickets can't be edited after they've been sold or held
         if (
             Ticket.objects.filter(showing=showing)
-            .filter(Q(owner__isnull=False) | Q(holder__isnull=False))
+            .filter(Q(owner__isnull=False) | Ticket.objects.held_q())
             .exists()
         ):
             return Response(
@@ -4143,7 +4278,6 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     @transaction.atomic
-    @update_holds
     def issue_tickets(self, request, *args, **kwargs):
         """
         Issue tickets that have already been created to users in bulk.
@@ -4257,10 +4391,10 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
         available_tickets = []
         for ticket_type, num_requested in collections.Counter(ticket_types).items():
             tickets = Ticket.objects.select_for_update(skip_locked=True).filter(
+                ~Ticket.objects.held_q(),
                 showing=showing,
                 type=ticket_type,
                 owner__isnull=True,
-                holder__isnull=True,
             )[:num_requested]
 
             if tickets.count() < num_requested:
@@ -4302,7 +4436,6 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
         Ticket.objects.bulk_update(
             available_tickets, ["owner", "holder", "transaction_record"]
         )
-        Ticket.objects.update_holds()
 
         for ticket in available_tickets:
             ticket.send_confirmation_email()
@@ -4348,6 +4481,10 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
                                     type: string
                                     description: A message indicating how many
                                         recipients received the blast
+                                outbox:
+                                    type: string
+                                    description: The id of the outbox batch that
+                                        can be used to track delivery progress
             "400":
                 description: Content field was empty or missing
                 content:
@@ -4389,24 +4526,28 @@ class ClubEventShowingViewSet(viewsets.ModelViewSet):
 
         reply_emails = showing.event.club.get_officer_emails()
 
-        send_mail_helper(
-            name="blast",
-            subject=f"Update on {showing.event.name} from {showing.event.club.name}",
-            emails=emails,
-            context={
-                "sender": showing.event.club.name,
-                "content": content,
-                "reply_emails": reply_emails,
-            },
-            reply_to=reply_emails,
-        )
+        with OutboxBatch.collect("showing_email_blast", creator=request.user) as batch:
+            send_mail_helper(
+                name="blast",
+                subject=(
+                    f"Update on {showing.event.name} from {showing.event.club.name}"
+                ),
+                emails=emails,
+                context={
+                    "sender": showing.event.club.name,
+                    "content": content,
+                    "reply_emails": reply_emails,
+                },
+                reply_to=reply_emails,
+            )
 
         return Response(
             {
                 "detail": (
                     f"Blast sent to {len(holder_emails)} ticket holders "
                     f"and {len(officer_emails)} officers"
-                )
+                ),
+                "outbox": str(batch.id),
             }
         )
 
@@ -4558,7 +4699,7 @@ class MembershipViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Membership.objects.filter(
             person=self.request.user, club__archived=False
-        ).prefetch_related("club__tags")
+        ).prefetch_related("club__tags", "club__image_source__variants")
         person = self.request.user
         queryset = queryset.prefetch_related(
             Prefetch(
@@ -4631,7 +4772,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Favorite.objects.filter(
             person=self.request.user, club__archived=False
-        ).prefetch_related("club__tags")
+        ).prefetch_related("club__tags", "club__image_source__variants")
 
         person = self.request.user
         queryset = queryset.prefetch_related(
@@ -4694,7 +4835,7 @@ class SubscribeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Subscribe.objects.filter(
             person=self.request.user, club__archived=False
-        ).prefetch_related("club__tags")
+        ).prefetch_related("club__tags", "club__image_source__variants")
 
         person = self.request.user
         queryset = queryset.prefetch_related(
@@ -4735,7 +4876,9 @@ class ClubVisitViewSet(viewsets.ModelViewSet):
     http_method_names = ["get", "post"]
 
     def get_queryset(self):
-        return ClubVisit.objects.filter(person=self.request.user, club__archived=False)
+        return ClubVisit.objects.filter(
+            person=self.request.user, club__archived=False
+        ).prefetch_related("club__image_source__variants")
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -5493,74 +5636,18 @@ class FavoriteCalendarAPIView(APIView):
         is_global = parse_boolean(request.query_params.get("global"))
         is_all = parse_boolean(request.query_params.get("all"))
 
-        calendar = ICSCal(
-            creator=f"{settings.BRANDING_SITE_NAME} ({settings.DOMAINS[0]})"
-        )
-        calendar.extra.append(
-            ICSParse.ContentLine(
-                name="X-WR-CALNAME", value=f"{settings.BRANDING_SITE_NAME} Events"
-            )
-        )
-
-        # only fetch events newer than the past month
-        one_month_ago = timezone.now() - datetime.timedelta(days=30)
-
-        # Get event showings that start after one month ago
-        event_showings = EventShowing.objects.filter(start_time__gte=one_month_ago)
-
-        # filter based on user supplied flags
-        q = Q(
-            event__club__favorite__person__profile__uuid_secret=kwargs[
-                "user_secretuuid"
-            ]
-        )
-        if is_global is None:
-            q |= Q(event__club__isnull=True)
-
-        if is_global:
-            event_showings = event_showings.filter(event__club__isnull=True)
-        elif not is_all:
-            event_showings = event_showings.filter(q)
+        feed = calendar_feed_cache.get(kwargs["user_secretuuid"], is_global, is_all)
 
-        event_showings = event_showings.distinct().select_related(
-            "event", "event__club"
-        )
-
-        for showing in event_showings:
-            event = showing.event
-            e = ICSEvent()
-            e.name = "{} - {}".format(
-                event.club.name if event.club else "Global Event", event.name
-            )
-            e.begin = showing.start_time
-
-            # ensure event is at least 15 minutes for display purposes
-            e.end = (
-                (showing.start_time + datetime.timedelta(minutes=15))
-                if showing.start_time >= showing.end_time
-                else showing.end_time
-            )
-
-            # put url in location if location does not exist, otherwise put url in body
-            if showing.location:
-                e.location = showing.location
-            else:
-                e.location = event.url
-            e.url = event.url
-            e.description = "{}\n\n{}".format(
-                event.url or "" if not showing.location else "",
-                html_to_text(event.description),
-            ).strip()
-            e.uid = f"{event.ics_uuid}@{settings.DOMAINS[0]}"
-            e.created = event.created_at
-            e.last_modified = event.updated_at
-            e.categories = [event.club.name] if event.club else ["Global Event"]
-
-            calendar.events.add(e)
-
-        response = HttpResponse(calendar, content_type="text/calendar")
+        response = HttpResponse(feed["body"], content_type="text/calendar")
         response["Content-Disposition"] = "attachment; filename=favorite_events.ics"
-        return response
+        response["ETag"] = feed["etag"]
+        response["Last-Modified"] = http_date(feed["last_modified"])
+        return get_conditional_response(
+            request,
+            etag=feed["etag"],
+            last_modified=feed["last_modified"],
+            response=response,
+        )
 
 
 class UserGroupAPIView(APIView):
@@ -5694,12 +5781,18 @@ class UserPermissionAPIView(APIView):
             ret[perm] = None
             lookups[key].append(value)
 
-        # lookup individual permissions grouped by permission
+        # lookup individual permissions grouped by permission,
+        # resolving the roles for every club at once
+        club_perms = {"clubs.manage_club", "clubs.delete_club"}
+        codes = {code for key in club_perms for code in lookups.get(key, [])}
+        clubs = {club.code: club for club in Club.objects.filter(code__in=codes)}
+        get_club_roles(request).prefetch(clubs.keys())
+
         for key, values in lookups.items():
-            if key in {"clubs.manage_club", "clubs.delete_club"}:
+            if key in club_perms:
                 perm_checker = ClubPermission()
                 view = FakeView("destroy" if key == "clubs.delete_club" else "update")
-                objs = Club.objects.filter(code__in=values)
+                objs = [clubs[code] for code in values if code in clubs]
                 global_perm = perm_checker.has_permission(request, view)
                 for obj in objs:
                     perm = f"{key}:{obj.code}"
@@ -5862,88 +5955,10 @@ class MeetingZoomWebhookAPIView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
+        # visits are written in batches, see ZoomWebhook
         action = request.data.get("event")
-        event_id = None
-        if action == "meeting.participant_joined":
-            email = (
-                request.data.get("payload", {})
-                .get("object", {})
-                .get("participant", {})
-                .get("email", None)
-            )
-
-            if email:
-                username = email.split("@")[0]
-                person = get_user_model().objects.filter(username=username).first()
-            else:
-                person = None
-
-            meeting_id = (
-                request.data.get("payload", {}).get("object", {}).get("id", None)
-            )
-            regex = rf"""https?:\/\/([A-z]*\.)?zoom\.us/[^\/]*\/
-                        {meeting_id}(\?pwd=[A-z,0-9]*)?"""
-            event = Event.objects.filter(url__regex=regex).first()
-
-            participant_id = (
-                request.data.get("payload", {})
-                .get("object", {})
-                .get("participant", {})
-                .get("user_id", None)
-            )
-            join_time = (
-                request.data.get("payload", {})
-                .get("object", {})
-                .get("participant", {})
-                .get("join_time", None)
-            )
-
-            if event:
-                ZoomMeetingVisit.objects.create(
-                    person=person,
-                    event=event,
-                    meeting_id=meeting_id,
-                    participant_id=participant_id,
-                    join_time=join_time,
-                )
-                event_id = event.id
-        elif action == "meeting.participant_left":
-            meeting_id = (
-                request.data.get("payload", {}).get("object", {}).get("id", None)
-            )
-            participant_id = (
-                request.data.get("payload", {})
-                .get("object", {})
-                .get("participant", {})
-                .get("user_id", None)
-            )
-            leave_time = (
-                request.data.get("payload", {})
-                .get("object", {})
-                .get("participant", {})
-                .get("leave_time", None)
-            )
-
-            meeting = (
-                ZoomMeetingVisit.objects.filter(
-                    meeting_id=meeting_id,
-                    participant_id=participant_id,
-                    leave_time__isnull=True,
-                )
-                .order_by("-created_at")
-                .first()
-            )
-            if meeting is not None:
-                meeting.leave_time = leave_time
-                meeting.save()
-                event_id = meeting.event.id
-
-        if event_id is not None:
-            channel_layer = get_channel_layer()
-            if channel_layer is not None:
-                async_to_sync(channel_layer.group_send)(
-                    f"events-live-{event_id}", {"type": "join_leave", "event": action}
-                )
+        if action in {ZoomMeetingVisit.JOINED, ZoomMeetingVisit.LEFT}:
+            ZoomWebhook.stage(action, request.data.get("payload", {}).get("object", {}))
 
         return Response({"success": True})
 
@@ -6531,7 +6546,6 @@ class TicketViewSet(viewsets.ModelViewSet):
         return Response(TicketSerializer(ticket).data)
 
     @transaction.atomic
-    @update_holds
     @action(detail=False, methods=["get"])
     def cart(self, request, *args, **kwargs):
         """
@@ -6583,7 +6597,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         tickets_to_replace = cart.tickets.filter(
             Q(owner__isnull=False)
             | Q(showing__event__club__archived=True)
-            | Q(holder__isnull=False)
+            | Ticket.objects.held_q(now)
             | Q(showing__end_time__lt=now)
             | (
                 Q(showing__ticket_drop_time__gt=timezone.now())
@@ -6595,7 +6609,12 @@ class TicketViewSet(viewsets.ModelViewSet):
         if not tickets_to_replace.exists():
             return Response(
                 {
-                    "tickets": TicketSerializer(cart.tickets.all(), many=True).data,
+                    "tickets": TicketSerializer(
+                        cart.tickets.prefetch_related(
+                            "showing__event__image_source__variants"
+                        ),
+                        many=True,
+                    ).data,
                     "sold_out": [],
                 },
             )
@@ -6636,11 +6655,11 @@ class TicketViewSet(viewsets.ModelViewSet):
             available_tickets = Ticket.objects.filter(
                 Q(showing__ticket_drop_time__lte=timezone.now())
                 | Q(showing__ticket_drop_time__isnull=True),
+                ~Ticket.objects.held_q(now),
                 showing=ticket_class["showing"],
                 type=ticket_class["type"],
                 buyable=True,  # should not be triggered as buyable is by ticket class
                 owner__isnull=True,
-                holder__isnull=True,
             ).exclude(id__in=tickets_in_cart)[: ticket_class["count"]]
 
             num_short = ticket_class["count"] - available_tickets.count()
@@ -6668,13 +6687,17 @@ class TicketViewSet(viewsets.ModelViewSet):
 
         return Response(
             {
-                "tickets": TicketSerializer(cart.tickets.all(), many=True).data,
+                "tickets": TicketSerializer(
+                    cart.tickets.prefetch_related(
+                        "showing__event__image_source__variants"
+                    ),
+                    many=True,
+                ).data,
                 "sold_out": sold_out_tickets,
             },
         )
 
     @action(detail=False, methods=["post"])
-    @update_holds
     @transaction.atomic
     @LabsAnalytics.record_api_function(FuncEntry(name="checkout_initiated"))
     def initiate_checkout(self, request, *args, **kwargs):
@@ -6761,7 +6784,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         # skip_locked is important here because if any of the tickets in cart
         # are locked, we shouldn't block.
         tickets = cart.tickets.select_for_update(skip_locked=True).filter(
-            Q(holder__isnull=True) | Q(holder=self.request.user),
+            ~Ticket.objects.held_q() | Q(holder=self.request.user),
             Q(showing__ticket_drop_time__lte=timezone.now())
             | Q(showing__ticket_drop_time__isnull=True),
             showing__event__club__archived=False,
@@ -7015,8 +7038,9 @@ class TicketViewSet(viewsets.ModelViewSet):
             )
 
         # Payment was successful - verify tickets are still held
-        Ticket.objects.update_holds()
-        tickets = cart.tickets.filter(holder=user, owner__isnull=True)
+        tickets = cart.tickets.filter(
+            Ticket.objects.held_q(), holder=user, owner__isnull=True
+        )
         if tickets.count() != cart.tickets.count():
             # Hold expired during payment - this is a race condition
             # The payment was charged but we can't give the tickets
@@ -7170,7 +7194,9 @@ class TicketViewSet(viewsets.ModelViewSet):
                 Q(owner=self.request.user.id)
                 | Q(showing__event__club__in=officer_clubs)
             ).select_related("showing__event__club")
-        return Ticket.objects.filter(owner=self.request.user.id)
+        return Ticket.objects.filter(owner=self.request.user.id).prefetch_related(
+            "showing__event__image_source__variants"
+        )
 
     @staticmethod
     def _give_tickets(user, order_info, cart, transaction_uuid):
@@ -7216,7 +7242,6 @@ class TicketViewSet(viewsets.ModelViewSet):
         tickets.update(owner=user, holder=None, transaction_record=transaction_record)
 
         cart.tickets.clear()
-        Ticket.objects.update_holds()
         cart.pending_transaction_uuid = None
         cart.save()
 
@@ -7231,7 +7256,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         """
         Helper function that places a 10 minute hold on tickets for a user
         """
-        holding_expiration = timezone.now() + datetime.timedelta(minutes=10)
+        holding_expiration = timezone.now() + Ticket.objects.HOLD_DURATION
         tickets.update(holder=user, holding_expiration=holding_expiration)
 
 
@@ -7433,12 +7458,20 @@ class UserViewSet(viewsets.ModelViewSet):
         response = Response([])
         if len(questions) == 0:
             return response
-        application = (
-            ApplicationQuestion.objects.filter(pk=questions[0]).first().application
-        )
+
+        # load every question with its committees and choices up front
+        question_objs = {
+            str(question.pk): question
+            for question in ApplicationQuestion.objects.filter(pk__in=questions)
+            .select_related("application")
+            .prefetch_related("committees", "multiple_choice")
+        }
+        if str(questions[0]) not in question_objs:
+            return response
+        application = question_objs[str(questions[0])].application
         committee = application.committees.filter(name=committee_name).first()
 
-        committees_applied = (
+        committees_applied = list(
             ApplicationSubmission.objects.filter(
                 user=self.request.user,
                 committee__isnull=False,
@@ -7464,7 +7497,7 @@ class UserViewSet(viewsets.ModelViewSet):
         # limit applicants to 2 committees
         if (
             committee
-            and committees_applied.count() >= 2
+            and len(committees_applied) >= 2
             and committee_name not in committees_applied
         ):
             return Response(
@@ -7499,11 +7532,11 @@ class UserViewSet(viewsets.ModelViewSet):
             committee=committee,
         )
 
-        key = f"applicationsubmissions:{application.id}"
-        cache.delete(key)
-
+        responses = {}
         for question_pk in questions:
-            question = ApplicationQuestion.objects.filter(pk=question_pk).first()
+            question = question_objs.get(str(question_pk))
+            if question is None:
+                continue
             question_type = question.question_type
             question_data = self.request.data.get(question_pk, None)
 
@@ -7520,24 +7553,50 @@ class UserViewSet(viewsets.ModelViewSet):
             ):
                 text = question_data.get("text", None)
                 if text is not None and text != "":
-                    obj, _ = ApplicationQuestionResponse.objects.update_or_create(
-                        question=question,
-                        submission=submission,
-                        defaults={"text": text},
+                    responses[question.pk] = (
+                        "text",
+                        ApplicationQuestionResponse(
+                            question=question, submission=submission, text=text
+                        ),
                     )
-                    response = Response(ApplicationQuestionResponseSerializer(obj).data)
             elif question_type == ApplicationQuestion.MULTIPLE_CHOICE:
                 multiple_choice_value = question_data.get("multipleChoice", None)
                 if multiple_choice_value is not None and multiple_choice_value != "":
-                    multiple_choice_obj = ApplicationMultipleChoice.objects.filter(
-                        question=question, value=multiple_choice_value
-                    ).first()
-                    obj, _ = ApplicationQuestionResponse.objects.update_or_create(
-                        question=question,
-                        submission=submission,
-                        defaults={"multiple_choice": multiple_choice_obj},
+                    multiple_choice_obj = next(
+                        (
+                            choice
+                            for choice in question.multiple_choice.all()
+                            if choice.value == str(multiple_choice_value)
+                        ),
+                        None,
+                    )
+                    responses[question.pk] = (
+                        "multiple_choice",
+                        ApplicationQuestionResponse(
+                            question=question,
+                            submission=submission,
+                            multiple_choice=multiple_choice_obj,
+                        ),
+                    )
+
+        # upsert the responses of each type at once, only overwriting the field
+        # that was answered
+        with transaction.atomic():
+            for field in ["text", "multiple_choice"]:
+                objs = [obj for kind, obj in responses.values() if kind == field]
+                if objs:
+                    ApplicationQuestionResponse.objects.bulk_create(
+                        objs,
+                        update_conflicts=True,
+                        unique_fields=["question", "submission"],
+                        update_fields=[field, "updated_at"],
                     )
-                    response = Response(ApplicationQuestionResponseSerializer(obj).data)
+
+        application_submission_cache.invalidate(application.id, [submission.pk])
+
+        if responses:
+            _, obj = list(responses.values())[-1]
+            response = Response(ApplicationQuestionResponseSerializer(obj).data)
         return response
 
     @action(detail=False, methods=["get"])
@@ -7724,11 +7783,6 @@ class ClubApplicationViewSet(viewsets.ModelViewSet):
 
         dry_run = self.request.data.get("dry_run")
 
-        if not dry_run:
-            # Invalidate submission viewset cache
-            key = f"applicationsubmissions:{app.id}"
-            cache.delete(key)
-
         email_type = self.request.data.get("email_type")["id"]
 
         subject = f"Application Update for {app.name}"
@@ -7795,6 +7849,14 @@ class ClubApplicationViewSet(viewsets.ModelViewSet):
             with mail.get_connection() as conn:
                 conn.send_messages(mass_emails)
             ApplicationSubmission.objects.bulk_update(submissions, ["notified"])
+            application_submission_cache.patch(
+                app.id,
+                {
+                    submission.pk: {"notified": True}
+                    for submission in submissions
+                    if submission.notified
+                },
+            )
 
             # Send out membership invites after sending acceptance emails
             expiry_time = timezone.now() + datetime.timedelta(days=5)
@@ -7900,11 +7962,12 @@ class ClubApplicationViewSet(viewsets.ModelViewSet):
             ClubApplication.objects.filter(
                 club__code=self.kwargs["club_code"],
             )
-            .select_related("application_cycle", "club")
+            .select_related("application_cycle", "club__image_source")
             .prefetch_related(
                 "questions__multiple_choice",
                 "questions__committees",
                 "committees",
+                "club__image_source__variants",
             )
         )
 
@@ -8297,9 +8360,12 @@ class WhartonApplicationAPIView(viewsets.ModelViewSet):
                 application_start_time__lte=now,
                 application_end_time__gte=now,
             )
-            .select_related("club")
+            .select_related("application_cycle", "club__image_source")
             .prefetch_related(
-                "committees", "questions__multiple_choice", "questions__committees"
+                "committees",
+                "questions__multiple_choice",
+                "questions__committees",
+                "club__image_source__variants",
             )
         )
 
@@ -8374,9 +8440,29 @@ class ApplicationExtensionViewSet(viewsets.ModelViewSet):
         )
 
 
+def prefetch_submissions(queryset):
+    """
+    Load everything needed to serialize application submissions with their
+    responses in a fixed number of queries.
+    """
+    return queryset.select_related(
+        "user__profile", "committee", "application__club"
+    ).prefetch_related(
+        Prefetch(
+            "responses",
+            queryset=ApplicationQuestionResponse.objects.select_related(
+                "multiple_choice", "question"
+            ),
+        ),
+        "responses__question__committees",
+        "responses__question__multiple_choice",
+    )
+
+
 class ApplicationSubmissionViewSet(viewsets.ModelViewSet):
     """
-    list: List submissions for a given club application.
+    list: List submissions for a given club application, optionally filtered by
+    status and committee.
 
     status: Changes status of a submission
 
@@ -8384,139 +8470,135 @@ class ApplicationSubmissionViewSet(viewsets.ModelViewSet):
     """
 
     permission_classes = [ClubSensitiveItemPermission | IsSuperuser]
+    pagination_class = OptionalCursorPagination
     http_method_names = ["get", "post"]
 
     def get_queryset(self):
         app_id = self.kwargs["application_pk"]
-        submissions = (
+        return prefetch_submissions(
             ApplicationSubmission.objects.filter(application=app_id)
-            .select_related("user__profile", "committee", "application__club")
-            .prefetch_related(
-                Prefetch(
-                    "responses",
-                    queryset=ApplicationQuestionResponse.objects.select_related(
-                        "multiple_choice", "question"
-                    ),
-                ),
-                "responses__question__committees",
-                "responses__question__multiple_choice",
-            )
         )
-        return submissions
 
-    def list(self, *args, **kwargs):
+    def filter_queryset(self, queryset):
         """
-        Manually cache responses (to support invalidation)
-        Responses are invalidated on status / reason updates and email sending
+        Filter the submissions by a comma separated list of statuses and by the
+        name of their committee.
         """
+        statuses = self.request.query_params.get("status")
+        if statuses:
+            queryset = queryset.filter(
+                status__in=[
+                    status for status in statuses.split(",") if status.isdigit()
+                ]
+            )
+
+        committee = self.request.query_params.get("committee")
+        if committee:
+            queryset = queryset.filter(committee__name=committee)
+
+        return queryset
 
+    def list(self, *args, **kwargs):
+        """
+        List the submissions, serializing each submission once and caching it until
+        it changes. The submissions are paginated by cursor if a cursor or page size
+        is specified.
+        ---
+        parameters:
+            - name: status
+              in: query
+              required: false
+              description: A comma separated list of statuses to filter by.
+              schema:
+                type: string
+            - name: committee
+              in: query
+              required: false
+              description: The name of the committee to filter by.
+              schema:
+                type: string
+            - name: cursor
+              in: query
+              required: false
+              schema:
+                type: string
+            - name: page_size
+              in: query
+              required: false
+              schema:
+                type: integer
+        ---
+        """
         app_id = self.kwargs["application_pk"]
-        key = f"applicationsubmissions:{app_id}"
+        serializer = self.get_serializer_class()
 
-        cached = cache.get(key)
-        if cached is not None:
-            return Response(cached)
+        # spreadsheet exports are serialized differently and are not cached
+        if serializer is not ApplicationSubmissionSerializer:
+            return super().list(*args, **kwargs)
+
+        queryset = self.filter_queryset(
+            ApplicationSubmission.objects.filter(application=app_id)
+        ).order_by("pk")
+        page = self.paginate_queryset(queryset.only("pk"))
+        if page is not None:
+            ids = [submission.pk for submission in page]
         else:
-            serializer = self.get_serializer_class()
-            qs = self.get_queryset()
-            data = serializer(qs, many=True).data
-            cache.set(key, data, 60 * 60)
+            ids = list(queryset.values_list("pk", flat=True))
+        data = application_submission_cache.represent(
+            app_id,
+            ids,
+            lambda missing: serializer(
+                self.get_queryset().filter(pk__in=missing), many=True
+            ).data,
+        )
 
+        if page is not None:
+            return self.get_paginated_response(data)
         return Response(data)
 
     @action(detail=False, methods=["get"])
     def export(self, *args, **kwargs):
         """
-        Given some application submissions, export them to CSV.
+        Queue an export of the submissions to this application to CSV.
+        The export is built in the background and can be downloaded using the
+        link in the export once it has finished.
         Deprecated in favor of client-side export.
-
-        Cached for 2 hours.
         ---
-        requestBody:
-            content:
-                application/json:
-                    schema:
-                        type: object
-                        properties:
-                            submissions:
-                                type: array
-                                items:
-                                    type: integer
-                            status:
-                                type: integer
         responses:
-            "200":
+            "202":
                 content:
-                    text/csv:
+                    application/json:
                         schema:
-                            type: string
+                            $ref: "#/components/schemas/ExportJob"
         ---
         """
-        app_id = int(self.kwargs["application_pk"])
-        data = (
-            ApplicationSubmission.objects.filter(application=app_id)
-            .select_related("user__profile", "committee", "application__club")
-            .prefetch_related(
-                Prefetch(
-                    "responses",
-                    queryset=ApplicationQuestionResponse.objects.select_related(
-                        "multiple_choice", "question"
-                    ),
-                ),
-                "responses__question__committees",
-                "responses__question__multiple_choice",
-            )
-        )
-        df = pd.DataFrame(ApplicationSubmissionCSVSerializer(data, many=True).data)
-        resp = HttpResponse(
-            content_type="text/csv; charset=utf-8-sig",  # support special chars
-            headers={"Content-Disposition": "attachment;filename=submissions.csv"},
-        )
-        df.to_csv(index=True, path_or_buf=resp, encoding="utf-8-sig")
-        return resp
+        return self.queue_export(ExportJob.KIND_SUBMISSIONS)
 
     @action(detail=False, methods=["get"])
     def exportall(self, *args, **kwargs):
         """
-        Export all application submissions for a particular cycle
+        Queue an export of all application submissions for a particular cycle.
+        The export is built in the background and can be downloaded using the
+        link in the export once it has finished.
         ---
-        requestBody: {}
         responses:
-            "200":
+            "202":
                 content:
                     application/json:
                         schema:
-                            type: object
-                            properties:
-                                output:
-                                    type: string
+                            $ref: "#/components/schemas/ExportJob"
         ---
         """
+        get_object_or_404(ClubApplication, id=self.kwargs["application_pk"])
+        return self.queue_export(ExportJob.KIND_ALL_SUBMISSIONS)
 
-        app_id = int(self.kwargs["application_pk"])
-        cycle = ClubApplication.objects.get(id=app_id).application_cycle
-        data = (
-            ApplicationSubmission.objects.filter(
-                application__is_wharton_council=True,
-                application__application_cycle=cycle,
-            )
-            .select_related("application", "application__application_cycle")
-            .annotate(
-                annotated_name=F("application__name"),
-                annotated_committee=F("committee__name"),
-                annotated_club=F("application__club__name"),
-            )
-            .values(
-                "annotated_name",
-                "application",
-                "annotated_committee",
-                "annotated_club",
-                "status",
-                "user",
-            )
+    def queue_export(self, kind):
+        parameters = {"application": int(self.kwargs["application_pk"])}
+        job, _ = ExportJob.request(kind, self.request.user, parameters)
+        return Response(
+            ExportJobSerializer(job, context={"request": self.request}).data,
+            status=status.HTTP_202_ACCEPTED,
         )
-        serialized_q = json.dumps(list(data.values()), cls=DjangoJSONEncoder)
-        return Response(serialized_q)
 
     @action(detail=False, methods=["post"])
     def status(self, *args, **kwargs):
@@ -8553,16 +8635,20 @@ class ApplicationSubmissionViewSet(viewsets.ModelViewSet):
             status in map(lambda x: x[0], ApplicationSubmission.STATUS_TYPES)
             and len(submission_pks) > 0
         ):
-            # Invalidate submission viewset cache
-            submissions = ApplicationSubmission.objects.filter(pk__in=submission_pks)
-            app_id = submissions.first().application.id if submissions.first() else None
-            if not app_id:
+            submissions = ApplicationSubmission.objects.filter(
+                pk__in=submission_pks, application=self.kwargs["application_pk"]
+            )
+            pks = list(submissions.values_list("pk", flat=True))
+            if not pks:
                 return Response({"detail": "No submissions found"})
-            key = f"applicationsubmissions:{app_id}"
-            cache.delete(key)
 
             submissions.update(status=status)
 
+            # patch only the cached submissions that changed
+            application_submission_cache.patch(
+                self.kwargs["application_pk"], {pk: {"status": status} for pk in pks}
+            )
+
             return Response(
                 {
                     "detail": f"Successfully updated submissions' {submission_pks}"
@@ -8610,24 +8696,29 @@ class ApplicationSubmissionViewSet(viewsets.ModelViewSet):
         pks = list(map(lambda x: x["id"], submissions))
         reasons = list(map(lambda x: x["reason"], submissions))
 
-        submission_objs = ApplicationSubmission.objects.filter(pk__in=pks)
-
-        # Invalidate submission viewset cache
-        app_id = (
-            submission_objs.first().application.id if submission_objs.first() else None
-        )
-        if not app_id:
+        submission_objs = {
+            obj.pk: obj
+            for obj in ApplicationSubmission.objects.filter(
+                pk__in=pks, application=self.kwargs["application_pk"]
+            )
+        }
+        if not submission_objs:
             return Response({"detail": "No submissions found"})
-        key = f"applicationsubmissions:{app_id}"
-        cache.delete(key)
 
-        for idx, pk in enumerate(pks):
-            obj = submission_objs.filter(pk=pk).first()
-            if obj:
-                obj.reason = reasons[idx]
-                obj.save()
-            else:
+        changed = []
+        for pk, reason in zip(pks, reasons):
+            obj = submission_objs.get(pk)
+            if obj is None:
                 return Response({"detail": "Object not found"})
+            obj.reason = reason
+            changed.append(obj)
+        ApplicationSubmission.objects.bulk_update(changed, ["reason"])
+
+        # patch only the cached submissions that changed
+        application_submission_cache.patch(
+            self.kwargs["application_pk"],
+            {obj.pk: {"reason": obj.reason} for obj in changed},
+        )
 
         return Response({"detail": "Successfully updated submissions' reasons"})
 
@@ -8801,6 +8892,10 @@ class MassInviteAPIView(APIView):
     """
     Send out invites and add invite objects
     given a list of comma or newline separated emails.
+
+    Every address is validated before any invites are created, and the status of
+    each address is returned as one of invited, member, invited_already, invalid
+    or skipped.
     """
 
     permission_classes = [IsAuthenticated]
@@ -8853,44 +8948,72 @@ class MassInviteAPIView(APIView):
         emails = [x.strip() for x in re.split(r"\n|,", request.data.get("emails", ""))]
         emails = [x for x in emails if x]
 
-        original_count = len(emails)
-
-        # remove users that are already in the club
-        exist = Membership.objects.filter(
-            club=club, person__email__in=emails
-        ).values_list("person__email", flat=True)
-        emails = list(set(emails) - set(exist))
-
-        # remove users that have already been invited
-        exist = MembershipInvite.objects.filter(
-            club=club, email__in=emails, active=True
-        ).values_list("email", flat=True)
-        emails = list(set(emails) - set(exist))
-
-        # ensure all emails are valid
-        try:
-            for email in emails:
+        # record what happened to each address, in the order they were given
+        results = {}
+        for email in emails:
+            if email in results:
+                continue
+            try:
                 validate_email(email)
-        except ValidationError:
+                results[email] = None
+            except ValidationError:
+                results[email] = "invalid"
+
+        # ensure all emails are valid before inviting anyone
+        invalid = [email for email, result in results.items() if result == "invalid"]
+        if invalid:
             return Response(
                 {
-                    "detail": "The email address '{}' is not valid!".format(email),
+                    "detail": "The following email address{} not valid: {}".format(
+                        " is" if len(invalid) == 1 else "es are", ", ".join(invalid)
+                    ),
                     "success": False,
+                    "invalid": invalid,
+                    "results": [
+                        {"email": email, "status": result or "skipped"}
+                        for email, result in results.items()
+                    ],
                 }
             )
 
-        # send invites to all emails
-        for email in emails:
-            invite = MembershipInvite.objects.create(
-                email=email, club=club, creator=request.user, role=role, title=title
+        # skip users that are already in the club or have already been invited
+        for email in Membership.objects.filter(
+            club=club, person__email__in=results.keys()
+        ).values_list("person__email", flat=True):
+            results[email] = "member"
+        for email in MembershipInvite.objects.filter(
+            club=club, email__in=results.keys(), active=True
+        ).values_list("email", flat=True):
+            results[email] = results[email] or "invited_already"
+
+        # invites are only kept if all of their emails were queued
+        with transaction.atomic():
+            invites = MembershipInvite.objects.bulk_create(
+                [
+                    MembershipInvite(
+                        email=email,
+                        club=club,
+                        creator=request.user,
+                        role=role,
+                        title=title,
+                    )
+                    for email, result in results.items()
+                    if result is None
+                ],
+                batch_size=500,
             )
-            if role <= Membership.ROLE_OWNER and not mem:
-                invite.send_owner_invite(request)
-            else:
-                invite.send_mail(request)
 
-        sent_emails = len(emails)
-        skipped_emails = original_count - len(emails)
+            # queue invites to all emails, they are delivered by the outbox worker
+            with OutboxBatch.collect("mass_invite", creator=request.user) as batch:
+                for invite in invites:
+                    if role <= Membership.ROLE_OWNER and not mem:
+                        invite.send_owner_invite(request)
+                    else:
+                        invite.send_mail(request)
+                    results[invite.email] = "invited"
+
+        sent_emails = len(invites)
+        skipped_emails = len(emails) - sent_emails
 
         return Response(
             {
@@ -8904,10 +9027,48 @@ class MassInviteAPIView(APIView):
                 "sent": sent_emails,
                 "skipped": skipped_emails,
                 "success": True,
+                "outbox": str(batch.id),
+                "results": [
+                    {"email": email, "status": result}
+                    for email, result in results.items()
+                ],
             }
         )
 
 
+class OutboxBatchAPIView(APIView):
+    """
+    get: Return the delivery progress of a batch of queued emails.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        ---
+        responses:
+            "200":
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                total:
+                                    type: integer
+                                pending:
+                                    type: integer
+                                sent:
+                                    type: integer
+                                failed:
+                                    type: integer
+        ---
+        """
+        batch = get_object_or_404(OutboxBatch, id=kwargs["batch_id"])
+        if not request.user.is_superuser and batch.creator_id != request.user.id:
+            raise Http404
+        return Response(batch.progress())
+
+
 class EmailInvitesAPIView(generics.ListAPIView):
     """
     get: Return the club code, invite id and token of
@@ -8942,36 +9103,11 @@ class OptionListView(APIView):
                                 type: string
         ---
         """
-        # compute base django options
-        options = {
-            k: v
-            for k, v in Option.objects.filter(public=True).values_list("key", "value")
-        }
+        options, etag = site_options_cache.get()
 
-        # add in activities fair information
-        now = timezone.now()
-
-        fairs = ClubFair.objects.filter(
-            Q(start_time__lte=now + datetime.timedelta(weeks=1))
-            | Q(registration_start_time__lte=now),
-            end_time__gte=now - datetime.timedelta(minutes=15),
-        ).order_by("start_time")
-
-        fair = fairs.first()
-        if fair:
-            happening = fair.start_time <= now - datetime.timedelta(minutes=3)
-            close = fair.start_time >= now - datetime.timedelta(weeks=1)
-            options["FAIR_NAME"] = fair.name
-            options["FAIR_CONTACT"] = fair.contact
-            options["FAIR_ID"] = fair.id
-            options["FAIR_OPEN"] = happening
-            options["FAIR_VIRTUAL"] = fair.virtual
-            options["PRE_FAIR"] = not happening and close
-        else:
-            options["FAIR_OPEN"] = False
-            options["PRE_FAIR"] = False
-
-        return Response(options)
+        response = Response(options)
+        response["ETag"] = etag
+        return get_conditional_response(request, etag=etag, response=response)
 
 
 class LoggingArgumentParser(argparse.ArgumentParser):
@@ -9222,6 +9358,71 @@ class HealthView(APIView):
         return Response({"message": "OK"}, status=status.HTTP_200_OK)
 
 
+class MetricsView(APIView):
+    """
+    Expose internal cache and background worker counters for scraping.
+    """
+
+    permission_classes = [IsSuperuser]
+
+    def get(self, request):
+        """
+        Return counters for the internal caches.
+        ---
+        responses:
+            "200":
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                club_list_cache:
+                                    type: object
+                                    properties:
+                                        groups:
+                                            type: integer
+                                        hits:
+                                            type: integer
+                                        misses:
+                                            type: integer
+                                        evictions:
+                                            type: integer
+                                        flushes:
+                                            type: integer
+                                club_fragment_cache:
+                                    type: object
+                                    properties:
+                                        hits:
+                                            type: integer
+                                        misses:
+                                            type: integer
+                                ticket_holds:
+                                    type: object
+                                    properties:
+                                        sweeps:
+                                            type: integer
+                                        released:
+                                            type: integer
+                                        last_sweep:
+                                            type: object
+                                            properties:
+                                                time:
+                                                    type: string
+                                                released:
+                                                    type: integer
+                                                latency:
+                                                    type: number
+        ---
+        """
+        return Response(
+            {
+                "club_list_cache": club_list_cache.stats(),
+                "club_fragment_cache": club_fragment_cache.stats(),
+                "ticket_holds": Ticket.objects.hold_stats(),
+            }
+        )
+
+
 def get_initial_context_from_types(types):
     """
     Generate a sample context given the specified types.
@@ -9264,11 +9465,8 @@ def email_preview(request):
     """
     Debug endpoint used for previewing how email templates will look.
     """
-    prefix = "fyh_emails" if settings.BRANDING == "fyh" else "emails"
-    email_templates = os.listdir(os.path.join(settings.BASE_DIR, "templates", prefix))
-    email_templates = [
-        e.rsplit(".", 1)[0] for e in email_templates if e.endswith(".html")
-    ]
+    prefix = email_templates.get_prefix()
+    templates = email_templates.names(prefix)
 
     email = None
     text_email = None
@@ -9278,24 +9476,24 @@ def email_preview(request):
     if "email" in request.GET:
         email_path = os.path.basename(request.GET.get("email"))
 
-        # initial values
         try:
-            types = get_mail_type_annotation(email_path)
-            if types is not None:
-                initial_context = get_initial_context_from_types(types)
-        except (FileNotFoundError, OSError):
-            # Template file doesn't exist, continue with empty context
-            types = None
+            template = email_templates.get(email_path, prefix)
+        except TemplateDoesNotExist:
+            template = None
+
+        # initial values
+        if template is not None and template.types is not None:
+            initial_context = get_initial_context_from_types(template.types)
 
         # set specified values
         variables = request.GET.get("variables")
         if variables is not None:
             initial_context.update(json.loads(variables))
 
-        try:
-            email = render_to_string(f"{prefix}/{email_path}.html", initial_context)
+        if template is not None:
+            _, email = template.render(initial_context)
             text_email = html_to_text(email)
-        except TemplateDoesNotExist:
+        else:
             template_error = True
             email = (
                 f'<div style="color: red; padding: 20px; border: 1px solid red; '
@@ -9314,7 +9512,7 @@ def email_preview(request):
         request,
         "preview.html",
         {
-            "templates": email_templates,
+            "templates": templates,
             "email": email,
             "text_email": text_email,
             "variables": json.dumps(initial_context, indent=4),
@@ -251,6 +251,9 @@ SOCIAL_AUTH_ZOOM_OAUTH2_SCOPE = [
 SOCIAL_AUTH_LOGIN_REDIRECT_URL = "/"
 ZOOM_VERIFICATION_TOKEN = os.environ.get("ZOOM_VERIFICATION_TOKEN")
 
+# Seconds that Zoom webhooks are staged for before being written in one batch
+ZOOM_WEBHOOK_BATCH_DELAY = 1
+
 
 # Phone number field
 
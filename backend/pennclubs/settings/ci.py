@@ -18,6 +18,9 @@ del PLATFORM_ACCOUNTS["REDIRECT_URI"]
 # Use a dummy backend for sending emails
 EMAIL_BACKEND = "django.core.mail.backends.dummy.EmailBackend"
 
+# Apply Zoom webhooks as soon as they are received
+ZOOM_WEBHOOK_BATCH_DELAY = 0
+
 # Allow http callback for DLA
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
@@ -0,0 +1,313 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from options.models import Option
+
+from clubs.caching import (
+    club_approved_snapshots,
+    club_fragment_cache,
+    club_list_cache,
+    club_matches_params,
+    site_options_cache,
+)
+from clubs.models import Club, ClubFair, Favorite, Membership, Tag
+
+
+class ClubListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        self.tag1 = Tag.objects.create(name="Arts")
+        self.tag2 = Tag.objects.create(name="Sports")
+
+        self.club1 = Club.objects.create(
+            code="one", name="One", active=True, approved=True, visible_to_public=True
+        )
+        self.club1.tags.add(self.tag1)
+        self.club2 = Club.objects.create(
+            code="two", name="Two", active=True, approved=True, visible_to_public=True
+        )
+        self.club2.tags.add(self.tag2)
+
+    def fetch(self, **params):
+        resp = self.client.get(reverse("clubs-list"), params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return sorted(club["code"] for club in resp.json())
+
+    def test_unrelated_save_keeps_page(self):
+        """
+        Saving a club that cannot appear on a cached page should not evict it.
+        """
+        self.assertEqual(self.fetch(tags=self.tag1.id), ["one"])
+
+        self.club2.name = "Two Renamed"
+        self.club2.save()
+
+        self.fetch(tags=self.tag1.id)
+        stats = club_list_cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["evictions"], 0)
+
+    def test_contained_club_save_evicts_page(self):
+        """
+        Saving a club on a cached page should evict that page.
+        """
+        self.assertEqual(self.fetch(tags=self.tag1.id), ["one"])
+
+        self.club1.active = False
+        self.club1.save()
+
+        self.assertEqual(self.fetch(tags=self.tag1.id), [])
+        self.assertEqual(club_list_cache.stats()["evictions"], 1)
+
+    def test_newly_matching_club_evicts_page(self):
+        """
+        A club that starts matching the filters of a cached page should evict it.
+        """
+        self.assertEqual(self.fetch(tags=self.tag1.id), ["one"])
+        self.assertEqual(self.fetch(search="one"), ["one"])
+
+        self.club2.tags.add(self.tag1)
+
+        self.assertEqual(self.fetch(tags=self.tag1.id), ["one", "two"])
+        self.assertEqual(self.fetch(search="one"), ["one"])
+        stats = club_list_cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 3)
+
+    def test_invalidate_registry_emptied(self):
+        """
+        Invalidation should use the registry it loaded, even if the cache is
+        cleared while it runs.
+        """
+        self.assertEqual(self.fetch(tags=self.tag1.id), ["one"])
+        registry = club_list_cache._get_registry()
+
+        with mock.patch.object(
+            club_list_cache, "_get_registry", side_effect=[registry, {}]
+        ):
+            self.assertEqual(club_list_cache.invalidate_club(self.club1), 1)
+
+    def test_authenticated_not_cached(self):
+        user = get_user_model().objects.create_user("bfranklin", "", "test")
+        self.client.force_login(user)
+        self.fetch()
+        self.assertEqual(club_list_cache.stats()["groups"], 0)
+
+    def test_invalidate_all(self):
+        self.assertEqual(self.fetch(), ["one", "two"])
+        club_list_cache.invalidate_all()
+        Club.objects.filter(code="two").update(active=False)
+        self.assertEqual(self.fetch(), ["one"])
+
+    def test_matches_params(self):
+        facets = club_list_cache.get_facets(self.club1)
+        self.assertTrue(club_matches_params(facets, {}))
+        self.assertTrue(club_matches_params(facets, {"tags": "Arts"}))
+        self.assertFalse(club_matches_params(facets, {"tags": "Arts,Sports"}))
+        self.assertTrue(club_matches_params(facets, {"tags__or": "Arts,Sports"}))
+        self.assertTrue(club_matches_params(facets, {"size__lte": "2"}))
+        self.assertFalse(club_matches_params(facets, {"accepting_members": "true"}))
+        self.assertFalse(club_matches_params(facets, {"in": "two,three"}))
+        self.assertTrue(club_matches_params(facets, {"search": "on"}))
+
+        # filters that cannot be evaluated are assumed to match
+        self.assertTrue(club_matches_params(facets, {"classification_group": "ug"}))
+        self.assertTrue(club_matches_params(facets, {"size": "bad,value"}))
+
+
+class ClubFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        self.user1 = get_user_model().objects.create_user("bfranklin", "", "test")
+        self.user2 = get_user_model().objects.create_user("tjefferson", "", "test")
+
+        self.tag = Tag.objects.create(name="Arts")
+        self.club = Club.objects.create(
+            code="one", name="One", active=True, approved=True, visible_to_public=True
+        )
+        self.club.tags.add(self.tag)
+        Favorite.objects.create(person=self.user1, club=self.club)
+
+    def fetch(self, user):
+        self.client.force_login(user)
+        resp = self.client.get(reverse("clubs-list"))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(len(resp.json()), 1)
+        return resp.json()[0]
+
+    def test_user_fields_not_shared(self):
+        """
+        Fragments are shared between users but user specific fields are not.
+        """
+        self.assertTrue(self.fetch(self.user1)["is_favorite"])
+        self.assertFalse(self.fetch(self.user2)["is_favorite"])
+        self.assertEqual(club_fragment_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_fragment_follows_changes(self):
+        """
+        Changes to a club or its tags should never return a stale fragment.
+        """
+        self.fetch(self.user1)
+
+        self.tag.name = "Music"
+        self.tag.save()
+        self.assertEqual(self.fetch(self.user1)["tags"][0]["name"], "Music")
+
+        Club.objects.filter(pk=self.club.pk).update(favorite_count=5)
+        self.assertEqual(self.fetch(self.user1)["favorite_count"], 5)
+        self.assertEqual(club_fragment_cache.stats()["hits"], 0)
+
+
+class ClubApprovedSnapshotsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        self.user = get_user_model().objects.create_user("bfranklin", "", "test")
+        self.member = get_user_model().objects.create_user("tjefferson", "", "test")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clubs = [
+                Club.objects.create(
+                    code=f"club-{i}",
+                    name=f"Club {i}",
+                    active=True,
+                    approved=True,
+                    visible_to_public=True,
+                )
+                for i in range(20)
+            ]
+        Membership.objects.create(person=self.member, club=self.clubs[0])
+        self.make_pending(self.clubs[:10])
+
+    def make_pending(self, clubs):
+        for club in clubs:
+            club.name = f"Pending {club.code}"
+            club.approved = None
+            club.ghost = True
+            club.save()
+
+    def fetch(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse("clubs-list"))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return {club["code"]: club["name"] for club in resp.json()}, len(queries)
+
+    def test_pending_changes_hidden(self):
+        names, _ = self.fetch(self.user)
+        self.assertEqual(names["club-0"], "Club 0")
+        self.assertEqual(names["club-15"], "Club 15")
+
+        # members can see the pending version of their own club
+        names, _ = self.fetch(self.member)
+        self.assertEqual(names["club-0"], "Pending club-0")
+        self.assertEqual(names["club-1"], "Club 1")
+
+    def test_query_count_independent_of_ghosts(self):
+        _, num_queries = self.fetch(self.user)
+        self.make_pending(self.clubs[10:])
+        names, more_queries = self.fetch(self.user)
+        self.assertEqual(names["club-15"], "Club 15")
+        self.assertEqual(more_queries, num_queries)
+
+    def test_snapshot_saved_on_commit(self):
+        club = self.clubs[15]
+        club.name = "Renamed"
+        club.save()
+        self.assertEqual(
+            club_approved_snapshots.get_many([club])[club.pk].name, "Club 15"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            club.save()
+        self.assertEqual(
+            club_approved_snapshots.get_many([club])[club.pk].name, "Renamed"
+        )
+
+    def test_missing_snapshots_loaded_from_history(self):
+        cache.clear()
+        names, num_queries = self.fetch(self.user)
+        self.assertEqual(names["club-5"], "Club 5")
+        self.assertEqual(
+            set(club_approved_snapshots.get_many(self.clubs[:10])),
+            {club.pk for club in self.clubs[:10]},
+        )
+
+        # the snapshots are stored again after the first lookup
+        _, fewer_queries = self.fetch(self.user)
+        self.assertLess(fewer_queries, num_queries)
+
+
+class SiteOptionsCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        Option.objects.create(key="SITE_BANNER", value="Hello", public=True)
+        Option.objects.create(key="SECRET", value="Hidden", public=False)
+
+    def test_options_cached(self):
+        resp = self.client.get(reverse("options"))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data["SITE_BANNER"], "Hello")
+        self.assertNotIn("SECRET", resp.data)
+
+        # the options are served from the process without touching the database
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse("options"))
+        self.assertEqual(resp.data["SITE_BANNER"], "Hello")
+
+        # unchanged options can be revalidated
+        resp = self.client.get(reverse("options"), HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_options_invalidated(self):
+        _, etag = site_options_cache.get()
+
+        option = Option.objects.get(key="SITE_BANNER")
+        option.value = "Goodbye"
+        option.save()
+
+        options, new_etag = site_options_cache.get()
+        self.assertEqual(options["SITE_BANNER"], "Goodbye")
+        self.assertNotEqual(etag, new_etag)
+
+    def test_fair_flags_derived_from_time(self):
+        now = timezone.now()
+        fair = ClubFair.objects.create(
+            name="SAC Fair",
+            contact="sac@example.com",
+            start_time=now + datetime.timedelta(days=2),
+            end_time=now + datetime.timedelta(days=3),
+            registration_end_time=now + datetime.timedelta(days=1),
+        )
+
+        options, etag = site_options_cache.get(now)
+        self.assertEqual(options["FAIR_ID"], fair.id)
+        self.assertTrue(options["PRE_FAIR"])
+        self.assertFalse(options["FAIR_OPEN"])
+
+        # the flags change over time without the fair being loaded again
+        with self.assertNumQueries(0):
+            options, open_etag = site_options_cache.get(
+                now + datetime.timedelta(days=2, hours=1)
+            )
+            self.assertTrue(options["FAIR_OPEN"])
+            self.assertFalse(options["PRE_FAIR"])
+            self.assertNotEqual(etag, open_etag)
+
+            options, _ = site_options_cache.get(now + datetime.timedelta(days=4))
+            self.assertFalse(options["FAIR_OPEN"])
+            self.assertNotIn("FAIR_ID", options)
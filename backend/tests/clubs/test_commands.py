@@ -8,42 +8,58 @@ import datetime
 import io
 import json
 import os
+import random
+import smtplib
 import tempfile
 import uuid
+from math import floor
 from unittest import mock
 
+import bleach
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core import mail
-from django.core.cache import caches
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import DurationField, ExpressionWrapper, F
 from django.test import Client, TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from ics import Calendar
 from ics import Event as ICSEvent
+from PIL import Image
 
+from clubs.management.commands.generate_image_variants import LOCK_KEY, LOCK_TIMEOUT
 from clubs.management.commands.rank import DEFAULT_WEIGHTS
 from clubs.models import (
     Badge,
     Club,
     ClubApplication,
     ClubFair,
+    ClubFairRegistration,
     Event,
     EventShowing,
     Favorite,
+    ImageSource,
+    ImageVariant,
     Membership,
     MembershipInvite,
+    OutboxBatch,
+    OutboxEmail,
     RankingWeights,
     RegistrationQueueSettings,
     Subscribe,
     Tag,
+    Testimonial,
     get_mail_type_annotation,
+    send_mail_helper,
 )
-from clubs.utils import fuzzy_lookup_club
+from clubs.utils import ClubNameMatcher, fuzzy_lookup_club
 
 
 def mocked_requests_get(time):
@@ -52,11 +68,15 @@ def mocked_requests_get(time):
     starting at the specified start time.
     """
 
-    def fake_request(url, *args):
+    def fake_request(url, *args, **kwargs):
         class MockResponse:
             def __init__(self, content, status_code):
                 self.text = content.serialize()
                 self.status_code = status_code
+                self.headers = {}
+
+            def raise_for_status(self):
+                pass
 
             def text(self):
                 return self.text
@@ -144,7 +164,8 @@ class ImportCalendarTestCase(TestCase):
         a arbitrary file downloaded from the internet.
         """
         with mock.patch(
-            "requests.get", return_value=mock.Mock(text=SAMPLE_ICS, status_code=200)
+            "requests.get",
+            return_value=mock.Mock(text=SAMPLE_ICS, status_code=200, headers={}),
         ):
             call_command("import_calendar_events")
 
@@ -165,7 +186,9 @@ class ImportCalendarTestCase(TestCase):
         with mock.patch("requests.get", side_effect=mocked_requests_get(now)) as m:
             call_command("import_calendar_events")
 
-            m.assert_called_with(self.club1.ics_import_url)
+            m.assert_called_with(
+                self.club1.ics_import_url, headers=mock.ANY, timeout=mock.ANY
+            )
 
         desired = self.club1.events.first()
         showing = EventShowing.objects.filter(event=desired).first()
@@ -189,7 +212,9 @@ class ImportCalendarTestCase(TestCase):
         with mock.patch("requests.get", side_effect=mocked_requests_get(now)) as m:
             call_command("import_calendar_events")
 
-            m.assert_called_with(self.club1.ics_import_url)
+            m.assert_called_with(
+                self.club1.ics_import_url, headers=mock.ANY, timeout=mock.ANY
+            )
 
         # ensure that only one event exists
         self.assertEqual(self.club1.events.count(), 1)
@@ -201,11 +226,72 @@ class ImportCalendarTestCase(TestCase):
         with mock.patch("requests.get", side_effect=mocked_requests_get(now)) as m:
             call_command("import_calendar_events")
 
-            m.assert_called_with(self.club1.ics_import_url)
+            m.assert_called_with(
+                self.club1.ics_import_url, headers=mock.ANY, timeout=mock.ANY
+            )
 
         # ensure that only one event exists
         self.assertEqual(self.club1.events.count(), 1)
 
+    def test_import_calendar_events_unchanged(self):
+        """
+        Test that calendars are requested conditionally and that unchanged
+        calendars are not imported again.
+        """
+        now = timezone.now().replace(microsecond=0)
+        cal = Calendar()
+        event = ICSEvent(uid=str(uuid.uuid4()), name="Weekly GBM", location="Huntsman")
+        event.begin = now
+        event.end = now + datetime.timedelta(hours=1)
+        cal.events.add(event)
+        text = cal.serialize()
+
+        response = mock.Mock(text=text, status_code=200, headers={"ETag": '"v1"'})
+        with mock.patch("requests.get", return_value=response) as m:
+            call_command("import_calendar_events", stdout=io.StringIO())
+            self.assertEqual(m.call_args.kwargs["headers"], {})
+
+        ev = self.club1.events.get()
+        self.assertEqual(ev.type, Event.GBM)
+        self.assertEqual(EventShowing.objects.get(event=ev).location, "Huntsman")
+        self.assertEqual(self.club1.ics_import_state.etag, '"v1"')
+
+        # the server reports that nothing has changed
+        ev.name = "Renamed"
+        ev.save()
+        not_modified = mock.Mock(status_code=304)
+        with mock.patch("requests.get", return_value=not_modified) as m:
+            call_command("import_calendar_events", stdout=io.StringIO())
+            self.assertEqual(m.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        ev.refresh_from_db()
+        self.assertEqual(ev.name, "Renamed")
+
+        # the server ignores the etag, but the contents are the same
+        with mock.patch("requests.get", return_value=response):
+            out = io.StringIO()
+            call_command("import_calendar_events", stdout=out)
+        self.assertIn("Skipped 1 unchanged", out.getvalue())
+        ev.refresh_from_db()
+        self.assertEqual(ev.name, "Renamed")
+
+        # changed calendars update the existing event and showing in place
+        event.location = "JMHH"
+        cal.events.add(
+            ICSEvent(name="Speaker Night", begin=now, end=now + datetime.timedelta(1))
+        )
+        response.text = cal.serialize()
+        response.headers = {"ETag": '"v2"'}
+        with mock.patch("requests.get", return_value=response):
+            call_command("import_calendar_events", stdout=io.StringIO())
+
+        self.assertEqual(self.club1.events.count(), 2)
+        ev.refresh_from_db()
+        self.assertEqual(ev.name, "Weekly GBM")
+        self.assertEqual(EventShowing.objects.get(event=ev).location, "JMHH")
+        speaker = self.club1.events.exclude(pk=ev.pk).get()
+        self.assertEqual(speaker.type, Event.SPEAKER)
+        self.assertEqual(EventShowing.objects.filter(event=speaker).count(), 1)
+
 
 class SendInvitesTestCase(TestCase):
     def setUp(self):
@@ -471,6 +557,94 @@ class SendInvitesTestCase(TestCase):
         Club.objects.create(code="dental-6", name="Penn-In Face")
         self.assertEqual(fuzzy_lookup_club("Penn In-Face").code, "dental-6")
 
+    def test_club_name_matcher(self):
+        """
+        The in memory club name matcher should give the same result as
+        fuzzy_lookup_club over a corpus of names.
+        """
+        rng = random.Random(7)
+        clubs = [
+            ("italian-1", "Italians at Penn", ""),
+            ("italian-2", "Penn Italian Community", ""),
+            ("italian-3", "Penn Italian Club", ""),
+            ("league", "University of Pennsylvania League of Legends Club", ""),
+            ("counterparts", "Counterparts A Cappella", ""),
+            ("pasa", "Penn African Student Association", ""),
+            ("dental-1", "Indian Students Dental Association", ""),
+            ("dental-2", "Arab Student Society", ""),
+            ("dental-3", "Chinese Students Association", ""),
+            ("paagsa", "PAAGSA", "Penn Asian American Graduate Student Association"),
+            ("in-hand", "Penn In Hand", ""),
+            ("in-face", "Penn-In Face", ""),
+            ("chess-1", "Chess Club", "Play chess"),
+            ("chess-2", "chess club", ""),
+            ("dance", "Dance and Music Society", "Dancing"),
+            ("dance-2", "Dance & Music Collective", ""),
+            ("robotics", "Penn Robotics (PR)", "Build robots at Penn"),
+            ("wharton", "Wharton Undergraduate Finance Club", "WUFC"),
+            ("hillel", "Penn Hillel", "Jewish life on campus"),
+            ("quiz", "Quiz Bowl", "Trivia and Quiz Bowl competitions"),
+        ]
+        for code, name, subtitle in clubs:
+            Club.objects.create(code=code, name=name, subtitle=subtitle)
+
+        names = [
+            "",
+            "   ",
+            "Penn",
+            "The Club",
+            "club thirteen",
+            "italian",
+            "league of legends",
+            "Penn Counterparts",
+            "PASA - Penn African Students Association",
+            "Korean Students Dental Association",
+            "Arab Student Dental Society",
+            "Chinese Christian Fellowship",
+            "Penn-In-Hand",
+            "Penn In-Face",
+            "CHESS CLUB",
+            "Dance & Music Society",
+            "Dance and Music Collective",
+            "Robotics",
+            "Penn Robotics",
+            "WUFC",
+            "University of Pennsylvania Hillel",
+            "Trivia and Quiz Bowl competitions",
+            "Jewish life",
+            "Quiz Bowl (QB)",
+        ]
+        for _, name, subtitle in Club.objects.values_list("code", "name", "subtitle"):
+            names.extend([name, name.lower(), name.upper(), subtitle])
+            for _ in range(5):
+                chars = list(name)
+                position = rng.randrange(len(chars))
+                operation = rng.choice(["delete", "replace", "insert", "dash"])
+                if operation == "delete":
+                    del chars[position]
+                elif operation == "replace":
+                    chars[position] = rng.choice("aeiou")
+                elif operation == "insert":
+                    chars.insert(position, rng.choice("xyz"))
+                else:
+                    chars = list(name.replace(" ", "-"))
+                names.append("".join(chars))
+            names.append(f"XYZ - {name}")
+            names.append(" ".join(rng.sample(name.split(), len(name.split()))))
+
+        with self.assertNumQueries(1):
+            matcher = ClubNameMatcher()
+        with self.assertNumQueries(0):
+            results = matcher.lookup_many(names)
+
+        for name in names:
+            expected = fuzzy_lookup_club(name)
+            self.assertEqual(
+                results[name] and results[name].code,
+                expected and expected.code,
+                f"mismatch for {name!r}",
+            )
+
 
 class SendReminderTestCase(TestCase):
     def setUp(self):
@@ -518,16 +692,161 @@ class PopulateTestCase(TestCase):
 
 class RankTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
 
-    def _run_rank(self):
+    def _run_rank(self, *args):
         from unittest.mock import patch
 
         with patch(
             "clubs.management.commands.rank.np.random.standard_exponential",
             return_value=0,
         ):
-            call_command("rank", verbosity=0)
+            call_command("rank", *args, verbosity=0, stdout=io.StringIO())
+
+    def create_random_clubs(self):
+        """
+        Create a randomly generated set of clubs that exercises every ranking rule.
+        """
+        rng = random.Random(42)
+        now = timezone.now()
+        users = [
+            get_user_model().objects.create_user(f"user{i}", f"user{i}@example.com")
+            for i in range(12)
+        ]
+        tags = [Tag.objects.create(name=f"Tag {i}") for i in range(10)]
+        fairs = [
+            ClubFair.objects.create(
+                name=f"Fair {i}",
+                organization="SAC",
+                contact="sac@example.com",
+                start_time=now + datetime.timedelta(days=offset),
+                end_time=now + datetime.timedelta(days=offset + 1),
+                registration_end_time=now + datetime.timedelta(days=offset),
+            )
+            for i, offset in enumerate([-10, 5])
+        ]
+        descriptions = [
+            "",
+            "Short.",
+            "<p>A medium description that goes on for a little while.</p>",
+            "<p>Sentence &amp; more.</p>" * 20,
+            '<img src="logo.png" />' + "A long description. " * 80,
+            '<iframe src="https://youtube.com/"></iframe>',
+        ]
+
+        clubs = Club.objects.bulk_create(
+            [
+                Club(
+                    code=f"club-{i}",
+                    name=f"Club {i}",
+                    active=rng.random() < 0.8,
+                    subtitle=rng.choice(["", "Hi", "Your Subtitle Here", "A club"]),
+                    description=rng.choice(descriptions),
+                    email=rng.choice([None, "", "club@example.com"]),
+                    email_public=rng.random() < 0.5,
+                    how_to_get_involved=rng.choice(["", " ok ", "Come to our GBM!"]),
+                    facebook=rng.choice([None, "", "https://facebook.com/club"]),
+                    website=rng.choice([None, "https://example.com"]),
+                    instagram=rng.choice([None, "https://instagram.com/club"]),
+                )
+                for i in range(150)
+            ]
+        )
+
+        for club in clubs:
+            if rng.random() < 0.3:
+                Club.objects.filter(pk=club.pk).update(
+                    updated_at=now - datetime.timedelta(days=rng.randint(200, 300))
+                )
+            club.tags.add(*rng.sample(tags, rng.randint(0, 9)))
+            for user in rng.sample(users, rng.randint(0, 8)):
+                Favorite.objects.create(person=user, club=club)
+            for user in rng.sample(users, rng.randint(0, 8)):
+                Membership.objects.create(
+                    person=user,
+                    club=club,
+                    active=rng.random() < 0.8,
+                    role=rng.choice(
+                        [
+                            Membership.ROLE_OWNER,
+                            Membership.ROLE_OFFICER,
+                            Membership.ROLE_MEMBER,
+                        ]
+                    ),
+                )
+            for i in range(rng.randint(0, 4)):
+                Testimonial.objects.create(club=club, text=f"Testimonial {i}")
+            if rng.random() < 0.3:
+                ClubFairRegistration.objects.create(club=club, fair=rng.choice(fairs))
+            if rng.random() < 0.3:
+                start = now + datetime.timedelta(days=rng.choice([-30, -1, 3]))
+                ClubApplication.objects.create(
+                    club=club,
+                    application_start_time=start,
+                    application_end_time=start + datetime.timedelta(days=7),
+                    result_release_time=start + datetime.timedelta(days=14),
+                )
+            for i in range(rng.randint(0, 3)):
+                event = Event.objects.create(
+                    code=f"{club.code}-event-{i}",
+                    name=f"Event {i}",
+                    club=club,
+                    description=rng.choice(
+                        ["", "Hey", "Replace this description!", "A real event"]
+                    ),
+                )
+                start = now + datetime.timedelta(hours=rng.choice([-2, 5, 60, 400]))
+                EventShowing.objects.create(
+                    event=event,
+                    start_time=start,
+                    end_time=start + datetime.timedelta(hours=rng.choice([1, 20])),
+                )
+
+    def test_rank_matches_per_club_algorithm(self):
+        self.create_random_clubs()
+        expected = legacy_rank(RankingWeights.get(), timezone.now())
+
+        with CaptureQueriesContext(connection) as queries:
+            self._run_rank()
+
+        self.assertEqual(dict(Club.objects.values_list("id", "rank")), expected)
+        self.assertLess(len(queries), 20)
+        self.assertGreater(len(set(expected.values())), 10)
+
+    def test_rank_incremental(self):
+        self.create_random_clubs()
+        self._run_rank()
+        ranks = dict(Club.objects.values_list("id", "rank"))
+
+        # unchanged clubs are not rescored
+        club = Club.objects.order_by("id").first()
+        Club.objects.update(rank=0)
+        Club.objects.filter(pk=club.pk).update(rank=ranks[club.id])
+        out = io.StringIO()
+        call_command("rank", "--incremental", stdout=out)
+        self.assertIn("Computed rankings for 0 clubs!", out.getvalue())
+
+        # clubs with changed inputs are rescored
+        club.description = "A brand new description. " * 50
+        club.save()
+        Testimonial.objects.create(club=Club.objects.get(code="club-1"), text="Great")
+        self._run_rank("--incremental")
+        expected = legacy_rank(RankingWeights.get(), timezone.now())
+        for changed in [club.id, Club.objects.get(code="club-1").id]:
+            self.assertEqual(Club.objects.get(pk=changed).rank, expected[changed])
+        self.assertEqual(
+            Club.objects.filter(rank=0).count(),
+            len(expected) - 2 - sum(1 for rank in expected.values() if rank == 0),
+        )
+
+        # changing the weights rescores every club
+        weights = RankingWeights.get()
+        weights.logo_bonus = 30
+        weights.save()
+        self._run_rank("--incremental")
+        expected = legacy_rank(weights, timezone.now())
+        self.assertEqual(dict(Club.objects.values_list("id", "rank")), expected)
 
     def test_custom_inactive_weight(self):
         # create inactive club
@@ -675,6 +994,137 @@ class RankTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+def legacy_rank(weights, now):
+    """
+    The per club ranking algorithm that the rank command used before it was
+    vectorized, without the random term. Used as a reference for the new engine.
+    """
+    ranks = {}
+    clubs = Club.objects.prefetch_related(
+        "favorite_set",
+        "tags",
+        "membership_set",
+        "clubapplication_set",
+        "events",
+        "events__eventshowing_set",
+        "testimonials",
+    ).all()
+
+    for club in clubs:
+        ranking = 0
+        if not club.active:
+            ranking += weights.inactive_penalty
+        ranking += club.favorite_set.count() * weights.favorites_per
+        tags = club.tags.count()
+        if 3 <= tags <= 7:
+            ranking += weights.tags_good
+        elif tags > 7:
+            ranking += weights.tags_many
+        officers = club.membership_set.filter(
+            active=True, role__lte=Membership.ROLE_OFFICER
+        ).count()
+        if officers >= 3:
+            ranking += weights.officer_bonus
+        members = club.membership_set.filter(
+            active=True, role__gte=Membership.ROLE_MEMBER
+        ).count()
+        if members >= 3:
+            ranking += weights.member_base
+        ranking += members * weights.member_per
+        if club.image is not None:
+            ranking += weights.logo_bonus
+        subtitle = club.subtitle.strip()
+        if subtitle.lower() == "your subtitle here":
+            ranking += weights.subtitle_bad
+        elif len(subtitle) > 3:
+            ranking += weights.subtitle_good
+        if "<img" in club.description or "<iframe" in club.description:
+            ranking += weights.images_bonus
+        cleaned_description = bleach.clean(
+            club.description, tags=[], attributes={}, styles=[], strip=True
+        ).strip()
+        if len(cleaned_description) > 25:
+            ranking += weights.desc_short
+        if len(cleaned_description) > 250:
+            ranking += weights.desc_med
+        if len(cleaned_description) > 1000:
+            ranking += weights.desc_long
+        if ClubFair.objects.filter(
+            end_time__gte=now, participating_clubs=club
+        ).exists():
+            ranking += weights.fair_bonus
+        if club.clubapplication_set.filter(
+            application_start_time__lte=now, application_end_time__gte=now
+        ).exists():
+            ranking += weights.application_bonus
+
+        for window, base, good, min_length in [
+            (
+                datetime.timedelta(days=1),
+                weights.today_event_base,
+                weights.today_event_good,
+                3,
+            ),
+            (
+                datetime.timedelta(weeks=1),
+                weights.week_event_base,
+                weights.week_event_good,
+                4,
+            ),
+        ]:
+            showings = EventShowing.objects.filter(
+                event__club=club, end_time__gte=now, start_time__lte=now + window
+            )
+            events = club.events.filter(
+                pk__in=showings.values_list("event_id", flat=True)
+            )
+            if events.exists():
+                short_showings = (
+                    showings.annotate(
+                        duration=ExpressionWrapper(
+                            F("end_time") - F("start_time"),
+                            output_field=DurationField(),
+                        )
+                    )
+                    .filter(duration__lt=datetime.timedelta(hours=16))
+                    .exists()
+                )
+                if short_showings:
+                    ranking += base
+                    if all(
+                        len(e.description) >= min_length
+                        and e.description not in {"Replace this description!"}
+                        and e.image is not None
+                        for e in events
+                    ):
+                        ranking += good
+
+        if club.email and club.email_public:
+            ranking += weights.email_bonus
+        social_fields = [
+            club.facebook,
+            club.website,
+            club.twitter,
+            club.instagram,
+            club.linkedin,
+            club.github,
+            club.youtube,
+        ]
+        if len([field for field in social_fields if field]) >= 2:
+            ranking += weights.social_bonus
+        if len(club.how_to_get_involved.strip()) <= 3:
+            ranking += weights.howto_penalty
+        if club.updated_at < now - datetime.timedelta(days=30 * 8):
+            ranking += weights.outdated_penalty
+        num_testimonials = club.testimonials.count()
+        if num_testimonials >= 1:
+            ranking += weights.testimonial_one
+        if num_testimonials >= 3:
+            ranking += weights.testimonial_three
+        ranks[club.id] = floor(ranking)
+    return ranks
+
+
 class RenewalTestCase(TestCase):
     def test_renewal(self):
         # populate database with test data
@@ -1093,3 +1543,245 @@ class NotifyPublicVisibilityTestCase(TestCase):
         self.assertGreaterEqual(html.count("public-visibility"), 2)
         self.assertIn("?visible=true", html)
         self.assertIn("?visible=false", html)
+
+
+class SendOutboxTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "bfranklin", "bfranklin@seas.upenn.edu", "test"
+        )
+        self.other = get_user_model().objects.create_user(
+            "tjefferson", "tjefferson@seas.upenn.edu", "test"
+        )
+
+    def queue_blast(self, count):
+        with OutboxBatch.collect("test", creator=self.user) as batch:
+            for i in range(count):
+                send_mail_helper(
+                    name="blast",
+                    subject=f"Blast {i}",
+                    emails=[f"user{i}@example.com"],
+                    context={"sender": "Test", "content": "test", "reply_emails": []},
+                )
+        return batch
+
+    def test_send_outbox(self):
+        batch = self.queue_blast(3)
+
+        # emails are queued instead of being sent immediately
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            batch.progress(), {"total": 3, "pending": 3, "sent": 0, "failed": 0}
+        )
+
+        # emails outside of the batch are sent immediately
+        send_mail_helper(
+            name="blast",
+            subject="Direct",
+            emails=["direct@example.com"],
+            context={"sender": "Test", "content": "test", "reply_emails": []},
+        )
+        self.assertEqual(len(mail.outbox), 1)
+
+        out = io.StringIO()
+        call_command("send_outbox", stdout=out)
+        self.assertIn("Sent 3 email(s)", out.getvalue())
+        self.assertEqual(
+            sorted(m.subject for m in mail.outbox[1:]),
+            ["Blast 0", "Blast 1", "Blast 2"],
+        )
+        self.assertEqual(mail.outbox[1].to, ["user0@example.com"])
+        self.assertEqual(
+            batch.progress(), {"total": 3, "pending": 0, "sent": 3, "failed": 0}
+        )
+
+        # sent emails are not sent again
+        call_command("send_outbox", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_failed_batch_not_queued(self):
+        """
+        Emails from a block that raises are discarded, and later emails are sent
+        immediately again.
+        """
+        with self.assertRaises(ValueError):
+            with OutboxBatch.collect("test", creator=self.user) as batch:
+                send_mail_helper(
+                    name="blast",
+                    subject="Blast",
+                    emails=["user@example.com"],
+                    context={"sender": "Test", "content": "test", "reply_emails": []},
+                )
+                raise ValueError
+        self.assertEqual(batch.progress()["total"], 0)
+
+        send_mail_helper(
+            name="blast",
+            subject="Direct",
+            emails=["direct@example.com"],
+            context={"sender": "Test", "content": "test", "reply_emails": []},
+        )
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_send_outbox_retry(self):
+        batch = self.queue_blast(1)
+        email = batch.emails.get()
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=smtplib.SMTPServerDisconnected("Connection lost"),
+        ):
+            sent, failed = OutboxEmail.objects.send_pending()
+            self.assertEqual((sent, failed), (0, 1))
+
+            # failed emails are retried later with exponential backoff
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn("Connection lost", email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            self.assertEqual(OutboxEmail.objects.send_pending(), (0, 0))
+
+            for _ in range(OutboxEmail.objects.MAX_ATTEMPTS - 1):
+                OutboxEmail.objects.filter(pk=email.pk).update(
+                    next_attempt_at=timezone.now()
+                )
+                OutboxEmail.objects.send_pending()
+
+        # emails are given up on after running out of attempts
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+        self.assertEqual(email.attempts, OutboxEmail.objects.MAX_ATTEMPTS)
+        self.assertEqual(
+            batch.progress(), {"total": 1, "pending": 0, "sent": 0, "failed": 1}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_outbox_progress_view(self):
+        batch = self.queue_blast(2)
+        url = reverse("email-outbox", args=(batch.id,))
+
+        client = Client()
+        resp = client.get(url)
+        self.assertIn(resp.status_code, [401, 403], resp.content)
+
+        # only the creator of the batch can see its progress
+        client.login(username=self.other.username, password="test")
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, 404, resp.content)
+
+        client.login(username=self.user.username, password="test")
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()["pending"], 2)
+
+        call_command("send_outbox", stdout=io.StringIO())
+        resp = client.get(url)
+        self.assertEqual(
+            resp.json(), {"total": 2, "pending": 0, "sent": 2, "failed": 0}
+        )
+
+
+class GenerateImageVariantsTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media = self.settings(MEDIA_ROOT=self.media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.club = Club.objects.create(
+            code="one",
+            name="Club One",
+            active=True,
+            approved=True,
+            visible_to_public=True,
+        )
+        self.event = Event.objects.create(code="event", name="Event", club=self.club)
+
+    def get_image(self, color, size=(1000, 500), mode="RGB", fmt="JPEG"):
+        with io.BytesIO() as output:
+            Image.new(mode, size, color).save(output, format=fmt)
+            return ContentFile(output.getvalue())
+
+    def test_generate_image_variants(self):
+        """
+        Test that uploaded images are resized once per unique image and that the
+        smallest appropriate variant is served.
+        """
+        self.club.image.save("logo.jpg", self.get_image("red"))
+        self.event.image.save("banner.jpg", self.get_image("red"))
+
+        call_command("generate_image_variants", stdout=io.StringIO())
+
+        self.club.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertIsNotNone(self.club.image_source)
+        self.assertEqual(self.club.image_source, self.event.image_source)
+        self.assertEqual(ImageSource.objects.count(), 1)
+
+        source = self.club.image_source
+        self.assertEqual((source.width, source.height), (1000, 500))
+        self.assertEqual(
+            sorted(source.variants.values_list("width", "format")),
+            [
+                (160, "jpeg"),
+                (160, "webp"),
+                (320, "jpeg"),
+                (320, "webp"),
+                (640, "jpeg"),
+                (640, "webp"),
+                (1000, "jpeg"),
+                (1000, "webp"),
+            ],
+        )
+        self.assertEqual(source.get_variant(300).width, 320)
+        self.assertEqual(source.get_variant(300).format, "webp")
+        self.assertEqual(source.get_variant(2000).width, 1000)
+
+        # the club list serves the webp variant instead of the original
+        resp = self.client.get(reverse("clubs-detail", args=(self.club.code,)))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertIn(source.get_variant(320).file.url, resp.data["image_url"])
+        self.assertNotIn(self.club.image.url, resp.data["image_url"])
+
+        # transparent images fall back to png, small images are not upscaled
+        self.club.image.save(
+            "logo.png", self.get_image((0, 0, 0, 0), (200, 100), "RGBA", "PNG")
+        )
+        self.club.refresh_from_db()
+        self.assertIsNone(self.club.image_source)
+
+        call_command("generate_image_variants", stdout=io.StringIO())
+
+        self.club.refresh_from_db()
+        self.assertEqual(
+            sorted(self.club.image_source.variants.values_list("width", "format")),
+            [(160, "png"), (160, "webp"), (200, "png"), (200, "webp")],
+        )
+        self.assertEqual(ImageVariant.objects.count(), 12)
+
+        # nothing left to process
+        out = io.StringIO()
+        call_command("generate_image_variants", stdout=out)
+        self.assertIn("no images", out.getvalue())
+
+    def test_generate_image_variants_locked(self):
+        """
+        Images are not processed while another process is generating variants.
+        """
+        self.club.image.save("logo.jpg", self.get_image("red"))
+
+        cache.set(LOCK_KEY, "other", LOCK_TIMEOUT)
+        out = io.StringIO()
+        call_command("generate_image_variants", stdout=out)
+        self.assertIn("another process", out.getvalue())
+        self.club.refresh_from_db()
+        self.assertIsNone(self.club.image_source)
+        self.assertEqual(cache.get(LOCK_KEY), "other")
+
+        cache.delete(LOCK_KEY)
+        call_command("generate_image_variants", stdout=io.StringIO())
+        self.club.refresh_from_db()
+        self.assertIsNotNone(self.club.image_source)
+        self.assertIsNone(cache.get(LOCK_KEY))
@@ -8,13 +8,16 @@ from unittest import mock
 
 import pytz
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.test import TestCase
 from django.utils import timezone
 
+from clubs.emails import email_templates
 from clubs.models import (
     Advisor,
     Badge,
     Club,
+    ClubAncestry,
     Event,
     EventShowing,
     Favorite,
@@ -26,6 +29,7 @@ from clubs.models import (
     Year,
     send_mail_helper,
 )
+from clubs.permissions import find_membership_helper
 from clubs.serializers import UserSerializer
 
 
@@ -68,6 +72,79 @@ class ClubTestCase(TestCase):
         self.assertEqual(self.club2.parent_orgs.first(), self.club1)
         self.assertEqual(self.club1.children_orgs.first(), self.club2)
 
+    def test_club_ancestry(self):
+        """
+        Test that the ancestry table follows changes to parent organizations and is
+        used to find memberships in parent organizations.
+        """
+        club3 = Club.objects.create(code="c", name="c")
+        club3.parent_orgs.add(self.club2)
+
+        def ancestry():
+            return set(
+                ClubAncestry.objects.values_list(
+                    "ancestor__code", "descendant__code", "depth"
+                )
+            )
+
+        self.assertEqual(ancestry(), {("a", "b", 1), ("b", "c", 1), ("a", "c", 2)})
+
+        user = get_user_model().objects.create_user("user", "user@example.com", "test")
+        Membership.objects.create(
+            person=user, club=self.club1, role=Membership.ROLE_OFFICER
+        )
+        Membership.objects.create(person=user, club=club3, role=Membership.ROLE_MEMBER)
+        with self.assertNumQueries(1):
+            membership = find_membership_helper(user, club3)
+        self.assertEqual(membership.club, self.club1)
+
+        # a shortcut shortens the path, cycles are allowed
+        club3.parent_orgs.add(self.club1)
+        self.club1.parent_orgs.add(club3)
+        self.assertIn(("a", "c", 1), ancestry())
+        self.assertIn(("c", "a", 1), ancestry())
+        self.assertNotIn("a", {anc for anc, desc, _ in ancestry() if desc == "a"})
+
+        # removing links removes indirect ancestors as well
+        self.club1.parent_orgs.clear()
+        club3.parent_orgs.remove(self.club1)
+        self.club2.delete()
+        self.assertEqual(ancestry(), set())
+        self.assertEqual(find_membership_helper(user, club3).club, club3)
+
+    def test_club_ancestry_delete(self):
+        """
+        Test that deleting a club only rebuilds the ancestry of its descendants,
+        and only if it had ancestors to pass on.
+        """
+        club3 = Club.objects.create(code="c", name="c")
+        club3.parent_orgs.add(self.club2)
+        club4 = Club.objects.create(code="d", name="d")
+        club4.parent_orgs.add(club3)
+        leaves = [Club.objects.create(code=f"leaf-{i}", name="leaf") for i in range(5)]
+        for leaf in leaves:
+            leaf.parent_orgs.add(club4)
+
+        def ancestry():
+            return set(
+                ClubAncestry.objects.values_list(
+                    "ancestor__code", "descendant__code", "depth"
+                )
+            )
+
+        # deleting leaves does not rebuild anything
+        with mock.patch.object(ClubAncestry, "rebuild") as rebuild:
+            Club.objects.filter(pk__in=[leaf.pk for leaf in leaves]).delete()
+        rebuild.assert_not_called()
+
+        self.club2.delete()
+        self.assertEqual(ancestry(), {("c", "d", 1)})
+
+        # rebuilding again does not write duplicate rows
+        ClubAncestry.rebuild()
+        ClubAncestry.rebuild([club4.pk])
+        self.assertEqual(ancestry(), {("c", "d", 1)})
+
     def test_get_officer_emails(self):
         # Create test users with various email formats
         user1 = get_user_model().objects.create_user(
@@ -343,6 +420,30 @@ class UtilsTestCase(TestCase):
 
             self.assertEqual(mocked_send.call_count, 3)
 
+    def test_email_template_registry(self):
+        context = {
+            "prefix": "Penn Clubs",
+            "fair": {"name": "Fall Fair"},
+            "name": "Test Club",
+        }
+        template = email_templates.get("fair_reminder")
+        self.assertIs(email_templates.get("fair_reminder"), template)
+        self.assertIn("fair", template.types)
+
+        subject, html = template.render(context)
+        self.assertEqual(subject, "[Penn Clubs] Fall Fair Setup")
+        self.assertNotIn("SUBJECT", html)
+        self.assertNotIn("TYPES", html)
+
+        # templates are not reparsed when sending
+        with mock.patch.object(email_templates, "compile", side_effect=AssertionError):
+            for _ in range(2):
+                send_mail_helper("fair_reminder", None, ["test@example.com"], context)
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, subject)
+        self.assertNotIn("TYPES", mail.outbox[0].body)
+
 
 class OwnershipRequestTestCase(TestCase):
     """Test cases for OwnershipRequest model methods"""
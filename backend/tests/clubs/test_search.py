@@ -0,0 +1,153 @@
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from clubs.models import Club, Tag
+from clubs.search import (
+    ClubSearchIndex,
+    club_search_index,
+    get_document_tokens,
+    tokenize,
+    tokens_match_query,
+)
+
+
+class ClubSearchIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        club_search_index.request_rebuild()
+        self.client = Client()
+
+        self.tag = Tag.objects.create(name="Performing Arts")
+        self.club1 = Club.objects.create(
+            code="penn-chess",
+            name="Penn Chess Club",
+            subtitle="Competitive chess",
+            active=True,
+            approved=True,
+            visible_to_public=True,
+        )
+        self.club2 = Club.objects.create(
+            code="theatre",
+            name="Theatre Group",
+            description="<p>We sometimes play chess after rehearsal.</p>",
+            active=True,
+            approved=True,
+            visible_to_public=True,
+        )
+        self.club2.tags.add(self.tag)
+
+    def search(self, query, **params):
+        resp = self.client.get(reverse("clubs-list"), {"search": query, **params})
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return [club["code"] for club in resp.json()]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("<b>Hello</b>, World!"), ["hello", "world"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_search_ranking(self):
+        """
+        Matches in the club name should rank above matches in the description.
+        """
+        self.assertEqual(
+            club_search_index.search("chess"), [self.club1.id, self.club2.id]
+        )
+        self.assertEqual(
+            club_search_index.search("ches"), [self.club1.id, self.club2.id]
+        )
+        self.assertEqual(club_search_index.search("chess rehearsal"), [self.club2.id])
+        self.assertEqual(club_search_index.search("performing"), [self.club2.id])
+        self.assertEqual(club_search_index.search("nonexistent"), [])
+
+    def test_search_endpoint(self):
+        # best matches first, unless another ordering is requested
+        self.assertEqual(self.search("chess"), ["penn-chess", "theatre"])
+        self.assertEqual(
+            self.search("chess", ordering="-name"), ["theatre", "penn-chess"]
+        )
+        self.assertEqual(self.search("theat"), ["theatre"])
+        self.assertEqual(len(self.search("!!")), 2)
+
+        # only the best matches are returned
+        cache.clear()
+        with mock.patch("clubs.views.SEARCH_RESULT_LIMIT", 1):
+            self.assertEqual(self.search("chess"), ["penn-chess"])
+
+    def test_incremental_updates(self):
+        """
+        Saves, deletes and tag changes should be reflected in search results.
+        """
+        self.assertEqual(club_search_index.search("checkers"), [])
+
+        self.club1.subtitle = "Chess and checkers"
+        self.club1.save()
+        self.assertEqual(club_search_index.search("checkers"), [self.club1.id])
+
+        self.tag.name = "Drama"
+        self.tag.save()
+        self.assertEqual(club_search_index.search("drama"), [self.club2.id])
+
+        self.club1.tags.add(self.tag)
+        self.assertEqual(
+            sorted(club_search_index.search("drama")), [self.club1.id, self.club2.id]
+        )
+
+        self.club2.delete()
+        self.assertEqual(club_search_index.search("drama"), [self.club1.id])
+
+    def test_changes_replayed_across_processes(self):
+        """
+        An index in another process should pick up changes without a rebuild.
+        """
+        other = ClubSearchIndex()
+        self.assertEqual(other.search("checkers"), [])
+
+        self.club2.name = "Checkers Group"
+        self.club2.save()
+
+        generation = other._generation
+        self.assertEqual(other.search("checkers"), [self.club2.id])
+        self.assertEqual(other._generation, generation)
+
+    def test_rebuild_command(self):
+        Club.objects.filter(pk=self.club1.pk).update(name="Go Club")
+        call_command("rebuild_search_index")
+        self.assertEqual(club_search_index.search("go"), [self.club1.id])
+
+    def test_search_large_index(self):
+        """
+        Prefix searches over a large index should match a scan over every document
+        and should not touch the database once the index is built.
+        """
+        rng = random.Random(0)
+        alphabet = "abcdefghijklmnopqrstuvwxyz"
+        words = [
+            "".join(rng.choices(alphabet, k=rng.randint(4, 10))) for _ in range(2000)
+        ]
+        documents = {
+            i: {
+                "name": " ".join(rng.sample(words, 3)),
+                "subtitle": " ".join(rng.sample(words, 8)),
+                "description": " ".join(rng.sample(words, 50)),
+            }
+            for i in range(500)
+        }
+
+        index = ClubSearchIndex()
+        index.rebuild()
+        index.index(documents)
+
+        tokens = {i: get_document_tokens(doc) for i, doc in documents.items()}
+        for _ in range(50):
+            query = " ".join(word[:3] for word in rng.sample(words, rng.randint(1, 2)))
+            expected = {i for i, t in tokens.items() if tokens_match_query(t, query)}
+            with self.assertNumQueries(0):
+                results = index.search(query)
+            self.assertEqual(set(results), expected, query)
+            self.assertEqual(len(results), len(expected))
+            self.assertEqual(index.search(query, limit=5), results[:5])
@@ -1,14 +1,19 @@
 from dataclasses import dataclass
 from datetime import timedelta
+from io import StringIO
 from uuid import uuid4
 
 import freezegun
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.db.models import Count
 from django.db.models.deletion import ProtectedError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -532,7 +537,9 @@ class TicketEventTestCase(TestCase):
         )
 
         self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertIn("outbox", resp.data)
 
+        call_command("send_outbox", stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
 
@@ -751,6 +758,121 @@ class TicketEventTestCase(TestCase):
             "Not enough tickets of type normal left!", resp.data["detail"], resp.data
         )
 
+    def test_add_to_cart_holds_tickets(self):
+        """
+        Tickets added to a cart are held, so that other buyers get different ones,
+        and the hold is released when they are removed from the cart.
+        """
+        url = reverse(
+            "club-events-showings-add-to-cart",
+            args=(self.club1.code, self.event1.pk, self.event_showing1.pk),
+        )
+        tickets_to_add = {"quantities": [{"type": "normal", "count": 2}]}
+        for user in [self.user1, self.user2]:
+            self.client.login(username=user.username, password="test")
+            resp = self.client.post(url, tickets_to_add, format="json")
+            self.assertEqual(resp.status_code, 200, resp.content)
+            self.assertEqual(Ticket.objects.filter(holder=user).count(), 2)
+
+        cart1 = set(Cart.objects.get(owner=self.user1).tickets.all())
+        cart2 = set(Cart.objects.get(owner=self.user2).tickets.all())
+        self.assertFalse(cart1 & cart2)
+
+        resp = self.client.post(
+            reverse(
+                "club-events-showings-remove-from-cart",
+                args=(self.club1.code, self.event1.pk, self.event_showing1.pk),
+            ),
+            {"quantities": [{"type": "normal", "count": 1}]},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(Ticket.objects.filter(holder=self.user2).count(), 1)
+
+    def test_add_to_cart_all_or_nothing(self):
+        self.client.login(username=self.user1.username, password="test")
+        resp = self.client.post(
+            reverse(
+                "club-events-showings-add-to-cart",
+                args=(self.club1.code, self.event1.pk, self.event_showing1.pk),
+            ),
+            {
+                "quantities": [
+                    {"type": "normal", "count": 2},
+                    {"type": "nonexistent", "count": 1},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 403, resp.content)
+        self.assertFalse(Ticket.objects.filter(holder__isnull=False).exists())
+        self.assertFalse(Cart.objects.filter(owner=self.user1, tickets__isnull=False))
+
+    def test_add_to_cart_ignores_expired_holds(self):
+        """
+        Expired holds do not block other buyers, even before they are released.
+        """
+        url = reverse(
+            "club-events-showings-add-to-cart",
+            args=(self.club1.code, self.event1.pk, self.event_showing1.pk),
+        )
+        tickets = Ticket.objects.filter(showing=self.event_showing1, type="normal")
+        tickets.update(
+            holder=self.user2, holding_expiration=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.client.login(username=self.user1.username, password="test")
+        quantities = {"quantities": [{"type": "normal", "count": 2}]}
+        resp = self.client.post(url, quantities, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(Ticket.objects.filter(holder=self.user1).count(), 2)
+        self.assertEqual(tickets.filter(holder=self.user2).count(), 18)
+
+        # holds that have not expired still block other buyers
+        tickets.filter(holder=self.user2).update(
+            holding_expiration=timezone.now() + timedelta(minutes=5)
+        )
+        resp = self.client.post(url, quantities, format="json")
+        self.assertEqual(resp.status_code, 403, resp.content)
+
+    def test_add_to_cart_many_buyers(self):
+        """
+        When more buyers want tickets than there are, every ticket is held exactly
+        once and the remaining buyers are turned away.
+        """
+        url = reverse(
+            "club-events-showings-add-to-cart",
+            args=(self.club1.code, self.event1.pk, self.event_showing1.pk),
+        )
+        buyers = [
+            get_user_model().objects.create_user(f"buyer{i}", f"buyer{i}@example.com")
+            for i in range(12)
+        ]
+
+        statuses = {}
+        for buyer in buyers:
+            self.client.force_authenticate(buyer)
+            resp = self.client.post(
+                url, {"quantities": [{"type": "normal", "count": 2}]}, format="json"
+            )
+            statuses[buyer.id] = resp.status_code
+
+        self.assertEqual(sorted(statuses.values()), [200] * 10 + [403] * 2)
+        self.assertEqual(
+            Ticket.objects.filter(type="normal", holder__isnull=False).count(), 20
+        )
+        self.assertFalse(
+            Ticket.objects.annotate(num_carts=Count("carts"))
+            .filter(num_carts__gt=1)
+            .exists()
+        )
+        for buyer_id, code in statuses.items():
+            held = Ticket.objects.filter(holder_id=buyer_id)
+            self.assertEqual(held.count(), 2 if code == 200 else 0)
+            self.assertEqual(
+                set(held), set(Ticket.objects.filter(carts__owner_id=buyer_id))
+            )
+
     def test_add_to_cart_before_ticket_drop(self):
         self.client.login(username=self.user1.username, password="test")
 
@@ -948,6 +1070,81 @@ class TicketEventTestCase(TestCase):
         )
         self.assertEqual(resp_bought.status_code, 400, resp_bought.content)
 
+    def test_event_ticket_counts(self):
+        """
+        Listing a ticketed event should count its tickets in the database instead
+        of loading every ticket, and should not expose the counts publicly.
+        """
+        club = Club.objects.create(code="big-club", name="Big", approved=True)
+        event = Event.objects.create(code="big", club=club, name="Big Show")
+        showing = EventShowing.objects.create(
+            event=event,
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=3),
+        )
+        other_showing = EventShowing.objects.create(
+            event=event,
+            start_time=timezone.now() + timedelta(days=4),
+            end_time=timezone.now() + timedelta(days=5),
+        )
+        expiration = timezone.now() + timedelta(minutes=10)
+        self.client.login(username=self.user2.username, password="test")
+        urls = [
+            reverse("club-events-list", args=(club.code,)),
+            reverse("club-events-detail", args=(club.code, event.pk)),
+        ]
+
+        def add_tickets(count):
+            # a fifth sold, a tenth held, a tenth not buyable and the rest available
+            tickets = []
+            for i in range(count):
+                ticket = Ticket(
+                    showing=showing, type="normal" if i % 2 else "premium", price=10
+                )
+                if i % 10 < 2:
+                    ticket.owner = self.user1
+                elif i % 10 == 2:
+                    ticket.holder = self.user1
+                    ticket.holding_expiration = expiration
+                elif i % 10 == 3:
+                    ticket.buyable = False
+                tickets.append(ticket)
+            Ticket.objects.bulk_create(tickets)
+
+        def fetch():
+            counts = []
+            for url in urls:
+                with CaptureQueriesContext(connection) as queries:
+                    resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200, resp.content)
+                data = resp.data[0] if isinstance(resp.data, list) else resp.data
+                self.assertTrue(data["ticketed"])
+                showings = {item["id"]: item for item in data["showings"]}
+                self.assertTrue(showings[showing.id]["ticketed"])
+                self.assertFalse(showings[other_showing.id]["ticketed"])
+                self.assertNotIn("ticket_counts", showings[showing.id])
+                counts.append(len(queries))
+            return counts
+
+        add_tickets(20)
+        small = fetch()
+        add_tickets(200)
+        self.assertEqual(fetch(), small)
+        self.assertTrue(all(count < 15 for count in small), small)
+
+        self.assertEqual(
+            Ticket.objects.counts_by_showing([showing.id, other_showing.id]),
+            {
+                showing.id: {
+                    "total": 220,
+                    "sold": 44,
+                    "held": 22,
+                    "available": {"normal": 66, "premium": 66},
+                },
+                other_showing.id: {"total": 0, "sold": 0, "held": 0, "available": {}},
+            },
+        )
+
 
 @dataclass
 class MockCybersourceResponse:
@@ -1938,6 +2135,31 @@ class TicketModelTestCase(TestCase):
             5,
         )
 
+    def test_release_ticket_holds_command(self):
+        expired_time = timezone.now() - timedelta(hours=1)
+        Ticket.objects.filter(id__in=[t.id for t in self.tickets1[:3]]).update(
+            holder=self.user1, holding_expiration=expired_time
+        )
+        Ticket.objects.filter(id__in=[t.id for t in self.tickets2[:2]]).update(
+            holder=self.user1, holding_expiration=timezone.now() + timedelta(hours=1)
+        )
+        cache.clear()
+
+        out = StringIO()
+        call_command("release_ticket_holds", stdout=out)
+        self.assertIn("Released 3 expired ticket hold(s)", out.getvalue())
+        self.assertEqual(Ticket.objects.filter(holder=self.user1).count(), 2)
+
+        stats = Ticket.objects.hold_stats()
+        self.assertEqual(stats["sweeps"], 1)
+        self.assertEqual(stats["released"], 3)
+        self.assertEqual(stats["last_sweep"]["released"], 3)
+
+        self.client.login(username=self.user1.username, password="test")
+        resp = self.client.get(reverse("metrics"))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()["ticket_holds"]["released"], 3)
+
     def test_delete_tickets_without_transaction_record(self):
         # check that delete on queryset still works
         tickets = Ticket.objects.filter(type="normal")
@@ -1,11 +1,15 @@
+import csv
 import datetime
 import io
 import json
 import os
+import random
+import tempfile
 import time
 from collections import Counter
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import openpyxl
 from dateutil.parser import isoparse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
@@ -14,16 +18,21 @@ from django.core import mail
 from django.core.cache import cache
 from django.core.management import call_command
 from django.core.signing import TimestampSigner
-from django.test import Client, TestCase
+from django.db import IntegrityError, connection
+from django.db.models import Q
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from ics import Calendar
 
+from clubs.caching import fair_live_metrics
 from clubs.filters import DEFAULT_PAGE_SIZE
 from clubs.models import (
     Advisor,
     ApplicationCommittee,
     ApplicationQuestion,
+    ApplicationQuestionResponse,
     ApplicationSubmission,
     Asset,
     Badge,
@@ -34,11 +43,15 @@ from clubs.models import (
     ClubApprovalResponseTemplate,
     ClubFair,
     ClubFairRegistration,
+    ClubVisit,
     Designation,
     Eligibility,
     Event,
     EventShowing,
+    ExportJob,
     Favorite,
+    ImageSource,
+    ImageVariant,
     Major,
     Membership,
     MembershipInvite,
@@ -46,19 +59,28 @@ from clubs.models import (
     OwnershipRequest,
     QuestionAnswer,
     RegistrationQueueSettings,
+    Report,
     School,
     Status,
+    Subscribe,
     Tag,
     Testimonial,
+    Ticket,
     Type,
     ZoomMeetingVisit,
+    ZoomWebhook,
 )
+from clubs.views import ClubsSearchFilter
 
 
 class SearchTestCase(TestCase):
     @classmethod
     def setUpTestData(cls):
-        Club.objects.bulk_create(
+        rng = random.Random(1234)
+        cls.undergrad = Classification.objects.create(name="Undergraduate", symbol="UG")
+        cls.grad = Classification.objects.create(name="Graduate", symbol="G")
+        cls.tags = [Tag.objects.create(name=f"Tag {i}") for i in range(10)]
+        clubs = Club.objects.bulk_create(
             [
                 Club(
                     code=f"club-{i}",
@@ -66,13 +88,76 @@ class SearchTestCase(TestCase):
                     active=True,
                     approved=True,
                     visible_to_public=True,
+                    classification=rng.choice([cls.undergrad, cls.grad]),
+                    size=rng.choice([Club.SIZE_SMALL, Club.SIZE_LARGE]),
                 )
                 for i in range(0, 100)
             ]
         )
+        for club in clubs:
+            club.tags.set(rng.sample(cls.tags, rng.randint(0, 9)))
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
+        self.factory = RequestFactory()
+
+    def chained_filter(self, tag_ids, params):
+        queryset = Club.objects.all()
+        if "classification_group" in params:
+            ids = list(
+                Classification.objects.filter(
+                    Q(symbol__istartswith="ug") | Q(name__icontains="undergrad")
+                ).values_list("id", flat=True)
+            )
+            queryset = queryset.filter(classification__id__in=ids)
+        if "size" in params:
+            queryset = queryset.filter(size=params["size"])
+        for tag in tag_ids:
+            queryset = queryset.filter(tags__id=tag)
+        return list(queryset)
+
+    def compiled_filter(self, tag_ids, params):
+        request = self.factory.get(
+            "/", {"tags": ",".join(str(i) for i in tag_ids), **params}
+        )
+        return list(
+            ClubsSearchFilter().filter_queryset(request, Club.objects.all(), None)
+        )
+
+    def test_compiled_filter(self):
+        """
+        The compiled filter plan matches chaining one join per tag, without joining
+        the tags table.
+        """
+        ids = [tag.id for tag in self.tags]
+        combinations = [
+            (ids[:2], {}),
+            (ids[:3], {"size": Club.SIZE_LARGE}),
+            (ids[:2], {"classification_group": "ug"}),
+        ]
+
+        for tag_ids, params in combinations:
+            expected = self.chained_filter(tag_ids, params)
+            self.assertGreater(len(expected), 0)
+
+            with CaptureQueriesContext(connection) as captured:
+                clubs = self.compiled_filter(tag_ids, params)
+            self.assertEqual(
+                sorted(c.code for c in clubs), sorted(c.code for c in expected)
+            )
+            self.assertLessEqual(len(captured), 2)
+            self.assertEqual(captured.captured_queries[-1]["sql"].count("JOIN"), 0)
+
+    def test_classification_lookup_cached(self):
+        self.compiled_filter([], {"classification_group": "ug"})
+        with self.assertNumQueries(1):
+            self.compiled_filter([], {"classification_group": "ug"})
+
+        # modifying a classification invalidates the cached lookup
+        Classification.objects.create(name="Undergraduate Open", symbol="UGo")
+        with self.assertNumQueries(2):
+            self.compiled_filter([], {"classification_group": "ug"})
 
     def test_random_listing(self):
         self.perform_random_fetch(DEFAULT_PAGE_SIZE)
@@ -844,6 +929,63 @@ class ClubTestCase(TestCase):
         )
         self.assertEqual(actual, expected)
 
+    def test_event_favorited_users_conditional(self):
+        """
+        Test that unchanged ICS feeds are answered with a 304 from the cache, and
+        that changing an event or a favorite invalidates the feed.
+        """
+        Favorite.objects.create(person=self.user1, club=self.club1)
+        showing = EventShowing.objects.create(
+            event=self.event1,
+            start_time=timezone.now() + timezone.timedelta(days=2),
+            end_time=timezone.now() + timezone.timedelta(days=3),
+        )
+        url = reverse("favorites-calendar", args=(self.user1.profile.uuid_secret,))
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        etag = resp["ETag"]
+        self.assertIn("Last-Modified", resp)
+        cal = Calendar(resp.content.decode("utf8"))
+        self.assertEqual(
+            [ev.name for ev in cal.events], [f"{self.club1.name} - {self.event1.name}"]
+        )
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"])
+        self.assertEqual(resp.status_code, 304)
+
+        # renaming the event changes the feed
+        self.event1.name = "Renamed Event"
+        self.event1.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertIn(b"Renamed Event", resp.content)
+        etag = resp["ETag"]
+
+        # a new favorite adds its events to the feed
+        club2 = Club.objects.create(code="club-2", name="Club 2", active=True)
+        club2_event = Event.objects.create(
+            code="club-2-event", name="Club 2 Event", club=club2
+        )
+        EventShowing.objects.create(
+            event=club2_event,
+            start_time=showing.start_time,
+            end_time=showing.end_time,
+        )
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        Favorite.objects.create(person=self.user1, club=club2)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertIn(b"Club 2 Event", resp.content)
+
     def test_retrieve_ics_url(self):
         """
         Test retrieving the ICS URL from the endpoint.
@@ -2514,6 +2656,71 @@ class ClubTestCase(TestCase):
         resp = self.client.get(reverse("clubs-children", args=(self.club1.code,)))
         self.assertIn(resp.status_code, [200], resp.content)
 
+    def test_club_relationship_trees(self):
+        """
+        The children and parents trees should include indirect relationships and
+        stop at cycles.
+        """
+        self.client.login(username=self.user3.username, password="test")
+        child = Club.objects.create(
+            code="child", name="Child", active=True, approved=True
+        )
+        grandchild = Club.objects.create(
+            code="grandchild", name="Grandchild", active=True, approved=True
+        )
+        child.parent_orgs.add(self.club1)
+        grandchild.parent_orgs.add(child)
+        self.club1.parent_orgs.add(grandchild)
+
+        resp = self.client.get(reverse("clubs-children", args=(self.club1.code,)))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(
+            resp.json(),
+            {
+                "name": self.club1.name,
+                "code": self.club1.code,
+                "children": [
+                    {
+                        "name": "Child",
+                        "code": "child",
+                        "children": [
+                            {
+                                "name": "Grandchild",
+                                "code": "grandchild",
+                                "children": [
+                                    {"name": self.club1.name, "code": self.club1.code}
+                                ],
+                            }
+                        ],
+                    }
+                ],
+            },
+        )
+
+        self.club1.parent_orgs.clear()
+        resp = self.client.get(reverse("clubs-parents", args=(grandchild.code,)))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(
+            resp.json(),
+            {
+                "name": "Grandchild",
+                "code": "grandchild",
+                "children": [
+                    {
+                        "name": "Child",
+                        "code": "child",
+                        "children": [
+                            {
+                                "name": self.club1.name,
+                                "code": self.club1.code,
+                                "children": [],
+                            }
+                        ],
+                    }
+                ],
+            },
+        )
+
     def test_club_modify(self):
         """
         Owners and officers should be able to modify the club.
@@ -2735,6 +2942,11 @@ class ClubTestCase(TestCase):
             [Membership.ROLE_OFFICER] * 3,
             data,
         )
+        self.assertIn("outbox", data)
+
+        # ensure invites are delivered by the outbox worker
+        self.assertEqual(len(mail.outbox), 0, mail.outbox)
+        call_command("send_outbox", stdout=io.StringIO())
         self.assertEqual(len(mail.outbox), 3, mail.outbox)
 
         # ensure we can get all memberships
@@ -2806,6 +3018,67 @@ class ClubTestCase(TestCase):
         self.assertTrue(flt.exists())
         self.assertFalse(flt.first().public)
 
+    def test_club_invite_bulk(self):
+        """
+        Test that mass invites validate every address and are created in bulk.
+        """
+        self.client.login(username=self.user5.username, password="test")
+        url = reverse("club-invite", args=(self.club1.code,))
+
+        # every invalid address is reported and nobody is invited
+        resp = self.client.post(
+            url,
+            {"emails": "one@pennlabs.org, bad, two@pennlabs.org\nworse", "title": "A"},
+            content_type="application/json",
+        )
+        self.assertFalse(resp.data["success"], resp.content)
+        self.assertEqual(resp.data["invalid"], ["bad", "worse"])
+        self.assertFalse(MembershipInvite.objects.filter(club=self.club1).exists())
+
+        # invites are not kept if their emails could not be queued
+        with patch.object(MembershipInvite, "send_mail", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.client.post(
+                    url,
+                    {"emails": "one@pennlabs.org", "title": "A"},
+                    content_type="application/json",
+                )
+        self.assertFalse(MembershipInvite.objects.filter(club=self.club1).exists())
+
+        Membership.objects.create(person=self.user1, club=self.club1)
+        MembershipInvite.objects.create(
+            email="invited@pennlabs.org", club=self.club1, creator=self.user5
+        )
+        emails = [f"user{i}@pennlabs.org" for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(
+                url,
+                {
+                    "emails": ", ".join(
+                        [*emails, self.user1.email, "invited@pennlabs.org", emails[0]]
+                    ),
+                    "title": "Member",
+                },
+                content_type="application/json",
+            )
+        self.assertTrue(resp.data["success"], resp.content)
+        self.assertEqual(resp.data["sent"], 50)
+        self.assertEqual(resp.data["skipped"], 3)
+        self.assertLess(len(queries), 30)
+
+        results = {r["email"]: r["status"] for r in resp.data["results"]}
+        self.assertEqual(len(results), 52)
+        self.assertEqual(results[emails[0]], "invited")
+        self.assertEqual(results[self.user1.email], "member")
+        self.assertEqual(results["invited@pennlabs.org"], "invited_already")
+
+        self.assertEqual(
+            MembershipInvite.objects.filter(club=self.club1, email__in=emails).count(),
+            50,
+        )
+        call_command("send_outbox", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 50)
+
     def test_club_invite_email_check(self):
         self.client.login(username=self.user5.username, password="test")
 
@@ -2831,6 +3104,7 @@ class ClubTestCase(TestCase):
         )
         self.assertIn(resp.status_code, [200, 201], resp.content)
 
+        call_command("send_outbox", stdout=io.StringIO())
         self.assertTrue(len(mail.outbox), 2)
 
     def test_club_invite_email_resend(self):
@@ -2946,6 +3220,118 @@ class ClubTestCase(TestCase):
             ).exists()
         )
 
+    def test_wharton_applications_query_count(self):
+        """
+        Listing Wharton Council applications should not query the logo of each
+        club separately.
+        """
+        now = timezone.now()
+        self.client.login(username=self.user1.username, password="test")
+
+        def add_applications(start, end):
+            for i in range(start, end):
+                source = ImageSource.objects.create(content_hash=f"hash-{i}")
+                ImageVariant.objects.create(
+                    source=source, width=320, format="webp", file=f"{i}.webp", size=1
+                )
+                club = Club.objects.create(
+                    code=f"wharton-club-{i}", name=f"Wharton Club {i}", approved=True
+                )
+                # as if the variants were generated for the logo of the club
+                Club.objects.filter(pk=club.pk).update(image_source=source)
+                ClubApplication.objects.create(
+                    name=f"Application {i}",
+                    club=club,
+                    is_wharton_council=True,
+                    application_start_time=now - datetime.timedelta(days=1),
+                    application_end_time=now + datetime.timedelta(days=1),
+                    result_release_time=now + datetime.timedelta(days=2),
+                )
+
+        def fetch():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(reverse("wharton-list"))
+            self.assertEqual(resp.status_code, 200, resp.content)
+            self.assertTrue(all(app["club_image_url"] for app in resp.data))
+            return len(resp.data), len(queries)
+
+        add_applications(0, 2)
+        count, num_queries = fetch()
+        self.assertEqual(count, 2)
+        add_applications(2, 6)
+        self.assertEqual(fetch(), (6, num_queries))
+
+    def test_nested_image_query_count(self):
+        """
+        Lists that nest clubs or events should load their generated image variants
+        in a fixed number of queries.
+        """
+        self.client.login(username=self.user1.username, password="test")
+        Membership.objects.create(
+            person=self.user1, club=self.club1, role=Membership.ROLE_OFFICER
+        )
+        now = timezone.now()
+
+        def add_items(start, end):
+            for i in range(start, end):
+                source = ImageSource.objects.create(content_hash=f"hash-{i}")
+                ImageVariant.objects.create(
+                    source=source, width=640, format="webp", file=f"{i}.webp", size=1
+                )
+                club = Club.objects.create(
+                    code=f"image-club-{i}", name=f"Image Club {i}", approved=True
+                )
+                event = Event.objects.create(
+                    code=f"image-event-{i}", club=self.club1, name=f"Image Event {i}"
+                )
+                # as if the variants were generated for the images
+                Club.objects.filter(pk=club.pk).update(image_source=source)
+                Event.objects.filter(pk=event.pk).update(image_source=source)
+
+                Favorite.objects.create(person=self.user1, club=club)
+                Subscribe.objects.create(person=self.user1, club=club)
+                Membership.objects.create(person=self.user1, club=club)
+                ClubVisit.objects.create(person=self.user1, club=club)
+                showing = EventShowing.objects.create(
+                    event=event,
+                    start_time=now + datetime.timedelta(days=1),
+                    end_time=now + datetime.timedelta(days=2),
+                )
+                Ticket.objects.create(
+                    showing=showing, type="normal", owner=self.user1, price=10
+                )
+
+        urls = [
+            reverse("favorites-list"),
+            reverse("subscribes-list"),
+            reverse("members-list"),
+            reverse("clubvisits-list"),
+            reverse("tickets-list"),
+            reverse("events-owned"),
+            reverse("clubs-detail", args=(self.club1.code,)),
+        ]
+
+        def image_queries():
+            counts = {}
+            for url in urls:
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200, resp.content)
+                counts[url] = sum("clubs_image" in query["sql"] for query in queries)
+            return counts
+
+        add_items(0, 1)
+        counts = image_queries()
+        add_items(1, 4)
+        self.assertEqual(image_queries(), counts)
+
+        resp = self.client.get(reverse("favorites-list"))
+        self.assertTrue(
+            all(fav["club"]["image_url"].endswith(".webp") for fav in resp.data)
+        )
+
     def test_club_application_duplicate_committees(self):
         """
         Test that duplicate committees are not allowed
@@ -3105,6 +3491,46 @@ class ClubTestCase(TestCase):
         self.assertTrue(isinstance(res.data[0], dict))
         self.assertTrue(len(res.data[0]) > 2)
 
+    def test_club_report_streaming(self):
+        resp = self.client.get(
+            reverse("clubs-list"), {"format": "csv", "fields": "name,code"}
+        )
+        self.assertEqual(200, resp.status_code)
+        self.assertTrue(resp.streaming)
+        self.assertTrue(resp["Content-Disposition"].endswith(".csv"))
+        rows = list(csv.reader(io.StringIO(b"".join(resp).decode("utf-8"))))
+        self.assertEqual(len(rows), self.NUM_CLUBS + 1)
+        self.assertEqual(len(rows[0]), 2)
+
+        resp = self.client.get(
+            reverse("clubs-list"),
+            {"format": "xlsx", "fields": "name,code", "stream": "true"},
+        )
+        self.assertEqual(200, resp.status_code)
+        self.assertTrue(resp.streaming)
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(resp)))
+        xlsx_rows = list(workbook.active.values)
+        self.assertEqual(len(xlsx_rows), self.NUM_CLUBS + 1)
+        self.assertTrue(workbook.active.cell(1, 1).font.bold)
+        self.assertEqual(
+            sorted(row[1:] for row in xlsx_rows[1:]),
+            sorted(tuple(row[1:]) for row in rows[1:]),
+        )
+
+        # streamed rows are loaded from the database in chunks
+        with (
+            patch("clubs.mixins.XLSXFormatterMixin.export_chunk_size", 1),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            resp = self.client.get(reverse("clubs-list"), {"format": "csv"})
+            rows = list(csv.reader(io.StringIO(b"".join(resp).decode("utf-8"))))
+        self.assertEqual(len(rows), self.NUM_CLUBS + 1)
+        self.assertGreater(len(rows[0]), 2)
+        tag_queries = [
+            q for q in queries.captured_queries if "clubs_club_tags" in q["sql"]
+        ]
+        self.assertEqual(len(tag_queries), self.NUM_CLUBS)
+
     def test_club_members_report(self):
         # login for extended member information
         self.client.login(username=self.user5.username, password="test")
@@ -3630,6 +4056,8 @@ class ClubTestCase(TestCase):
         self.assertEqual(report_names, [name])
 
     def test_list_options(self):
+        cache.clear()
+
         # test normal operating conditions
         resp = self.client.get(reverse("options"))
         self.assertIn(resp.status_code, [200], resp.content)
@@ -3945,6 +4373,51 @@ class ClubTestCase(TestCase):
         for perm in permissions:
             self.assertTrue(data[perm], perm)
 
+    def test_permission_lookup_many_clubs(self):
+        """
+        Object permissions for many clubs are resolved in a constant number of queries.
+        """
+        parent = Club.objects.create(code="permission-parent", name="Parent")
+        clubs = Club.objects.bulk_create(
+            [
+                Club(code=f"permission-club-{i}", name=f"Permission Club {i}")
+                for i in range(100)
+            ]
+        )
+        parent.children_orgs.add(*clubs[:50])
+        Membership.objects.create(
+            person=self.user4, club=parent, role=Membership.ROLE_OFFICER
+        )
+        Membership.objects.create(
+            person=self.user4, club=clubs[99], role=Membership.ROLE_OWNER
+        )
+        Membership.objects.create(
+            person=self.user4, club=clubs[98], role=Membership.ROLE_MEMBER
+        )
+
+        self.client.login(username=self.user4.username, password="test")
+        permissions = [f"clubs.manage_club:{club.code}" for club in clubs] + [
+            f"clubs.delete_club:{club.code}" for club in clubs
+        ]
+        with self.assertNumQueries(7):
+            resp = self.client.get(
+                reverse("users-permission"), {"perm": ",".join(permissions)}
+            )
+        self.assertIn(resp.status_code, [200], resp.content)
+        data = resp.json()["permissions"]
+
+        # officers of the parent can edit its children but not delete them
+        for club in clubs[:50]:
+            self.assertTrue(data[f"clubs.manage_club:{club.code}"], club.code)
+            self.assertFalse(data[f"clubs.delete_club:{club.code}"], club.code)
+        for club in clubs[50:98]:
+            self.assertFalse(data[f"clubs.manage_club:{club.code}"], club.code)
+
+        # direct memberships are checked for their own role
+        self.assertTrue(data[f"clubs.manage_club:{clubs[99].code}"])
+        self.assertTrue(data[f"clubs.delete_club:{clubs[99].code}"])
+        self.assertFalse(data[f"clubs.manage_club:{clubs[98].code}"])
+
     def test_zoom_add_meeting(self):
         # setup fair event
         self.event1.type = Event.FAIR
@@ -3975,6 +4448,109 @@ class ClubTestCase(TestCase):
         self.event1.refresh_from_db()
         self.assertEqual(self.event1.url, output_url)
 
+    def test_zoom_webhook(self):
+        """
+        Test that Zoom webhooks find their event by meeting id, stay staged until
+        they are applied and that a batch of webhooks is broadcast once per event.
+        """
+        self.assertEqual(self.event1.zoom_meeting_id, "4880003126")
+        Event.objects.filter(pk=self.event1.pk).update(zoom_meeting_id="")
+        call_command("index_zoom_meetings", stdout=io.StringIO())
+        self.event1.refresh_from_db()
+        self.assertEqual(self.event1.zoom_meeting_id, "4880003126")
+
+        def webhook(action, participant_id, email=None, **times):
+            return (
+                action,
+                {
+                    "id": 4880003126,
+                    "participant": {"user_id": participant_id, "email": email, **times},
+                },
+            )
+
+        now = timezone.now()
+        join = {"join_time": (now - datetime.timedelta(minutes=5)).isoformat()}
+        leave = {"leave_time": now.isoformat()}
+
+        # a single webhook is applied right away in tests
+        resp = self.client.post(
+            reverse("webhooks-meeting"),
+            {
+                "event": ZoomMeetingVisit.JOINED,
+                "payload": {"object": webhook("", "1", self.user1.email, **join)[1]},
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        # later webhooks stay staged until they are applied by the command
+        with override_settings(ZOOM_WEBHOOK_BATCH_DELAY=60):
+            for action, obj in [
+                webhook(ZoomMeetingVisit.JOINED, "2", "unknown@a.com", **join),
+                webhook(ZoomMeetingVisit.JOINED, "4", self.user2.email),
+                (ZoomMeetingVisit.LEFT, "malformed"),
+                webhook(ZoomMeetingVisit.JOINED, "3", self.user2.email, **join),
+                webhook(ZoomMeetingVisit.LEFT, "1", **leave),
+                webhook(ZoomMeetingVisit.LEFT, "3", **leave),
+            ]:
+                resp = self.client.post(
+                    reverse("webhooks-meeting"),
+                    {"event": action, "payload": {"object": obj}},
+                    content_type="application/json",
+                )
+                self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(ZoomWebhook.objects.count(), 6)
+        self.assertEqual(ZoomMeetingVisit.objects.count(), 1)
+
+        # malformed webhooks are marked as failed without holding up the others
+        channel_layer = MagicMock()
+        channel_layer.group_send = AsyncMock()
+        with patch("clubs.caching.get_channel_layer", return_value=channel_layer):
+            out = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("ingest_zoom_webhooks", stdout=out)
+        self.assertIn("Processed 6 Zoom webhook(s).", out.getvalue())
+        self.assertEqual(
+            set(ZoomWebhook.objects.values_list("error", flat=True)),
+            {
+                "Webhook has no valid join_time.",
+                "Webhook does not describe a participant.",
+            },
+        )
+
+        self.assertEqual(channel_layer.group_send.call_count, 1)
+        visits = {
+            visit.participant_id: visit for visit in ZoomMeetingVisit.objects.all()
+        }
+        self.assertEqual(len(visits), 3)
+        self.assertEqual(visits["1"].person, self.user1)
+        self.assertIsNotNone(visits["1"].leave_time)
+        self.assertIsNone(visits["2"].person)
+        self.assertIsNone(visits["2"].leave_time)
+        self.assertEqual(visits["3"].person, self.user2)
+        self.assertIsNotNone(visits["3"].leave_time)
+
+        # a webhook that fails to apply is marked as failed on its own
+        ZoomWebhook.objects.all().delete()
+        ingest = ZoomMeetingVisit.ingest
+
+        def failing_ingest(webhooks):
+            if any(obj["participant"]["user_id"] == "5" for _, obj in webhooks):
+                raise IntegrityError("duplicate visit")
+            return ingest(webhooks)
+
+        for participant_id in ["5", "6"]:
+            action, obj = webhook(ZoomMeetingVisit.JOINED, participant_id, **join)
+            ZoomWebhook.objects.create(action=action, payload=json.dumps(obj))
+        with patch.object(ZoomMeetingVisit, "ingest", side_effect=failing_ingest):
+            self.assertEqual(ZoomWebhook.ingest_staged(), 2)
+        self.assertEqual(
+            list(ZoomWebhook.objects.values_list("error", flat=True)),
+            ["IntegrityError: duplicate visit"],
+        )
+        self.assertTrue(ZoomMeetingVisit.objects.filter(participant_id="6").exists())
+        self.assertEqual(ZoomWebhook.ingest_staged(), 0)
+
     def test_zoom_general_meeting_info(self):
         """
         Test the endpoint to retrieve all live information for a fair.
@@ -4028,6 +4604,80 @@ class ClubTestCase(TestCase):
             resp.content,
         )
 
+    def test_fair_live_metrics_pushed(self):
+        """
+        Test that joining or leaving a fair booth refreshes the cached fair metrics
+        and pushes them to connected dashboards.
+        """
+        now = timezone.now()
+        fair = ClubFair.objects.create(
+            name="Example Fair",
+            start_time=now - datetime.timedelta(hours=1),
+            end_time=now + datetime.timedelta(hours=1),
+            registration_end_time=now - datetime.timedelta(weeks=1),
+        )
+        ClubFairRegistration.objects.create(
+            registrant=self.user1, club=self.event1.club, fair=fair
+        )
+        self.event1.type = Event.FAIR
+        self.event1.save()
+        Membership.objects.create(
+            person=self.user2, club=self.event1.club, role=Membership.ROLE_OFFICER
+        )
+
+        channel_layer = MagicMock()
+        channel_layer.group_send = AsyncMock()
+        with patch("clubs.caching.get_channel_layer", return_value=channel_layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                visit = ZoomMeetingVisit.objects.create(
+                    event=self.event1,
+                    person=self.user2,
+                    join_time=now - datetime.timedelta(minutes=10),
+                    meeting_id="",
+                    participant_id="",
+                )
+                ZoomMeetingVisit.objects.create(
+                    event=self.event1,
+                    person=self.user3,
+                    join_time=now - datetime.timedelta(minutes=10),
+                    leave_time=now - datetime.timedelta(minutes=5),
+                    meeting_id="",
+                    participant_id="",
+                )
+
+        groups = [call.args[0] for call in channel_layer.group_send.call_args_list]
+        self.assertIn(f"fairs-live-{fair.id}", groups)
+        self.assertIn(f"events-live-{self.event1.id}", groups)
+        message = channel_layer.group_send.call_args_list[-2].args[1]
+        officers = sorted(
+            Membership.objects.filter(
+                club=self.event1.club, role__lte=Membership.ROLE_OFFICER
+            ).values_list("person__username", flat=True)
+        )
+        self.assertIn(self.user2.username, officers)
+        self.assertEqual(message["metrics"][str(self.event1.id)]["officers"], officers)
+        message = channel_layer.group_send.call_args_list[-1].args[1]
+        self.assertEqual(message["event"], ZoomMeetingVisit.LEFT)
+
+        # the dashboard is served from the refreshed cache
+        with self.assertNumQueries(0):
+            metrics = fair_live_metrics.get(fair.id)
+        self.assertEqual(metrics[self.event1.id]["participant_count"], 1)
+        self.assertEqual(metrics[self.event1.id]["already_attended"], 1)
+        self.assertEqual(metrics[self.event1.id]["median"], 300)
+
+        visit.leave_time = now
+        with self.captureOnCommitCallbacks(execute=True):
+            visit.save()
+
+        self.client.login(username=self.user1.username, password="test")
+        resp = self.client.get(reverse("clubfairs-live", args=(fair.id,)))
+        self.assertIn(resp.status_code, [200], resp.content)
+        self.assertEqual(resp.data[self.event1.id]["participant_count"], 0)
+        self.assertEqual(resp.data[self.event1.id]["already_attended"], 2)
+        self.assertEqual(resp.data[self.event1.id]["officers"], [])
+        self.assertEqual(resp.data[self.event1.id]["median"], 600)
+
     def test_event_add_meeting(self):
         """
         Test manually adding a meeting link without the Zoom page, but having their
@@ -4724,6 +5374,7 @@ class ClubTestCase(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("Blast sent to 1 recipients", resp.data["detail"])
+        call_command("send_outbox", stdout=io.StringIO())
         self.assertEqual(len(mail.outbox), 1)
         resp = self.client.post(
             reverse("clubs-email-blast"),
@@ -4732,6 +5383,7 @@ class ClubTestCase(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("Blast sent to 2 recipients", resp.data["detail"])
+        call_command("send_outbox", stdout=io.StringIO())
         self.assertEqual(len(mail.outbox), 2)
 
         resp = self.client.post(
@@ -4741,6 +5393,7 @@ class ClubTestCase(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("Blast sent to 3 recipients", resp.data["detail"])
+        call_command("send_outbox", stdout=io.StringIO())
         self.assertEqual(len(mail.outbox), 3)
 
     def test_application_submission_requires_complete_profile(self):
@@ -4838,6 +5491,215 @@ class ClubTestCase(TestCase):
             1,
         )
 
+    def test_question_response_bulk(self):
+        """
+        Submitting an application takes the same number of queries regardless of the
+        number of questions, and updates the cached submission list in place.
+        """
+        now = timezone.now()
+        application = ClubApplication.objects.create(
+            name="Bulk Application",
+            club=self.club1,
+            application_start_time=now - datetime.timedelta(days=1),
+            application_end_time=now + datetime.timedelta(days=1),
+            result_release_time=now + datetime.timedelta(days=2),
+        )
+        questions = [
+            application.questions.create(
+                question_type=ApplicationQuestion.FREE_RESPONSE,
+                prompt=f"Question {i}",
+                word_limit=100,
+            )
+            for i in range(30)
+        ]
+        choice_question = application.questions.create(
+            question_type=ApplicationQuestion.MULTIPLE_CHOICE, prompt="Pick one"
+        )
+        choice = choice_question.multiple_choice.create(value="Yes")
+        choice_question.multiple_choice.create(value="No")
+
+        profile = self.user2.profile
+        profile.graduation_year = now.year + 1
+        profile.school.add(School.objects.create(name="SEAS", is_graduate=False))
+        profile.major.add(Major.objects.create(name="Computer Science"))
+        profile.save()
+
+        # cache the submission list as an officer
+        Membership.objects.create(
+            person=self.user4, club=self.club1, role=Membership.ROLE_OFFICER
+        )
+        self.client.login(username=self.user4.username, password="test")
+        url = reverse(
+            "club-application-submissions-list",
+            args=(self.club1.code, application.id),
+        )
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json(), [])
+
+        def submit(questions, text):
+            data = {"questionIds": [str(q.id) for q in questions], "committee": None}
+            for question in questions:
+                if question == choice_question:
+                    data[str(question.id)] = {"multipleChoice": "Yes"}
+                else:
+                    data[str(question.id)] = {"text": f"{text} {question.id}"}
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.post(
+                    reverse("users-question-response"),
+                    data,
+                    content_type="application/json",
+                )
+            self.assertEqual(resp.status_code, 200, resp.content)
+            return len(queries)
+
+        # the first submission also creates the submission itself
+        self.client.login(username=self.user2.username, password="test")
+        submit(questions[:1], "First")
+        few = submit([questions[0], choice_question], "First")
+        many = submit(questions + [choice_question], "Second")
+        self.assertEqual(few, many)
+
+        submission = ApplicationSubmission.objects.get(
+            user=self.user2, application=application
+        )
+        self.assertEqual(submission.responses.count(), 31)
+        self.assertEqual(
+            submission.responses.get(question=questions[0]).text,
+            f"Second {questions[0].id}",
+        )
+        self.assertEqual(
+            submission.responses.get(question=choice_question).multiple_choice, choice
+        )
+
+        # the submission is serialized once and then served from the cache
+        self.client.login(username=self.user4.username, password="test")
+        resp = self.client.get(url)
+        data = resp.json()
+        self.assertEqual([row["pk"] for row in data], [submission.pk])
+        self.assertEqual(len(data[0]["responses"]), 31)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.json(), data)
+        self.assertFalse(
+            any("clubs_applicationquestionresponse" in q["sql"] for q in queries)
+        )
+
+        # new responses drop the cached submission
+        self.client.login(username=self.user2.username, password="test")
+        submit(questions[:1], "Third")
+        self.client.login(username=self.user4.username, password="test")
+        resp = self.client.get(url)
+        self.assertIn(
+            f"Third {questions[0].id}",
+            [row["text"] for row in resp.json()[0]["responses"]],
+        )
+
+    def test_application_submission_list(self):
+        """
+        Submissions can be filtered and paginated, and status and reason changes
+        update the cached submissions in place.
+        """
+        now = timezone.now()
+        application = ClubApplication.objects.create(
+            name="Review Application",
+            club=self.club1,
+            application_start_time=now - datetime.timedelta(days=1),
+            application_end_time=now + datetime.timedelta(days=1),
+            result_release_time=now + datetime.timedelta(days=2),
+        )
+        design = application.committees.create(name="Design")
+        question = application.questions.create(
+            question_type=ApplicationQuestion.FREE_RESPONSE, prompt="Why?"
+        )
+        submissions = []
+        for i in range(12):
+            user = get_user_model().objects.create_user(
+                f"applicant{i}", f"applicant{i}@example.com", "test"
+            )
+            submission = ApplicationSubmission.objects.create(
+                user=user,
+                application=application,
+                committee=design if i % 3 == 0 else None,
+                status=ApplicationSubmission.ACCEPTED
+                if i % 2 == 0
+                else ApplicationSubmission.PENDING,
+            )
+            submission.responses.create(question=question, text=f"Because {i}")
+            submissions.append(submission)
+
+        Membership.objects.create(
+            person=self.user4, club=self.club1, role=Membership.ROLE_OFFICER
+        )
+        self.client.login(username=self.user4.username, password="test")
+        url = reverse(
+            "club-application-submissions-list",
+            args=(self.club1.code, application.id),
+        )
+
+        # the full list is returned without pagination parameters
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        pks = [submission.pk for submission in submissions]
+        self.assertEqual([row["pk"] for row in resp.json()], pks)
+
+        # pages are followed by cursor
+        seen = []
+        params = {"page_size": 5}
+        next_url = url
+        while next_url:
+            resp = self.client.get(next_url, params)
+            self.assertEqual(resp.status_code, 200, resp.content)
+            data = resp.json()
+            self.assertLessEqual(len(data["results"]), 5)
+            seen.extend(row["pk"] for row in data["results"])
+            next_url, params = data["next"], {}
+        self.assertEqual(seen, pks)
+
+        # filter by status and committee
+        resp = self.client.get(
+            url, {"status": str(ApplicationSubmission.ACCEPTED), "committee": "Design"}
+        )
+        self.assertEqual(
+            [row["pk"] for row in resp.json()],
+            pks[::6],
+        )
+
+        # status and reason changes patch the cached submissions
+        resp = self.client.post(
+            reverse(
+                "club-application-submissions-status",
+                args=(self.club1.code, application.id),
+            ),
+            {
+                "submissions": [submissions[1].pk],
+                "status": ApplicationSubmission.REJECTED_AFTER_WRITTEN,
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        resp = self.client.post(
+            reverse(
+                "club-application-submissions-reason",
+                args=(self.club1.code, application.id),
+            ),
+            {"submissions": [{"id": submissions[1].pk, "reason": "Not a fit"}]},
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        row = resp.json()[1]
+        self.assertEqual(row["status"], ApplicationSubmission.REJECTED_AFTER_WRITTEN)
+        self.assertEqual(row["reason"], "Not a fit")
+        self.assertFalse(
+            any("clubs_applicationquestionresponse" in q["sql"] for q in queries)
+        )
+        submissions[1].refresh_from_db()
+        self.assertEqual(submissions[1].reason, "Not a fit")
+
     def test_category_viewset_permissions(self):
         """Test basic permissions for CategoryViewSet."""
         category = Category.objects.create(name="Test Category")
@@ -5812,3 +6674,210 @@ class NormalizeCommitteesTestCase(TestCase):
         # Submission should be re-pointed to the renamed committee
         self.sub.refresh_from_db()
         self.assertEqual(self.sub.committee.name, "PM")
+
+
+class ExportJobTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media = self.settings(MEDIA_ROOT=self.media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = get_user_model().objects.create_user(
+            "bfranklin", "bfranklin@seas.upenn.edu", "test"
+        )
+        self.user.is_superuser = True
+        self.user.save()
+        self.other = get_user_model().objects.create_user(
+            "tjefferson", "tjefferson@seas.upenn.edu", "test"
+        )
+
+        self.club = Club.objects.create(code="club-a", name="Club A", approved=True)
+        Club.objects.create(code="club-b", name="Club B", approved=True)
+
+        now = timezone.now()
+        self.app = ClubApplication.objects.create(
+            name="Fall App",
+            club=self.club,
+            application_start_time=now - datetime.timedelta(days=1),
+            application_end_time=now + datetime.timedelta(days=1),
+            result_release_time=now + datetime.timedelta(days=2),
+        )
+        question = ApplicationQuestion.objects.create(
+            application=self.app,
+            prompt="Why?",
+            question_type=ApplicationQuestion.FREE_RESPONSE,
+        )
+        submission = ApplicationSubmission.objects.create(
+            user=self.other, application=self.app
+        )
+        ApplicationQuestionResponse.objects.create(
+            submission=submission, question=question, text="Because"
+        )
+
+    def run_export(self, job_id):
+        channel_layer = MagicMock()
+        channel_layer.group_send = AsyncMock()
+        with patch("clubs.models.get_channel_layer", return_value=channel_layer):
+            call_command("run_export_jobs", stdout=io.StringIO())
+
+        messages = [call.args for call in channel_layer.group_send.call_args_list]
+        self.assertTrue(messages)
+        self.assertTrue(all(group == f"exports-{job_id}" for group, _ in messages))
+        self.assertEqual(messages[-1][1]["status"], ExportJob.DONE)
+
+        resp = self.client.get(reverse("exports-detail", args=(job_id,)))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data["status"], ExportJob.DONE)
+        return resp.data
+
+    def test_report_export(self):
+        report = Report.objects.create(
+            name="Clubs",
+            creator=self.user,
+            parameters=json.dumps(
+                {"format": "xlsx", "fields": "code,name", "ordering": "-name"}
+            ),
+        )
+        self.client.login(username=self.user.username, password="test")
+        resp = self.client.post(reverse("reports-export", args=(report.id,)))
+        self.assertEqual(resp.status_code, 202, resp.content)
+        job_id = resp.data["id"]
+        self.assertEqual(resp.data["status"], ExportJob.PENDING)
+        self.assertIsNone(resp.data["download_url"])
+
+        # identical requests reuse the queued export
+        resp = self.client.post(reverse("reports-export", args=(report.id,)))
+        self.assertEqual(resp.data["id"], job_id)
+
+        data = self.run_export(job_id)
+        self.assertEqual(data["total"], 2)
+
+        # the signed link can be opened without logging in
+        self.client.logout()
+        resp = self.client.get(data["download_url"])
+        self.assertEqual(resp.status_code, 200)
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(resp.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], ("code", "name"))
+        self.assertEqual([row[0] for row in rows[1:]], ["club-b", "club-a"])
+
+        # the export has the same clubs as the club list endpoint
+        self.client.login(username=self.user.username, password="test")
+        resp = self.client.get(
+            reverse("clubs-list"), {"bypass": "true", "ordering": "-name"}
+        )
+        self.assertEqual([club["code"] for club in resp.data], ["club-b", "club-a"])
+        self.client.logout()
+
+        resp = self.client.get(
+            reverse("exports-download", args=(job_id,)), {"token": "invalid"}
+        )
+        self.assertEqual(resp.status_code, 404)
+
+        # other users cannot see the export
+        self.client.login(username=self.other.username, password="test")
+        resp = self.client.get(reverse("exports-detail", args=(job_id,)))
+        self.assertEqual(resp.status_code, 404)
+
+        # finished exports are reused as well
+        self.client.login(username=self.user.username, password="test")
+        resp = self.client.post(reverse("reports-export", args=(report.id,)))
+        self.assertEqual(resp.data["id"], job_id)
+        self.assertIsNotNone(resp.data["download_url"])
+
+    def test_submissions_export(self):
+        self.client.login(username=self.user.username, password="test")
+        self.app.is_wharton_council = True
+        self.app.save()
+
+        for name in ["export", "exportall"]:
+            resp = self.client.get(
+                reverse(
+                    f"club-application-submissions-{name}",
+                    args=(self.club.code, self.app.id),
+                )
+            )
+            self.assertEqual(resp.status_code, 202, resp.content)
+
+            data = self.run_export(resp.data["id"])
+            resp = self.client.get(data["download_url"])
+            self.assertEqual(resp.status_code, 200)
+            content = b"".join(resp.streaming_content).decode("utf-8-sig")
+            rows = list(csv.reader(io.StringIO(content)))
+            self.assertEqual(len(rows), 2)
+            if name == "export":
+                self.assertIn("Why?", rows[0])
+                self.assertIn("Because", rows[1])
+                self.assertIn(self.other.email, rows[1])
+            else:
+                self.assertEqual(rows[1][0], "Fall App")
+
+    def test_stale_export_reclaimed(self):
+        """
+        Exports whose worker stopped reporting back are built again by another
+        worker and are not handed out to new requests.
+        """
+        parameters = {"application": self.app.id}
+        job, _ = ExportJob.request(ExportJob.KIND_SUBMISSIONS, self.user, parameters)
+        self.assertEqual(ExportJob.claim(), job)
+        self.assertIsNone(ExportJob.claim())
+        self.assertEqual(
+            ExportJob.request(ExportJob.KIND_SUBMISSIONS, self.user, parameters),
+            (job, False),
+        )
+
+        # the worker died without finishing the export
+        ExportJob.objects.filter(id=job.id).update(
+            lease_expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        new_job, created = ExportJob.request(
+            ExportJob.KIND_SUBMISSIONS, self.user, parameters
+        )
+        self.assertTrue(created)
+
+        call_command("run_export_jobs", stdout=io.StringIO())
+        for export in [job, new_job]:
+            export.refresh_from_db()
+            self.assertEqual(export.status, ExportJob.DONE)
+            self.assertTrue(export.file)
+
+    def test_failed_export(self):
+        """
+        The creator of a failed export sees a generic error, the traceback is only
+        written to the worker output.
+        """
+        job, _ = ExportJob.request(
+            ExportJob.KIND_SUBMISSIONS, self.user, {"application": self.app.id}
+        )
+        err = io.StringIO()
+        with patch(
+            "clubs.management.commands.run_export_jobs.Command.run_job",
+            side_effect=ValueError("/srv/secret/path"),
+        ):
+            call_command("run_export_jobs", stdout=io.StringIO(), stderr=err)
+        self.assertIn("/srv/secret/path", err.getvalue())
+
+        self.client.login(username=self.user.username, password="test")
+        resp = self.client.get(reverse("exports-detail", args=(job.id,)))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data["status"], ExportJob.FAILED)
+        self.assertEqual(resp.data["error"], ExportJob.FAILURE_MESSAGE)
+
+    def test_expired_exports_removed(self):
+        job, _ = ExportJob.request(
+            ExportJob.KIND_SUBMISSIONS, self.user, {"application": self.app.id}
+        )
+        call_command("run_export_jobs", stdout=io.StringIO())
+        job.refresh_from_db()
+        path = job.file.path
+        self.assertTrue(os.path.exists(path))
+
+        ExportJob.objects.filter(id=job.id).update(
+            created_at=timezone.now() - ExportJob.MAX_AGE * 2
+        )
+        call_command("run_export_jobs", stdout=io.StringIO())
+        self.assertFalse(ExportJob.objects.filter(id=job.id).exists())
+        self.assertFalse(os.path.exists(path))
@@ -18,6 +18,9 @@ import { Icon, Text } from '../common'
 import BaseCard from './BaseCard'
 import { MEMBERSHIP_ROLES } from './MembersCard'
 
+// number of emails sent to the invite endpoint in each request
+const INVITE_BATCH_SIZE = 500
+
 type InviteCardProps = {
   club: Club
 }
@@ -113,7 +116,7 @@ export default function InviteCard({
 
     setInviting(true)
 
-    if (emails.length <= 10) {
+    if (emails.length <= INVITE_BATCH_SIZE) {
       try {
         const data = await sendInviteBatch(emails)
         if (data.success) {
@@ -130,8 +133,8 @@ export default function InviteCard({
     } else {
       setInvitePercentage(0)
       const chunks: string[][] = []
-      for (let i = 0; i < emails.length; i += 10) {
-        chunks.push(emails.slice(i, i + 10))
+      for (let i = 0; i < emails.length; i += INVITE_BATCH_SIZE) {
+        chunks.push(emails.slice(i, i + INVITE_BATCH_SIZE))
       }
 
       const responses: { sent: number; skipped: number }[] = []
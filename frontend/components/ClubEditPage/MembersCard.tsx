@@ -104,7 +104,7 @@ export default function MembersCard({
       />
       <div style={{ marginTop: '1em' }}>
         <a
-          href={getApiUrl(`/clubs/${club.code}/members/?format=xlsx`)}
+          href={getApiUrl(`/clubs/${club.code}/members/?format=xlsx&stream=true`)}
           className="button is-link is-small"
         >
           <Icon alt="download" name="download" /> Download{' '}
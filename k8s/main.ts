@@ -75,6 +75,41 @@ export class MyChart extends PennLabsChart {
       cmd: ['python', 'manage.py', 'osa_perms_updates'],
     });
 
+    new CronJob(this, 'release-ticket-holds', {
+      schedule: cronTime.every(1).minutes(),
+      image: backendImage,
+      secret: clubsSecret,
+      cmd: ['python', 'manage.py', 'release_ticket_holds'],
+    });
+
+    new CronJob(this, 'send-outbox', {
+      schedule: cronTime.every(1).minutes(),
+      image: backendImage,
+      secret: clubsSecret,
+      cmd: ['python', 'manage.py', 'send_outbox'],
+    });
+
+    new CronJob(this, 'ingest-zoom-webhooks', {
+      schedule: cronTime.every(1).minutes(),
+      image: backendImage,
+      secret: clubsSecret,
+      cmd: ['python', 'manage.py', 'ingest_zoom_webhooks'],
+    });
+
+    new CronJob(this, 'run-export-jobs', {
+      schedule: cronTime.every(1).minutes(),
+      image: backendImage,
+      secret: clubsSecret,
+      cmd: ['python', 'manage.py', 'run_export_jobs'],
+    });
+
+    new CronJob(this, 'generate-image-variants', {
+      schedule: cronTime.every(1).minutes(),
+      image: backendImage,
+      secret: clubsSecret,
+      cmd: ['python', 'manage.py', 'generate_image_variants'],
+    });
+
     new CronJob(this, 'daily-notifications', {
       schedule: cronTime.onSpecificDaysAt(['monday', 'wednesday', 'friday'], 10, 0),
       image: backendImage,